@@ -1,9 +1,14 @@
+import argparse
 import sys
-import threading
-from OthelloABIDSearch import OthelloABIDSearch
-from OthelloPosition import OthelloPosition
-from OthelloMove import OthelloMove
-from OthelloHeuristics import OthelloHeuristics
+import time
+# The time limit counts from the start of the program, before the engine
+# modules (and numpy) are imported
+PROGRAM_START = time.monotonic()
+from OthelloBitboardPosition import OthelloBitboardPosition
+from OthelloEngine import OthelloEngine
+from OthelloEvaluators import EVALUATORS, DEFAULT_EVALUATOR
+from OthelloOpeningBook import DEFAULT_BOOK_PATH
+from OthelloSearchStats import OthelloSearchStats
 
 class Othello():
 	"""
@@ -11,65 +16,74 @@ class Othello():
 	within the given time limit
 	"""
 
-	def __init__(self, position_str, time_limit):
+	def __init__(self, position_str, time_limit, position_class=OthelloBitboardPosition, tt_memory_mb=64, workers=1,
+		endgame_empties=12, book_path=DEFAULT_BOOK_PATH, evaluator=DEFAULT_EVALUATOR, safety_margin=0.1, stats=None):
 		"""
-		Instantiates components needed for the game including timer, root position and
-		root player, return move, heuristics and search
+		Instantiates the engine that searches the position. The time limit
+		counts from the start of the program
 		
 		Args:
 		    position_str (str): The serialized game string that represents
 		    the starting player and the board
-		    time_limit (int): The time limit in seconds
+		    time_limit (float): The time limit in seconds
+		    position_class (type, optional): The board backend, OthelloBitboardPosition
+		    or the array based OthelloPosition
+		    tt_memory_mb (float, optional): Memory budget of the transposition table in megabytes
+		    workers (int, optional): Number of searching processes. With more than one, Lazy SMP
+		    helpers search alongside the main search on a shared transposition table
+		    endgame_empties (int, optional): Solve the game exactly from this many empty squares
+		    book_path (str, optional): The opening book file, None or a missing file to always search
+		    evaluator (str, optional): Name of the evaluation function, see OthelloEvaluators
+		    safety_margin (float, optional): Seconds before the time limit the search stops
+		    to print its move
+		    stats (OthelloSearchStats, optional): Reports every iteration of the search
 		"""
-		self._timer = threading.Timer(time_limit, self._times_up)
-		
-		root_position = OthelloPosition(position_str)
-		return_move = OthelloMove(row=-1, col=-1, is_pass_move=True)
-		
-		if(root_position.maxPlayer):
-			player = "W"
-			opponent = "B"
-		else:
-			player = "B"
-			opponent = "W"
-		othello_evaluator =  OthelloHeuristics(player, opponent)
-		
-		self._othello_ab_id_search = OthelloABIDSearch(root_position, return_move, othello_evaluator, 2, 30, True)
-		
+		self._position_str = position_str
+		self._time_limit = time_limit
+		self._engine = OthelloEngine(position_class, tt_memory_mb, workers, endgame_empties, book_path, evaluator,
+			safety_margin, stats=stats)
 
 	def main(self):
 		"""
-		Start the game
-		"""
-		self._timer.start()
-		self._othello_ab_id_search.ab_id_search()
-		
-	
-	def _times_up(self):
-		"""Summary
-		When the game timer is up, this function will interrupt
-		the game search thread (Iterative deepening search) and print 
-		whatever the most recent move is and exit the program
-		
-		Raises:
-		    Exception: Generic exception
+		Start the game. A position found in the opening book is answered
+		right away, otherwise the search runs until the time manager stops it
+		and the best move of the deepest completed iteration is printed
 		"""
 		try:
-			raise Exception('times up')
-		except:
-			self._othello_ab_id_search._return_move.print_move()
-			self._othello_ab_id_search.is_alive = False
-			sys.exit()
+			self._engine.best_move(self._position_str, self._time_limit, PROGRAM_START).print_move()
+		finally:
+			self._engine.close()
 
 if __name__ == "__main__":
 	if(len(sys.argv)>=3):
-		game_str = sys.argv[1]
+		parser = argparse.ArgumentParser(description='Prints the best move for an Othello position')
+		parser.add_argument('position', help='65 character position string')
+		parser.add_argument('time_limit', type=float, help='time limit in seconds')
+		parser.add_argument('--workers', type=int, default=1, help='number of search processes (Lazy SMP)')
+		parser.add_argument('--book', default=DEFAULT_BOOK_PATH, help='opening book file')
+		parser.add_argument('--evaluator', default=DEFAULT_EVALUATOR, choices=sorted(EVALUATORS),
+			help='evaluation function')
+		parser.add_argument('--stats', action='store_true', help='report every search iteration on stderr')
+		parser.add_argument('--stats-log', help='append every search iteration to this file as JSON lines')
+		args = parser.parse_args()
+		game_str = args.position
 		if(len(game_str) != 65):
 			print('Incorrect game string length')	
 			sys.exit()
-		time_limit = int(sys.argv[2])
-		othello = Othello(game_str, time_limit) 
-		othello.main()
+		stats = None
+		stats_log = None
+		if(args.stats_log):
+			stats_log = open(args.stats_log, 'a')
+			stats = OthelloSearchStats(stats_log, as_json=True)
+		elif(args.stats):
+			stats = OthelloSearchStats()
+		try:
+			othello = Othello(game_str, args.time_limit, workers=args.workers, book_path=args.book,
+				evaluator=args.evaluator, stats=stats) 
+			othello.main()
+		finally:
+			if(stats_log is not None):
+				stats_log.close()
 	else:
 		print('Incorrect number of arguments')
 		sys.exit()
\ No newline at end of file
@@ -1,7 +1,26 @@
-from OthelloMove import OthelloMove
+from OthelloMove import OthelloMove, PASS_MOVE
 from OthelloPosition import OthelloPosition
+from OthelloTranspositionTable import EXACT, LOWER_BOUND, UPPER_BOUND, NO_MOVE
+from OthelloBitboardPosition import FULL_BOARD, pop_count
+from OthelloMoveOrdering import CORNERS
+from OthelloTimeManager import SearchTimeout
 import numpy as np
-import sys
+
+# Search modes of OthelloABIDSearch
+MINIMAX = "minimax"
+PVS = "pvs"
+
+# Width of the null window used by the PVS scout searches
+NULL_WINDOW = 1e-6
+
+# Plies a late move is searched shallower with late move reductions
+LMR_REDUCTION = 1
+# Remaining depth a node needs for its late moves to be reduced, so that a
+# reduced move is still searched to at least one ply
+LMR_MIN_DEPTH = LMR_REDUCTION + 2
+# Positions with this many empty squares or fewer are searched without
+# reductions, in the endgame a single move decides the game
+LMR_ENDGAME_EMPTIES = 14
 
 class OthelloABIDSearch(object):
 
@@ -9,7 +28,10 @@ class OthelloABIDSearch(object):
     The main program of the Othello game search using AB pruning and IDS
     Also performs heuristic evalutation of game positions
     """
-    def __init__(self, root_position, return_move, othello_evaluator, min_depth, max_depth, is_alive = True):
+    def __init__(self, root_position, return_move, othello_evaluator, min_depth, max_depth, is_alive = True,
+        transposition_table = None, move_ordering = None, search_mode = MINIMAX, aspiration_window = 10,
+        iteration_callback = None, endgame_solver = None, time_manager = None, stats = None,
+        batch_frontier = False, probcut = None, lmr_rank = None):
         """
         Initialize the alpha beta pruning search with iterative deepening for the
         othello game
@@ -22,6 +44,31 @@ class OthelloABIDSearch(object):
             min_depth (int): the initial depth to start iterative deepening from
             max_depth (int): the maximum depth to search using iterative deepening
             is_alive (bool, optional): flag whether the game timer has finished
+            transposition_table (OthelloTranspositionTable, optional): table of earlier
+            search results shared by all iterations, None to search without one
+            move_ordering (OthelloMoveOrdering, optional): orders the moves of every node
+            (PV, hash and killer moves, history), None to only search the hash move first
+            search_mode (str, optional): MINIMAX for the max/min alpha beta search, PVS for the
+            negamax principal variation search with aspiration windows
+            aspiration_window (float, optional): half width of the PVS root window around the
+            score of the previous iteration
+            iteration_callback (callable, optional): called as iteration_callback(depth, move)
+            after every completed iteration
+            endgame_solver (OthelloEndgameSolver, optional): solves the root exactly once at most
+            endgame_solver.max_empties squares are empty, None to always use the heuristic search
+            time_manager (OthelloTimeManager, optional): started time manager that decides when
+            the search stops, None to search until is_alive is cleared or max_depth is reached
+            stats (OthelloSearchStats, optional): reports the counters of every completed iteration,
+            None to not report them. The counters themselves are always kept
+            batch_frontier (bool, optional): in PVS, evaluate all children of a node on the last
+            ply before the horizon with one call of the evaluator's _utility_of_batch instead of
+            one _utility_value per child
+            probcut (OthelloProbCut, optional): in PVS, cut nodes below the root whose value a
+            shallow search predicts to be outside the window (Multi-ProbCut), None to search full width
+            lmr_rank (int, optional): late move reductions, the moves from this index of the search
+            order on are searched LMR_REDUCTION plies shallower and again at full depth if they
+            beat alpha. Corners, the PV and hash moves and endgame positions are not reduced.
+            None to search every move to full depth
         """
         self._root_position = root_position
         self._return_move = return_move
@@ -29,24 +76,155 @@ class OthelloABIDSearch(object):
         self._min_depth = min_depth
         self._max_depth = max_depth
         self.is_alive = is_alive
+        self._transposition_table = transposition_table
+        self._move_ordering = move_ordering
+        self._search_mode = search_mode
+        self._aspiration_window = aspiration_window
+        self._iteration_callback = iteration_callback
+        self._endgame_solver = endgame_solver
+        self._time_manager = time_manager
+        self._stats = stats
+        self._batch_frontier = batch_frontier
+        self._probcut = probcut
+        self._lmr_rank = lmr_rank
+        self._principal_variation = []
+        self._reset_counters()
+        self.completed_depth = 0
 
     def ab_id_search( self ):
         """
         Runs the alpha beta search within an iterative deepening for loop. 
-        Sets the latest move the player should make on return move object
+        Sets the latest move the player should make on return move object.
+        The search returns when the time manager runs out of time or predicts
+        that the next iteration can not complete, and then the move of the
+        last completed iteration stays the return move (the first legal move
+        if not even the first iteration completed)
         """
-        if(len(self._root_position.get_moves())):
-            self._return_move.is_pass_move = False
+        root_moves = self._root_position.get_moves()
+        if(len(root_moves)):
+            self._return_move = root_moves[0]
+            if(self._transposition_table is not None):
+                self._transposition_table.new_search()
+            if(self._move_ordering is not None):
+                self._move_ordering.new_search()
+            self._pv_table = [[] for ply in range(self._max_depth + 2)]
+            self._root_player = self._root_position.maxPlayer
+            self._root_value = None
+            self._reset_counters()
+            self.completed_depth = 0
+            if(self._stats is not None):
+                self._stats.start_search(self)
+            # A search that times out leaves its moves made on the position it
+            # searches, so the search works on a copy of the root
+            self._search_root = self._root_position.clone()
             for self._iterative_max_depth in range(self._min_depth, self._max_depth):
-                return_move = self._max_search(self._root_position, -np.inf, np.inf, 0)
+                if(self._time_manager is not None):
+                    if(self.completed_depth and not self._time_manager.can_start_iteration()):
+                        break
+                    self._time_manager.start_iteration()
+                iteration_start_nodes = self.nodes
+                try:
+                    if(self._search_mode == PVS):
+                        value = self._aspiration_search()
+                    else:
+                        value = self._max_search(self._search_root, -np.inf, np.inf, 0, self._iterative_max_depth + 1)
+                    return_move = OthelloMove.from_square(self._root_square, value)
+                except SearchTimeout:
+                    break
                 if(not self.is_alive):
                     break
                 else:
                     self._return_move = return_move
+                    self.completed_depth = self._iterative_max_depth
+                    self._principal_variation = self._pv_table[0]
+                    if(self._time_manager is not None):
+                        self._time_manager.end_iteration(self.nodes - iteration_start_nodes)
+                    if(self._move_ordering is not None):
+                        self._move_ordering.set_principal_variation(self._root_position, self._principal_variation)
+                    if(self._stats is not None):
+                        self._stats.record_iteration(self)
+                    if(self._iteration_callback is not None):
+                        self._iteration_callback(self.completed_depth, return_move)
+                    if(self._is_endgame()):
+                        self._solve_endgame()
+                        break
         else:
             self._return_move.is_pass_move = True
+
+    def stop(self):
+        """
+        Stops the search from another thread. The search returns at its next
+        node with the move of the last completed iteration
+        """
+        self.is_alive = False
+
+    def ponderhit(self, time_manager):
+        """
+        Gives a search that was started without a time manager (pondering on a
+        predicted position) a deadline, from another thread, once the predicted
+        position has come up. The search reads its time manager at every node,
+        so it goes on with the iterations it is in and stops at the deadline,
+        keeping all the work done while pondering
+
+        Args:
+            time_manager (OthelloTimeManager): started time manager of the real move
+        """
+        self._time_manager = time_manager
+
+    def _reset_counters(self):
+        """
+        Zeroes the search counters: nodes, leaf evaluations, beta cutoffs (and
+        how many of them came on the first move searched), transposition
+        table hits, ProbCut cuts, late moves searched reduced and how many of
+        them beat alpha and were searched again. They count over the whole
+        search, OthelloSearchStats takes the differences per iteration
+        """
+        self.nodes = 0
+        self.leaves = 0
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.tt_hits = 0
+        self.probcuts = 0
+        self.reductions = 0
+        self.failed_reductions = 0
+
+    # ENDGAME
+    def _is_endgame(self):
+        """
+        Determines if the root is close enough to the end of the game to be solved exactly
+        
+        Returns:
+            TYPE(Boolean)
+        """
+        if(self._endgame_solver is None):
+            return False
+        empty = FULL_BOARD ^ (self._root_position.white | self._root_position.black)
+        return pop_count(empty) <= self._endgame_solver.max_empties
+
+    def _solve_endgame(self):
+        """
+        Solves the root with the endgame solver and sets the perfect move on the
+        return move. The move of the first heuristic iteration stays the return
+        move unless the solver finishes in time, so there is always a move to print.
+        A solved root counts as searched to the maximum depth
+        """
+        position = self._root_position
+        own, opp = (position.white, position.black) if position.maxPlayer else (position.black, position.white)
+        try:
+            square, score = self._endgame_solver.solve(own, opp, self._is_searching)
+        except SearchTimeout:
+            return
+        if(square == PASS_MOVE):
+            return
+        self._return_move = OthelloMove.from_square(square, score)
+        self.completed_depth = self._max_depth
+        self._principal_variation = [square]
+        if(self._stats is not None):
+            self._stats.record_endgame(self, self._endgame_solver.nodes)
+        if(self._iteration_callback is not None):
+            self._iteration_callback(self.completed_depth, self._return_move)
     
-    def _max_search(self, position, alpha, beta, curr_depth):
+    def _max_search(self, position, alpha, beta, curr_depth, depth):
         """
         The 'Max' componenet of alpha beta search algorithm. Algorithm
         taken from Russel and Norvig.
@@ -55,29 +233,66 @@ class OthelloABIDSearch(object):
             position (Othello Position): represents the board state
             alpha (float): Description
             beta (float): Description
-            curr_depth (int): Description
+            curr_depth (int): The current depth, the ply of the position
+            depth (int): the remaining depth, plies to the horizon
         
         Returns:
-            OthelloMove: Description
+            float: the value of the position. At the root the best move is kept in _root_square
         """
-        moves = position.get_moves()
+        self.nodes += 1
+        if(self._time_manager is not None):
+            self._time_manager.check(self.nodes)
+        hash_move = NO_MOVE
+        self._pv_table[curr_depth] = []
+        if(self._transposition_table is not None):
+            entry = self._transposition_table.probe(position.hash)
+            if(entry is not None):
+                self.tt_hits += 1
+                hash_move = entry[3]
+                if(curr_depth > 0 and self._is_hash_cutoff(entry, alpha, beta, depth)):
+                    return entry[2]
 
-        if(self._is_terminal_state(moves, curr_depth)):
-            return self._othello_evaluator._utility_of_result(position)
+        moves = position.get_move_squares()
 
-        max_move = OthelloMove(value=-np.inf)
+        if(self._is_terminal_state(moves, depth)):
+            self.leaves += 1
+            value = self._othello_evaluator._utility_value(position)
+            self._store(position, depth, value, -np.inf, np.inf, NO_MOVE)
+            return value
 
-        for i, move in enumerate(moves):
-            next_position = self._result(position, move)
-            move.value = self._min_search( next_position, alpha, beta, curr_depth+1).value
-            max_move = self._max_move(move, max_move)
+        max_value = -np.inf
+        max_square = NO_MOVE
+        alpha_original = alpha
+        exempt = self._late_move_exemptions(position, moves, curr_depth, depth, hash_move)
 
-            if(max_move.value >= beta):
-                return max_move
-            alpha = alpha if alpha >= max_move.value else max_move.value
-        return max_move
+        for i, square in enumerate(self._order_moves(moves, position, curr_depth, hash_move)):
+            undo = position.make_move_square(square)
+            if(exempt is not None and i >= self._lmr_rank and square not in exempt):
+                self.reductions += 1
+                value = self._min_search( position, alpha, beta, curr_depth+1, depth-1-LMR_REDUCTION)
+                if(value > alpha):
+                    self.failed_reductions += 1
+                    value = self._min_search( position, alpha, beta, curr_depth+1, depth-1)
+            else:
+                value = self._min_search( position, alpha, beta, curr_depth+1, depth-1)
+            position.unmake_move(undo)
+            if(value >= max_value):
+                max_value = value
+                max_square = square
+                if(curr_depth == 0):
+                    self._root_square = square
 
-    def _min_search(self, position, alpha, beta, curr_depth):
+            if(max_value >= beta):
+                self._record_cutoff(square, position, curr_depth, depth, i)
+                break
+            if(value > alpha):
+                self._update_principal_variation(square, curr_depth)
+            alpha = alpha if alpha >= max_value else max_value
+
+        self._store(position, depth, max_value, alpha_original, beta, max_square)
+        return max_value
+
+    def _min_search(self, position, alpha, beta, curr_depth, depth):
         """
         The 'Min' componenet of alpha beta search algorithm. Algorithm
         taken from Russel and Norvig.
@@ -86,87 +301,467 @@ class OthelloABIDSearch(object):
             position (Othello Position): represents the board state
             alpha (float): Description
             beta (float): Description
-            curr_depth (int): Description
+            curr_depth (int): The current depth, the ply of the position
+            depth (int): the remaining depth, plies to the horizon
         
         Returns:
-            OthelloMove: Description
+            float: the value of the position
         """
-        moves = position.get_moves()
-        if(self._is_terminal_state(moves, curr_depth)):
-            return self._othello_evaluator._utility_of_result(position)
-        
+        self.nodes += 1
+        if(self._time_manager is not None):
+            self._time_manager.check(self.nodes)
+        hash_move = NO_MOVE
+        self._pv_table[curr_depth] = []
+        if(self._transposition_table is not None):
+            entry = self._transposition_table.probe(position.hash)
+            if(entry is not None):
+                self.tt_hits += 1
+                hash_move = entry[3]
+                if(self._is_hash_cutoff(entry, -beta, -alpha, depth)):
+                    return -entry[2]
+
+        moves = position.get_move_squares()
+        if(self._is_terminal_state(moves, depth)):
+            self.leaves += 1
+            value = self._othello_evaluator._utility_value(position)
+            self._store(position, depth, -value, -np.inf, np.inf, NO_MOVE)
+            return value
         
-        min_move = OthelloMove(value=np.inf)
+        min_value = np.inf
+        min_square = NO_MOVE
+        beta_original = beta
+        exempt = self._late_move_exemptions(position, moves, curr_depth, depth, hash_move)
 
-        for move in moves:
-            next_position = self._result(position, move)
-            move.value = self._max_search( next_position, alpha, beta, curr_depth+1).value
-            min_move = self._min_move(move, min_move)
+        for i, square in enumerate(self._order_moves(moves, position, curr_depth, hash_move)):
+            undo = position.make_move_square(square)
+            if(exempt is not None and i >= self._lmr_rank and square not in exempt):
+                self.reductions += 1
+                value = self._max_search( position, alpha, beta, curr_depth+1, depth-1-LMR_REDUCTION)
+                if(value < beta):
+                    self.failed_reductions += 1
+                    value = self._max_search( position, alpha, beta, curr_depth+1, depth-1)
+            else:
+                value = self._max_search( position, alpha, beta, curr_depth+1, depth-1)
+            position.unmake_move(undo)
+            if(value <= min_value):
+                min_value = value
+                min_square = square
             
-            if(min_move.value <= alpha):
-                return min_move
-            beta = beta if beta <= min_move.value else min_move.value
-        return min_move
+            if(min_value <= alpha):
+                self._record_cutoff(square, position, curr_depth, depth, i)
+                break
+            if(value < beta):
+                self._update_principal_variation(square, curr_depth)
+            beta = beta if beta <= min_value else min_value
+
+        self._store(position, depth, -min_value, -beta_original, -alpha, min_square)
+        return min_value
+
+    # PRINCIPAL VARIATION SEARCH
+    def _aspiration_search(self):
+        """
+        Searches the root with PVS inside an aspiration window centred on the
+        score of the previous iteration. When the score falls outside the window
+        the window is widened on that side and the root is searched again
+        
+        Returns:
+            float: the value of the best root move, which is kept in _root_square
+        """
+        if(self._root_value is None):
+            alpha, beta = -np.inf, np.inf
+        else:
+            alpha = self._root_value - self._aspiration_window
+            beta = self._root_value + self._aspiration_window
+        delta = self._aspiration_window
+        while True:
+            value = self._pvs_search(self._search_root, alpha, beta, 0, self._iterative_max_depth + 1)
+            if(value <= alpha):
+                delta *= 4
+                alpha = value - delta
+            elif(value >= beta):
+                delta *= 4
+                beta = value + delta
+            else:
+                break
+        self._root_value = value
+        return self._root_square_value
 
-    # COMPARATOR
-    def _max_move(self, left_move, right_move):
+    def _pvs_search(self, position, alpha, beta, curr_depth, depth):
         """
-        Compares two OthelloMoves based on their estimated values
+        Negamax principal variation search. The first move is searched with the
+        full window, the other moves with a null window that only tells if they
+        are better than the best move so far. Only the moves that are better are
+        searched again with the full window. At the root the best move is kept
+        in _root_square and its value in _root_square_value
         
         Args:
-            left_move (OthelloMove): one of two moves
-            right_move (OthelloMove): one of two moves
+            position (OthelloPosition): represents the board state
+            alpha (float): lower bound, seen from the player to move
+            beta (float): upper bound, seen from the player to move
+            curr_depth (int): The current depth, the ply of the position
+            depth (int): the remaining depth, plies to the horizon
         
         Returns:
-            TYPE(OthelloMove): The move with highest value
+            float: value of the position for the player to move
         """
-        return left_move if left_move.value >= right_move.value else right_move
+        self.nodes += 1
+        if(self._time_manager is not None):
+            self._time_manager.check(self.nodes)
+        hash_move = NO_MOVE
+        self._pv_table[curr_depth] = []
+        if(self._transposition_table is not None):
+            entry = self._transposition_table.probe(position.hash)
+            if(entry is not None):
+                self.tt_hits += 1
+                hash_move = entry[3]
+                if(curr_depth > 0 and self._is_hash_cutoff(entry, alpha, beta, depth)):
+                    return entry[2]
+
+        moves = position.get_move_squares()
+        if(self._is_terminal_state(moves, depth)):
+            self.leaves += 1
+            value = self._othello_evaluator._utility_value(position)
+            if(position.maxPlayer != self._root_player):
+                value = -value
+            self._store(position, depth, value, -np.inf, np.inf, NO_MOVE)
+            return value
+
+        if(self._probcut is not None and curr_depth > 0):
+            value = self._probcut_search(position, alpha, beta, curr_depth, depth)
+            if(value is not None):
+                return value
+
+        alpha_original = alpha
+        if(self._batch_frontier and depth == 1):
+            best_value, best_square = self._pvs_frontier(position, self._order_moves(moves, position, curr_depth,
+                hash_move), alpha, beta, curr_depth, depth)
+            self._store(position, depth, best_value, alpha_original, beta, best_square)
+            return best_value
+
+        best_value = -np.inf
+        best_square = NO_MOVE
+        exempt = self._late_move_exemptions(position, moves, curr_depth, depth, hash_move)
+
+        for i, square in enumerate(self._order_moves(moves, position, curr_depth, hash_move)):
+            undo = position.make_move_square(square)
+            if(i == 0):
+                value = -self._pvs_search(position, -beta, -alpha, curr_depth+1, depth-1)
+            else:
+                if(exempt is not None and i >= self._lmr_rank and square not in exempt):
+                    self.reductions += 1
+                    value = -self._pvs_search(position, -alpha - NULL_WINDOW, -alpha, curr_depth+1,
+                        depth-1-LMR_REDUCTION)
+                    if(value > alpha):
+                        self.failed_reductions += 1
+                        value = -self._pvs_search(position, -alpha - NULL_WINDOW, -alpha, curr_depth+1, depth-1)
+                else:
+                    value = -self._pvs_search(position, -alpha - NULL_WINDOW, -alpha, curr_depth+1, depth-1)
+                if(alpha < value < beta):
+                    value = -self._pvs_search(position, -beta, -alpha, curr_depth+1, depth-1)
+            position.unmake_move(undo)
 
-    def _min_move(self, left_move, right_move):
+            if(value > best_value):
+                best_value = value
+                best_square = square
+                if(curr_depth == 0):
+                    self._root_square = square
+                    self._root_square_value = value
+                if(value >= beta):
+                    self._record_cutoff(square, position, curr_depth, depth, i)
+                    break
+                if(value > alpha):
+                    alpha = value
+                    self._update_principal_variation(square, curr_depth)
+
+        self._store(position, depth, best_value, alpha_original, beta, best_square)
+        return best_value
+
+    def _pvs_frontier(self, position, moves, alpha, beta, curr_depth, depth):
         """
-        Compares two OthelloMoves based on their estimated values
+        Searches a node on the last ply before the horizon, where every child
+        is a leaf. The children are made one by one to read their boards and
+        then evaluated together with the evaluator's _utility_of_batch, except
+        those with an exact transposition table entry. The values are then
+        gone through in order as _pvs_search would, with the same cutoffs and
+        principal variation. A leaf does not depend on the window, so the
+        null window searches need no re-search here
         
         Args:
-            left_move (OthelloMove): one of two moves
-            right_move (OthelloMove): one of two moves
+            position (OthelloPosition): represents the board state
+            moves (list): the square indexes of the moves of the position in search order
+            alpha (float): lower bound, seen from the player to move
+            beta (float): upper bound, seen from the player to move
+            curr_depth (int): The current depth
+            depth (int): the remaining depth of the position
         
         Returns:
-            TYPE(OthelloMove): The move with lowest value
+            tuple(float, int): value of the position for the player to move and
+            the square index of the best move
         """
-        return left_move if left_move.value <= right_move.value else right_move
+        children = []
+        hashes = []
+        values = [None] * len(moves)
+        for i, square in enumerate(moves):
+            undo = position.make_move_square(square)
+            entry = None if self._transposition_table is None else self._transposition_table.probe(position.hash)
+            if(entry is not None and entry[1] == EXACT):
+                self.tt_hits += 1
+                values[i] = -entry[2]
+            else:
+                children.append((position.white, position.black))
+                hashes.append(position.hash)
+            position.unmake_move(undo)
+        if(children):
+            # Leaves are valued for the player to move in them, the opponent
+            # of the player to move here
+            sign = 1 if position.maxPlayer != self._root_player else -1
+            batch_values = self._othello_evaluator._utility_of_batch(np.array(children, dtype=np.uint64))
+            self.leaves += len(children)
+            batch_index = 0
+            for i in range(len(moves)):
+                if(values[i] is None):
+                    child_value = sign * float(batch_values[batch_index])
+                    self._store_hash(hashes[batch_index], 0, child_value)
+                    values[i] = -child_value
+                    batch_index += 1
 
-    def _is_terminal_state(self, moves, curr_depth):
+        self._pv_table[curr_depth + 1] = []
+        best_value = -np.inf
+        best_square = NO_MOVE
+        for i, square in enumerate(moves):
+            self.nodes += 1
+            if(self._time_manager is not None):
+                self._time_manager.check(self.nodes)
+            if(not self.is_alive):
+                raise SearchTimeout()
+            value = values[i]
+            if(value > best_value):
+                best_value = value
+                best_square = square
+                if(curr_depth == 0):
+                    self._root_square = square
+                    self._root_square_value = value
+                if(value >= beta):
+                    self._record_cutoff(square, position, curr_depth, depth, i)
+                    break
+                if(value > alpha):
+                    alpha = value
+                    self._update_principal_variation(square, curr_depth)
+        return best_value, best_square
+
+    def _probcut_search(self, position, alpha, beta, curr_depth, depth):
         """
-        Determines if state is terminal
+        Multi-ProbCut. For every shallow depth fitted for the depth of the
+        node, shallowest first, a null-window search to the shallow depth tests
+        if the predicted value of the full search is above beta or below alpha
+        by more than the threshold times the error of the prediction. The
+        shallow searches search the node itself, at its ply, to the shallow
+        depth. A cut is not a proven bound and is not stored in the
+        transposition table
+        
+        Args:
+            position (OthelloPosition): represents the board state
+            alpha (float): lower bound, seen from the player to move
+            beta (float): upper bound, seen from the player to move
+            curr_depth (int): The current depth
+            depth (int): the remaining depth of the position
+        
+        Returns:
+            float: beta or alpha if the node is cut, None if it has to be searched
+        """
+        # The parameters are fitted to values of the root player
+        sign = 1 if position.maxPlayer == self._root_player else -1
+        threshold = self._probcut.threshold
+        for shallow, slope, intercept, sigma in self._probcut.pairs(depth):
+            if(beta < np.inf):
+                bound = (beta + threshold * sigma - sign * intercept) / slope
+                if(self._pvs_search(position, bound - NULL_WINDOW, bound, curr_depth, shallow) >= bound):
+                    self.probcuts += 1
+                    return beta
+            if(alpha > -np.inf):
+                bound = (alpha - threshold * sigma - sign * intercept) / slope
+                if(self._pvs_search(position, bound, bound + NULL_WINDOW, curr_depth, shallow) <= bound):
+                    self.probcuts += 1
+                    return alpha
+        # The shallow searches leave their principal variation in the slot of the node
+        self._pv_table[curr_depth] = []
+        return None
+
+    def _late_move_exemptions(self, position, moves, curr_depth, depth, hash_move):
+        """
+        Decides if the late moves of a node are reduced. A reduced move is
+        searched at its ply with LMR_REDUCTION plies less remaining depth. The
+        moves that are never reduced are the corners, which are rarely bad and
+        can not be taken back, and the moves expected to be best: the principal
+        variation move and the hash move
         
         Args:
-            moves (list): List of available OthelloMove's
+            position (OthelloPosition): represents the board state
+            moves (list): the square indexes of the available moves
             curr_depth (int): The current depth
+            depth (int): the remaining depth of the position
+            hash_move (int): square index of the transposition table move, or NO_MOVE
+        
+        Returns:
+            tuple: the square indexes that are not reduced, None if no move of the node is reduced
+        """
+        if(self._lmr_rank is None or depth < LMR_MIN_DEPTH or len(moves) <= self._lmr_rank):
+            return None
+        if(pop_count(FULL_BOARD ^ (position.white | position.black)) <= LMR_ENDGAME_EMPTIES):
+            return None
+        pv_move = NO_MOVE
+        if(self._move_ordering is not None):
+            pv_move = self._move_ordering.principal_variation_move(position, curr_depth)
+        return CORNERS + (pv_move, hash_move)
+
+    def _is_searching(self):
+        """
+        Determines if the search may go on, polled by the endgame solver
+        
+        Returns:
+            TYPE(Boolean)
+        """
+        return self.is_alive and (self._time_manager is None or not self._time_manager.expired())
+
+    def _is_terminal_state(self, moves, depth):
+        """
+        Determines if state is terminal
+        
+        Args:
+            moves (list): the square indexes of the available moves
+            depth (int): the remaining depth of the position
         
         Returns:
             TYPE(Boolean)
         """
         if(not self.is_alive):
-            sys.exit()
-        if( moves and curr_depth <= self._iterative_max_depth):
+            raise SearchTimeout()
+        if( moves and depth > 0):
             return False
         return True
 
-    # SIMULATE FUTURE STATES / MAKE MOVE
-    def _result(self, position, move):
+    # TRANSPOSITION TABLE
+    def _is_hash_cutoff(self, entry, alpha, beta, depth):
+        """
+        Determines if a transposition table entry can be returned instead of
+        searching the position
+        
+        Args:
+            entry (tuple): (depth, flag, value, move) from the transposition table
+            alpha (float): the current alpha bound
+            beta (float): the current beta bound
+            depth (int): the remaining depth the position has to be searched to
+        
+        Returns:
+            TYPE(Boolean)
         """
-        Creates a "next move" state, which is a state
-        of the board after an action is taken by the current player
-        and marks the other player as the current player
+        entry_depth, flag, value, move = entry
+        if(entry_depth < depth):
+            return False
+        if(flag == EXACT):
+            return True
+        if(flag == LOWER_BOUND):
+            return value >= beta
+        return value <= alpha
 
+    def _store(self, position, depth, value, alpha, beta, move):
+        """
+        Stores a search result in the transposition table, classifying the value
+        against the window the position was searched with. Values and windows are
+        given from the point of view of the player to move in the position, so
+        that entries are valid whichever player is at the root
+        
+        Args:
+            position (OthelloPosition): the searched position
+            depth (int): the remaining depth the position was searched to
+            value (float): the value found by the search, for the player to move
+            alpha (float): alpha at the start of the search of the position
+            beta (float): beta at the start of the search of the position
+            move (int): square index of the best move, or NO_MOVE
+        """
+        if(self._transposition_table is None):
+            return
+        if(value <= alpha):
+            flag = UPPER_BOUND
+        elif(value >= beta):
+            flag = LOWER_BOUND
+        else:
+            flag = EXACT
+        self._transposition_table.store(position.hash, depth, flag, value, move)
+
+    def _store_hash(self, position_hash, depth, value):
+        """
+        Stores the exact value of a position known only by its hash
+
+        Args:
+            position_hash (int): Zobrist hash of the position
+            depth (int): the remaining depth the position was searched to
+            value (float): the value of the position, for the player to move
+        """
+        if(self._transposition_table is not None):
+            self._transposition_table.store(position_hash, depth, EXACT, value, NO_MOVE)
+
+    # MOVE ORDERING
+    def _order_moves(self, moves, position, curr_depth, hash_move):
+        """
+        Orders the moves of a position with the move ordering, or only puts the
+        hash move first when the search has no move ordering
+        
+        Args:
+            moves (list): the square indexes of the available moves
+            position (OthelloPosition): the position the moves are played in
+            curr_depth (int): The current depth
+            hash_move (int): square index of the transposition table move, or NO_MOVE
+        
+        Returns:
+            list: the square indexes in search order
+        """
+        if(self._move_ordering is not None):
+            return self._move_ordering.order(moves, position, curr_depth, hash_move)
+        return self._hash_move_first(moves, hash_move)
+
+    def _record_cutoff(self, square, position, curr_depth, depth, move_index):
+        """
+        Counts a beta cutoff and passes it on to the move ordering
+        
+        Args:
+            square (int): the square index of the move that caused the cutoff
+            position (OthelloPosition): the position the move was played in
+            curr_depth (int): The current depth
+            depth (int): the remaining depth of the position
+            move_index (int): the position of the move in the search order
+        """
+        self.cutoffs += 1
+        if(move_index == 0):
+            self.first_move_cutoffs += 1
+        if(self._move_ordering is not None):
+            self._move_ordering.record_cutoff(square, position, curr_depth, depth, move_index)
+
+    def _update_principal_variation(self, square, curr_depth):
+        """
+        Records the move followed by the principal variation of its subtree as the
+        principal variation from the current depth
+        
+        Args:
+            square (int): the square index of the new best move at the current depth
+            curr_depth (int): The current depth
+        """
+        self._pv_table[curr_depth] = [square] + self._pv_table[curr_depth + 1]
+
+    def _hash_move_first(self, moves, hash_move):
+        """
+        Moves the best move stored in the transposition table to the front
+        of the list so that it is searched first
         
         Args:
-            position (OthelloPosition): the current position
-            move (OthelloMove): the move to take
+            moves (list): the square indexes of the available moves
+            hash_move (int): square index of the stored best move, or NO_MOVE
         
         Returns:
-            OthelloPosition: The "next" state of the board
+            list: the square indexes, with the hash move first
         """
-        next_position = position.clone()
-        next_position.make_move(move)
-        return next_position
+        if(hash_move == NO_MOVE or hash_move not in moves):
+            return moves
+        moves.remove(hash_move)
+        moves.insert(0, hash_move)
+        return moves
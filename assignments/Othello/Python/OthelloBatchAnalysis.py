@@ -0,0 +1,167 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from OthelloTournament import ENGINE_DEFAULTS, UNLIMITED_TIME, parse_engine, create_engine
+
+POSITION_CHARACTERS = set('EOX')
+
+# The engine and configuration of a worker process, kept for all the positions
+# the worker analyses so that later positions start with a warm table
+_engine = None
+_config = None
+
+
+def read_positions(lines, analysed=()):
+    """
+    Streams the position strings of a file, in the 65 character format that
+    Othello.py accepts. Empty lines and lines starting with # are left out
+
+    Args:
+        lines (iterable): the lines of the file, or sys.stdin
+        analysed (list, optional): the position strings of the first positions,
+        analysed by an earlier run. They are checked against the input and left out
+
+    Yields:
+        tuple(int, str): the number of the position, counted from 0, and the position string
+    """
+    index = 0
+    for line_number, line in enumerate(lines, 1):
+        position_str = line.strip()
+        if(not position_str or position_str.startswith('#')):
+            continue
+        if(len(position_str) != 65 or position_str[0] not in 'WB'
+            or not POSITION_CHARACTERS.issuperset(position_str[1:])):
+            raise Exception('line %d is not a position string: %s' % (line_number, position_str))
+        if(index < len(analysed)):
+            if(analysed[index] != position_str):
+                raise Exception('line %d is not the position of record %d of the output' % (line_number, index))
+        else:
+            yield index, position_str
+        index += 1
+    if(index < len(analysed)):
+        raise Exception('the output has more records than the input has positions')
+
+
+def completed_positions(output):
+    """
+    Reads the records of an earlier run of the analysis that can be kept.
+    The records are written in input order, so they are the analyses of the
+    first positions of the input. A last line that was cut off when the run
+    was stopped is removed from the file
+
+    Args:
+        output (str): path of the JSON lines file of the records
+
+    Returns:
+        list: the position strings of the complete records, in order
+    """
+    if(not os.path.exists(output)):
+        return []
+    positions = []
+    complete_bytes = 0
+    with open(output, 'rb') as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if(not line.endswith(b'\n') or record.get('index') != len(positions)):
+                break
+            positions.append(record['position'])
+            complete_bytes += len(line)
+    if(complete_bytes != os.path.getsize(output)):
+        with open(output, 'r+b') as output_file:
+            output_file.truncate(complete_bytes)
+    return positions
+
+
+def _start_worker(config, tt_memory_mb):
+    """
+    Creates the engine of a worker process
+    """
+    global _engine, _config
+    _engine = create_engine(config, tt_memory_mb)
+    _config = config
+
+
+def analyse(task):
+    """
+    Searches one position with the engine of the worker process. Runs in the
+    worker processes, so it takes and returns plain data
+
+    Args:
+        task (tuple): (number of the position, position string)
+
+    Returns:
+        dict: the record of the position: the best move ('pass' if there is none),
+        its score for the player to move, the completed depth, whether the game
+        was solved to the end, the nodes searched and the seconds taken
+    """
+    index, position_str = task
+    started = time.perf_counter()
+    move = _engine.best_move(position_str, _config['time'] or UNLIMITED_TIME)
+    seconds = time.perf_counter() - started
+    search = _engine.search
+    solved = search._is_endgame() and search.completed_depth == search._max_depth
+    nodes = search.nodes + (search._endgame_solver.nodes if solved else 0)
+    return {'index': index, 'position': position_str, 'move': str(move),
+        'score': None if move.is_pass_move else float(move.value), 'depth': search.completed_depth,
+        'solved': solved, 'nodes': nodes, 'seconds': seconds}
+
+
+def run(lines, output, config=None, processes=None, tt_memory_mb=16, log=sys.stderr):
+    """
+    Analyses a stream of positions on a process pool and appends one JSON line
+    per position to the output file, in input order. The positions are
+    searched in parallel and a record is written as soon as it and all the
+    records before it are done. An output file left by an interrupted run
+    is continued from its last complete record
+
+    Args:
+        lines (iterable): the lines of the input, see read_positions
+        output (str): path of the JSON lines file of the records
+        config (dict, optional): the engine configuration with the depth or time
+        budget per position, see OthelloTournament.parse_engine
+        processes (int, optional): number of worker processes, one per processor if not given
+        tt_memory_mb (float, optional): transposition table size of every worker
+        log (file, optional): where progress is reported, None for no output
+
+    Returns:
+        int: the number of positions analysed by this run
+    """
+    if(config is None):
+        config = dict(ENGINE_DEFAULTS, name='analysis')
+    analysed = completed_positions(output)
+    if(analysed and log is not None):
+        print('continuing after %d analysed positions' % len(analysed), file=log, flush=True)
+    count = 0
+    with open(output, 'a') as output_file, multiprocessing.Pool(processes, _start_worker,
+        (config, tt_memory_mb)) as pool:
+        for record in pool.imap(analyse, read_positions(lines, analysed)):
+            print(json.dumps(record), file=output_file, flush=True)
+            count += 1
+            if(log is not None and count % 100 == 0):
+                print('%d positions' % count, file=log, flush=True)
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analyses position strings, one per line, on all processors and '
+        'writes the best move, score, depth and nodes of every position as JSON lines in input order')
+    parser.add_argument('positions', nargs='?', default='-', help='file of position strings, - for stdin')
+    parser.add_argument('--engine', type=parse_engine, default='analysis',
+        help='engine configuration name:key=value,... with keys %s. A time gives the seconds per position, '
+        'otherwise the search goes to the depth' % ', '.join(ENGINE_DEFAULTS))
+    parser.add_argument('--processes', type=int, help='worker processes (default one per processor)')
+    parser.add_argument('--tt-mb', type=float, default=16, help='transposition table size of every worker')
+    parser.add_argument('--output', default='analysis.jsonl',
+        help='file the records are appended to, an unfinished run in it is continued')
+    args = parser.parse_args()
+    if(args.positions == '-'):
+        run(sys.stdin, args.output, args.engine, args.processes, args.tt_mb)
+    else:
+        with open(args.positions) as positions:
+            run(positions, args.output, args.engine, args.processes, args.tt_mb)
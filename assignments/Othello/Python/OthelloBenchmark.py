@@ -0,0 +1,227 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from OthelloABIDSearch import OthelloABIDSearch, PVS
+from OthelloBitboardPosition import OthelloBitboardPosition
+from OthelloEvaluators import EVALUATORS, make_evaluator
+from OthelloMove import OthelloMove
+from OthelloMoveOrdering import OthelloMoveOrdering
+from OthelloPosition import OthelloPosition
+from OthelloTranspositionTable import OthelloTranspositionTable
+
+START_POSITION = "WEEEEEEEEEEEEEEEEEEEEEEEEEEEOXEEEEEEXOEEEEEEEEEEEEEEEEEEEEEEEEEEE"
+
+# Known perft counts from the start position (passes count as a move)
+START_PERFT = [1, 4, 12, 56, 244, 1396, 8200, 55092, 390216, 3005288]
+
+# Midgame positions with their perft counts to depth 1, 2, ... These are not
+# published reference values: they are cross-checked, the counts of
+# OthelloPosition and OthelloBitboardPosition agree with each other and with a
+# separate board scanning perft that shares no code with either backend
+MIDGAME_PERFT = {
+    "BEEOOOEEEEEEEOEEEOOOOOOEEOOXOOXOEEEOOXOOEEEXOOEEEEXXOEEEEXEEEEEEE": [1, 15, 134, 1989, 18511],
+    "WEEEEEEEEEEEXEEEEEEXXOEEEEEXXOOEEEEXOXEEEEEEEXOEEEEEEEEEEEEEEEEEE": [1, 12, 127, 1442, 15606],
+    # Late position with passes in the tree
+    "WOOOXXOOXOOXXEXXXOXOXXOXXOOXXXXXXEXOXXOXXEXXXOXOXEEXXOOOOEEEXEOEX": [1, 7, 40, 197, 1019, 3784, 15511, 41074],
+}
+
+POSITION_CLASSES = {'array': OthelloPosition, 'bitboard': OthelloBitboardPosition}
+
+
+def perft(position, depth, passed=False):
+    """
+    Counts the leaves of the game tree to a fixed depth. A player without
+    moves passes, which counts as a move, and a position where neither player
+    can move is a leaf whatever the depth
+
+    Args:
+        position (OthelloPosition): the root, either backend
+        depth (int): the depth in plies
+        passed (bool, optional): True if the previous player passed
+
+    Returns:
+        int: the number of leaves
+    """
+    if(depth == 0):
+        return 1
+    moves = position.get_moves()
+    if(not moves):
+        if(passed):
+            return 1
+        undo = position.make_move(OthelloMove(is_pass_move=True))
+        leaves = perft(position, depth - 1, True)
+        position.unmake_move(undo)
+        return leaves
+    leaves = 0
+    for move in moves:
+        undo = position.make_move(move)
+        leaves += perft(position, depth - 1)
+        position.unmake_move(undo)
+    return leaves
+
+
+def benchmark_perft(position_class, max_depth):
+    """
+    Runs perft on the start position and the midgame positions and checks
+    the counts
+
+    Args:
+        position_class (type): the backend to benchmark
+        max_depth (int): the deepest perft, positions with fewer known counts
+        stop at their last known count
+
+    Returns:
+        dict: per position and depth the leaves, seconds and correctness, and the
+        overall leaves per second
+    """
+    runs = []
+    for position_str, counts in [(START_POSITION, START_PERFT)] + list(MIDGAME_PERFT.items()):
+        for depth in range(1, min(max_depth, len(counts) - 1) + 1):
+            started = time.perf_counter()
+            leaves = perft(position_class(position_str), depth)
+            runs.append({'position': position_str, 'depth': depth, 'leaves': leaves,
+                'seconds': time.perf_counter() - started, 'correct': leaves == counts[depth]})
+    total_seconds = sum(run['seconds'] for run in runs)
+    return {'runs': runs, 'correct': all(run['correct'] for run in runs),
+        'leaves_per_second': sum(run['leaves'] for run in runs) / total_seconds if total_seconds else 0.0}
+
+
+def benchmark_search(position_class, evaluator, depth, lmr_rank=None):
+    """
+    Searches the midgame positions to a fixed depth with the engine's search
+    settings (PVS, move ordering and a fresh transposition table)
+
+    Args:
+        position_class (type): the backend to search with
+        evaluator (str): name of the evaluation function
+        depth (int): the deepest iteration
+        lmr_rank (int, optional): search with late move reductions from this rank on
+
+    Returns:
+        dict: per position the nodes, the time to reach every depth and the best
+        move, and the overall nodes per second
+    """
+    runs = []
+    for position_str in MIDGAME_PERFT:
+        position = position_class(position_str)
+        player, opponent = ("W", "B") if position.maxPlayer else ("B", "W")
+        started = time.perf_counter()
+        time_to_depth = {}
+
+        def record(completed_depth, move):
+            time_to_depth[completed_depth] = time.perf_counter() - started
+
+        search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), make_evaluator(evaluator, player, opponent),
+            1, depth + 1, True, OthelloTranspositionTable(16), OthelloMoveOrdering(), PVS, iteration_callback=record,
+            lmr_rank=lmr_rank)
+        search.ab_id_search()
+        seconds = time.perf_counter() - started
+        runs.append({'position': position_str, 'nodes': search.nodes, 'seconds': seconds,
+            'nodes_per_second': search.nodes / seconds if seconds else 0.0, 'time_to_depth': time_to_depth,
+            'move': str(search._return_move)})
+    total_seconds = sum(run['seconds'] for run in runs)
+    return {'depth': depth, 'lmr_rank': lmr_rank, 'runs': runs,
+        'nodes_per_second': sum(run['nodes'] for run in runs) / total_seconds if total_seconds else 0.0}
+
+
+def benchmark_evaluation(position_class, evaluator, repeats):
+    """
+    Times the evaluation function on the positions along a fixed game
+
+    Args:
+        position_class (type): the backend the positions are given in
+        evaluator (str): name of the evaluation function
+        repeats (int): how many times every position is evaluated
+
+    Returns:
+        dict: the number of evaluations and the microseconds per evaluation
+    """
+    positions = []
+    position = position_class(START_POSITION)
+    while True:
+        positions.append(position.clone())
+        moves = position.get_moves()
+        if(not moves):
+            break
+        # A fixed game: always the middle move of the list
+        position.make_move(moves[len(moves) // 2])
+    evaluators = {True: make_evaluator(evaluator, "W", "B"), False: make_evaluator(evaluator, "B", "W")}
+    started = time.perf_counter()
+    for repeat in range(repeats):
+        for position in positions:
+            evaluators[position.maxPlayer]._utility_of_result(position)
+    seconds = time.perf_counter() - started
+    evaluations = repeats * len(positions)
+    return {'evaluations': evaluations, 'microseconds_per_evaluation': 1e6 * seconds / evaluations}
+
+
+def _commit():
+    """
+    The git commit the benchmark runs on, so results can be compared between commits
+
+    Returns:
+        str: the commit hash, None outside a git checkout
+    """
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(perft_depth=6, search_depth=5, evaluation_repeats=20, backends=('array', 'bitboard'), evaluators=None,
+    lmr_rank=None):
+    """
+    Runs the whole benchmark suite
+
+    Args:
+        perft_depth (int, optional): the deepest perft
+        search_depth (int, optional): the depth of the search benchmark
+        evaluation_repeats (int, optional): repeats of the evaluation benchmark
+        backends (tuple, optional): names of the backends to benchmark, see POSITION_CLASSES
+        evaluators (list, optional): names of the evaluators to benchmark, all if not given
+        lmr_rank (int, optional): search with late move reductions from this rank on
+
+    Returns:
+        dict: the results, ready to be written as JSON
+    """
+    evaluators = sorted(EVALUATORS) if evaluators is None else evaluators
+    results = {'commit': _commit(), 'python': platform.python_version(), 'time': time.time(), 'backends': {}}
+    for backend in backends:
+        position_class = POSITION_CLASSES[backend]
+        results['backends'][backend] = {
+            'perft': benchmark_perft(position_class, perft_depth),
+            'search': {evaluator: benchmark_search(position_class, evaluator, search_depth, lmr_rank)
+                for evaluator in evaluators},
+            'evaluation': {evaluator: benchmark_evaluation(position_class, evaluator, evaluation_repeats)
+                for evaluator in evaluators},
+        }
+    results['correct'] = all(backend['perft']['correct'] for backend in results['backends'].values())
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Perft, search and evaluation benchmarks, written as JSON')
+    parser.add_argument('--perft-depth', type=int, default=6, help='deepest perft')
+    parser.add_argument('--search-depth', type=int, default=5, help='depth of the search benchmark')
+    parser.add_argument('--evaluation-repeats', type=int, default=20, help='repeats of the evaluation benchmark')
+    parser.add_argument('--backend', action='append', choices=sorted(POSITION_CLASSES),
+        help='backend to benchmark, may be repeated (default all)')
+    parser.add_argument('--evaluator', action='append', choices=sorted(EVALUATORS),
+        help='evaluator to benchmark, may be repeated (default all)')
+    parser.add_argument('--lmr-rank', type=int,
+        help='search with late move reductions of the moves from this rank on (default no reductions)')
+    parser.add_argument('--output', help='file to write the JSON to instead of stdout')
+    args = parser.parse_args()
+    results = run(args.perft_depth, args.search_depth, args.evaluation_repeats,
+        args.backend or sorted(POSITION_CLASSES), args.evaluator, args.lmr_rank)
+    if(args.output):
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    if(not results['correct']):
+        sys.exit('perft counts do not match')
@@ -0,0 +1,488 @@
+import numpy as np
+from OthelloMove import OthelloMove, PASS_MOVE
+from OthelloZobrist import ZOBRIST_WHITE, ZOBRIST_BLACK, ZOBRIST_FLIP, ZOBRIST_WHITE_TO_MOVE, zobrist_hash
+
+# Square (row, col) of the 1-indexed board is stored in bit (row-1)*8 + (col-1)
+FULL_BOARD = 0xFFFFFFFFFFFFFFFF
+# Every square except the first and last column, used to stop horizontal
+# and diagonal fills from wrapping around to the next row
+INNER_COLUMNS = 0x7E7E7E7E7E7E7E7E
+# The first column and the four corners
+FIRST_COLUMN = 0x0101010101010101
+CORNERS = 0x8100000000000081
+# The squares without a neighbour on one side horizontally (first and last
+# column), vertically (first and last row) and diagonally (all of the border)
+EDGE_COLUMNS = FIRST_COLUMN | FIRST_COLUMN << 7
+EDGE_ROWS = 0xFF | 0xFF << 56
+BORDER = EDGE_COLUMNS | EDGE_ROWS
+
+
+def legal_moves(own, opp):
+    """
+    Calculates all legal moves for the player owning the 'own' discs using
+    the directional shift-and-mask fill. For every direction the fill walks
+    from the player's discs over contiguous opponent discs and marks the
+    empty square right behind the run.
+
+    Args:
+        own (int): bitboard of the discs of the player to move
+        opp (int): bitboard of the discs of the opponent
+
+    Returns:
+        int: bitboard with one bit set per legal move
+    """
+    empty = FULL_BOARD ^ (own | opp)
+    inner_opp = opp & INNER_COLUMNS
+    moves = 0
+    for shift, mask in ((1, inner_opp), (8, opp), (7, inner_opp), (9, inner_opp)):
+        flood = (own << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        moves |= (flood << shift) & empty
+
+        flood = (own >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        moves |= (flood >> shift) & empty
+    return moves
+
+
+def flipped_discs(own, opp, square):
+    """
+    Calculates which opponent discs are flipped when the player owning the
+    'own' discs places a disc on square. Uses the same fill as legal_moves,
+    starting from the placed disc instead of from all own discs.
+
+    Args:
+        own (int): bitboard of the discs of the player to move
+        opp (int): bitboard of the discs of the opponent
+        square (int): the square index (0-63) of the placed disc
+
+    Returns:
+        int: bitboard of the discs that change colour
+    """
+    move = 1 << square
+    inner_opp = opp & INNER_COLUMNS
+    flips = 0
+    for shift, mask in ((1, inner_opp), (8, opp), (7, inner_opp), (9, inner_opp)):
+        flood = (move << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        flood |= (flood << shift) & mask
+        if (flood << shift) & own:
+            flips |= flood
+
+        flood = (move >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        flood |= (flood >> shift) & mask
+        if (flood >> shift) & own:
+            flips |= flood
+    return flips
+
+
+def full_lines(filled):
+    """
+    Finds the squares whose line is full in each of the four directions. The
+    filled squares are folded onto themselves along the lines, so that a
+    square stays set only if every square of its line is filled. Works on
+    numpy uint64 arrays of bitboards as well
+
+    Args:
+        filled (int): bitboard of the occupied squares
+
+    Returns:
+        tuple(int, int, int, int): bitboards of the squares on full rows, full
+        columns, full diagonals parallel to the one from (1,8) to (8,1) and full
+        diagonals parallel to the one from (1,1) to (8,8)
+    """
+    rows = filled & (filled >> 1)
+    rows &= rows >> 2
+    rows &= rows >> 4
+    rows = (rows & FIRST_COLUMN) * 0xFF
+
+    columns = filled & (filled >> 8)
+    columns &= columns >> 16
+    columns &= columns >> 32
+    columns = (columns & 0xFF) * FIRST_COLUMN
+
+    # The masks keep the squares whose line ends within the shifted distance
+    down = filled & (0xFF01010101010101 | (filled >> 7))
+    up = filled & (0x80808080808080FF | (filled << 7))
+    down &= 0xFFFF030303030303 | (down >> 14)
+    up &= 0xC0C0C0C0C0C0FFFF | (up << 14)
+    down &= 0xFFFFFFFF0F0F0F0F | (down >> 28)
+    up &= 0xF0F0F0F0FFFFFFFF | (up << 28)
+    diagonals = down & up
+
+    down = filled & (0xFF80808080808080 | (filled >> 9))
+    up = filled & (0x01010101010101FF | (filled << 9))
+    down &= 0xFFFFC0C0C0C0C0C0 | (down >> 18)
+    up &= 0x030303030303FFFF | (up << 18)
+    anti_diagonals = down & up & (0x0F0F0F0FF0F0F0F0 | (down >> 36) | (up << 36))
+    return rows, columns, diagonals, anti_diagonals
+
+
+def stable_discs(own, opp):
+    """
+    Finds the discs of the player owning the 'own' discs that can never be
+    flipped. A disc can only be flipped along a line it has an empty square
+    on, so a disc is stable when in each of the four directions its line is
+    full, it is on the border of the board, or it has a stable disc of its
+    own next to it. The stable discs are grown from those with full lines or
+    on the border, such as the corners, until no more are found
+
+    Args:
+        own (int): bitboard of the discs of the player
+        opp (int): bitboard of the discs of the opponent
+
+    Returns:
+        int: bitboard of the stable discs of the player
+    """
+    rows, columns, diagonals, anti_diagonals = full_lines(own | opp)
+    # The squares that can not be flanked in each direction
+    rows |= EDGE_COLUMNS
+    columns |= EDGE_ROWS
+    diagonals |= BORDER
+    anti_diagonals |= BORDER
+    # Shifted neighbours that wrap around to the next row land on the first or
+    # last column, which are safe horizontally and diagonally anyway
+    stable = own & rows & columns & diagonals & anti_diagonals
+    while True:
+        grown = (own & (rows | stable << 1 | stable >> 1) & (columns | stable << 8 | stable >> 8)
+            & (diagonals | stable << 7 | stable >> 7) & (anti_diagonals | stable << 9 | stable >> 9))
+        if grown == stable:
+            return stable
+        stable = grown
+
+
+def pop_count(bitboard):
+    """
+    Counts the discs (set bits) of a bitboard
+
+    Args:
+        bitboard (int): the bitboard to count
+
+    Returns:
+        int: the number of set bits
+    """
+    return bin(bitboard).count("1")
+
+
+def flip_vertical(bitboard):
+    """
+    Mirrors a bitboard top to bottom (reverses the rows)
+    """
+    return int.from_bytes(bitboard.to_bytes(8, 'little'), 'big')
+
+
+def mirror_horizontal(bitboard):
+    """
+    Mirrors a bitboard left to right (reverses the columns)
+    """
+    bitboard = ((bitboard >> 1) & 0x5555555555555555) | ((bitboard & 0x5555555555555555) << 1)
+    bitboard = ((bitboard >> 2) & 0x3333333333333333) | ((bitboard & 0x3333333333333333) << 2)
+    return ((bitboard >> 4) & 0x0F0F0F0F0F0F0F0F) | ((bitboard & 0x0F0F0F0F0F0F0F0F) << 4)
+
+
+def flip_diagonal(bitboard):
+    """
+    Mirrors a bitboard in the diagonal from (1,1) to (8,8) (swaps rows and columns)
+    """
+    t = 0x0F0F0F0F00000000 & (bitboard ^ (bitboard << 28))
+    bitboard ^= t ^ (t >> 28)
+    t = 0x3333000033330000 & (bitboard ^ (bitboard << 14))
+    bitboard ^= t ^ (t >> 14)
+    t = 0x5500550055005500 & (bitboard ^ (bitboard << 7))
+    bitboard ^= t ^ (t >> 7)
+    return bitboard & FULL_BOARD
+
+
+def transform(bitboard, symmetry):
+    """
+    Applies one of the 8 symmetries of the board to a bitboard
+
+    Args:
+        bitboard (int): the bitboard to transform
+        symmetry (int): 0-7, bit 2 swaps rows and columns, bit 1 reverses
+        the rows and bit 0 reverses the columns
+
+    Returns:
+        int: the transformed bitboard
+    """
+    if(symmetry & 4):
+        bitboard = flip_diagonal(bitboard)
+    if(symmetry & 2):
+        bitboard = flip_vertical(bitboard)
+    if(symmetry & 1):
+        bitboard = mirror_horizontal(bitboard)
+    return bitboard
+
+
+def inverse_transform(bitboard, symmetry):
+    """
+    Undoes transform(bitboard, symmetry)
+
+    Args:
+        bitboard (int): the transformed bitboard
+        symmetry (int): the symmetry that was applied
+
+    Returns:
+        int: the original bitboard
+    """
+    if(symmetry & 1):
+        bitboard = mirror_horizontal(bitboard)
+    if(symmetry & 2):
+        bitboard = flip_vertical(bitboard)
+    if(symmetry & 4):
+        bitboard = flip_diagonal(bitboard)
+    return bitboard
+
+
+class OthelloBitboardPosition(object):
+
+    """
+    Alternative backend to OthelloPosition which represents the board as two
+    64-bit integers, one with the discs of the player to move ('own') and one
+    with the discs of the other player ('opp'). Legal moves and flips are
+    computed with shift-and-mask fills over all squares at once instead of
+    scanning square by square.
+
+    The public interface is the same as OthelloPosition (constructor, get_moves,
+    make_move, clone, to_move, maxPlayer and board) so that it can be used
+    by OthelloABIDSearch and OthelloHeuristics without changes. The Zobrist
+    hash of the position is kept up to date in 'hash'. The evaluation features
+    (see OthelloPosition.feature_counts) are read off the bitboards directly,
+    so they are always available.
+    """
+
+    track_features = True
+
+    def __init__(self, board_str=""):
+        """
+        Creates a new position according to board_str. If board_str is not
+        given all squares are empty
+
+        Args:
+            board_str (str, optional): A string of length 65 representing the board.
+            The first character is W or B, indicating which player is to move.
+            The remaining characters should be E (for empty), O (for white markers),
+            or X (for black markers).
+        """
+        self.BOARD_SIZE = 8
+        self.own = 0
+        self.opp = 0
+        self._max_player = True
+        if len(board_str) >= 65:
+            white = 0
+            black = 0
+            for i in range(1, 65):
+                if board_str[i] == 'O':
+                    white |= 1 << (i - 1)
+                elif board_str[i] == 'X':
+                    black |= 1 << (i - 1)
+            self._max_player = board_str[0] == 'W'
+            if self._max_player:
+                self.own, self.opp = white, black
+            else:
+                self.own, self.opp = black, white
+        self.hash = zobrist_hash(self.white, self.black, self._max_player)
+
+    @property
+    def maxPlayer(self):
+        """
+        True if white has the move. Assigning a new value hands the move to
+        the other player by swapping the own and opp bitboards
+        """
+        return self._max_player
+
+    @maxPlayer.setter
+    def maxPlayer(self, max_player):
+        if max_player != self._max_player:
+            self.own, self.opp = self.opp, self.own
+            self._max_player = max_player
+            self.hash ^= ZOBRIST_WHITE_TO_MOVE
+
+    @property
+    def white(self):
+        """
+        int: bitboard of the white discs
+        """
+        return self.own if self._max_player else self.opp
+
+    @property
+    def black(self):
+        """
+        int: bitboard of the black discs
+        """
+        return self.opp if self._max_player else self.own
+
+    @property
+    def board(self):
+        """
+        The board in the same 10x10 'E'/'W'/'B' array layout that OthelloPosition
+        uses, built from the bitboards on every access
+
+        Returns:
+            numpy: 10x10 array of the board including the frame
+        """
+        white_bits = np.unpackbits(np.frombuffer(self.white.to_bytes(8, 'little'), dtype=np.uint8), bitorder='little')
+        black_bits = np.unpackbits(np.frombuffer(self.black.to_bytes(8, 'little'), dtype=np.uint8), bitorder='little')
+        board = np.full((self.BOARD_SIZE + 2, self.BOARD_SIZE + 2), 'E')
+        board[1:9, 1:9] = np.where(white_bits, 'W', np.where(black_bits, 'B', 'E')).reshape(8, 8)
+        return board
+
+    def feature_counts(self, color):
+        """
+        The evaluation features of one player
+
+        Args:
+            color (str): "W" or "B"
+
+        Returns:
+            tuple: (number of discs, number of corners, discs as a bitboard)
+        """
+        discs = self.white if color == "W" else self.black
+        return pop_count(discs), pop_count(discs & CORNERS), discs
+
+    def initialize(self):
+        """
+        Initializes the position by placing four markers in the middle of the board
+        """
+        # (4,4) and (5,5) are white, (4,5) and (5,4) are black
+        self._max_player = True
+        self.own = (1 << 27) | (1 << 36)
+        self.opp = (1 << 28) | (1 << 35)
+        self.hash = zobrist_hash(self.own, self.opp, True)
+
+    def make_move(self, move):
+        """
+        Perform the move suggested by the OthelloMove move on this position object.
+        Observe that this also changes the player to move next.
+
+        Args:
+            move (OthelloMove): The move to make
+
+        Returns:
+            tuple: undo record (square, flipped discs, maxPlayer and hash before
+            the move) to pass to unmake_move. The square is -1 for a pass move
+        """
+        return self.make_move_square(move.square)
+
+    def make_move_square(self, square):
+        """
+        make_move for a move given as a square index, as the search plays them
+
+        Args:
+            square (int): The square index (row-1)*8 + (col-1) of the move, or PASS_MOVE
+
+        Returns:
+            tuple: the undo record to pass to unmake_move, see make_move
+        """
+        undo = (-1, 0, self._max_player, self.hash)
+        if(square != PASS_MOVE):
+            flips = flipped_discs(self.own, self.opp, square)
+            self.own |= flips | (1 << square)
+            self.opp ^= flips
+            self.move_made = (square // 8 + 1, square % 8 + 1)
+            undo = (square, flips, self._max_player, self.hash)
+
+            key = self.hash ^ (ZOBRIST_WHITE[square] if self._max_player else ZOBRIST_BLACK[square])
+            while flips:
+                low = flips & -flips
+                key ^= ZOBRIST_FLIP[low.bit_length() - 1]
+                flips ^= low
+            self.hash = key
+        self.own, self.opp = self.opp, self.own
+        self._max_player = not self._max_player
+        self.hash ^= ZOBRIST_WHITE_TO_MOVE
+        return undo
+
+    def unmake_move(self, undo):
+        """
+        Takes back a move made with make_move, restoring the discs and the
+        player to move
+
+        Args:
+            undo (tuple): the undo record returned by make_move
+        """
+        square, flips, max_player, key = undo
+        if square >= 0:
+            self.own, self.opp = self.opp ^ flips ^ (1 << square), self.own | flips
+        else:
+            self.own, self.opp = self.opp, self.own
+        self._max_player = max_player
+        self.hash = key
+
+    def get_moves(self):
+        """
+        Get all possible moves for the current position
+
+        Returns:
+            list: OthelloMove's in row-major order. If the list is empty, there are no
+            legal moves for the player who has the move.
+        """
+        moves = []
+        append = moves.append
+        bits = legal_moves(self.own, self.opp)
+        while bits:
+            low = bits & -bits
+            square = low.bit_length() - 1
+            append(OthelloMove(square // 8 + 1, square % 8 + 1))
+            bits ^= low
+        return moves
+
+    def get_move_squares(self):
+        """
+        get_moves with the moves as square indexes, as the search uses them
+
+        Returns:
+            list: the square indexes (row-1)*8 + (col-1) of the legal moves in row-major order
+        """
+        squares = []
+        append = squares.append
+        bits = legal_moves(self.own, self.opp)
+        while bits:
+            low = bits & -bits
+            append(low.bit_length() - 1)
+            bits ^= low
+        return squares
+
+    def to_move(self):
+        """
+        Check which player's turn it is
+
+        Returns:
+            bool: True if the first player (white) has the move, otherwise False
+        """
+        return self._max_player
+
+    def clone(self):
+        """
+        Copy the current position
+
+        Returns:
+            OthelloBitboardPosition: A new position, identical to the current one.
+        """
+        ot = OthelloBitboardPosition("")
+        ot.own = self.own
+        ot.opp = self.opp
+        ot._max_player = self._max_player
+        ot.hash = self.hash
+        return ot
+
+    def print_board(self):
+        """
+        Prints the current board. Do not use when running othellostart (it will crash)
+        """
+        print(self.board)
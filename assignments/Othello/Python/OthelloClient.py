@@ -0,0 +1,74 @@
+import os
+import socket
+import sys
+import tempfile
+import time
+# The time limit counts from the start of the program
+PROGRAM_START = time.monotonic()
+
+# Where OthelloDaemon listens unless told otherwise
+DEFAULT_SOCKET_PATH = os.environ.get('OTHELLO_SOCKET', os.path.join(tempfile.gettempdir(), 'othello-engine.sock'))
+
+# Seconds of the time limit kept back from the daemon, so that there is still
+# time to answer without it when it does not reply. A fallback with less time
+# left than this prints the first legal move instead of starting a search
+FALLBACK_MARGIN = 0.5
+# Seconds between the daemon's deadline and the time the client stops
+# waiting, for the reply to arrive
+REPLY_ALLOWANCE = 0.1
+
+
+def request_move(position_str, time_limit, socket_path=DEFAULT_SOCKET_PATH, start_time=PROGRAM_START):
+    """
+    Asks a running engine daemon for a move. Connecting and waiting for the
+    reply time out FALLBACK_MARGIN seconds before the time limit, a busy or
+    hung daemon counts as no daemon. The daemon gets the time that is left
+    until then, less REPLY_ALLOWANCE, so that a search that uses all of its
+    time still answers before the client stops waiting. The time spent
+    starting this client counts
+
+    Args:
+        position_str (str): 65 character position string
+        time_limit (float): the time limit in seconds
+        socket_path (str, optional): the Unix socket the daemon listens on
+        start_time (float, optional): time.monotonic() of the moment the time limit counts from
+
+    Returns:
+        str: the move on the format (3,6) or pass
+
+    Raises:
+        OSError: no daemon is listening on the socket, it failed or it did not reply in time
+    """
+    remaining = time_limit - (time.monotonic() - start_time)
+    if(remaining <= FALLBACK_MARGIN + REPLY_ALLOWANCE):
+        raise socket.timeout('no time left for the engine daemon')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.settimeout(remaining - FALLBACK_MARGIN)
+        connection.connect(socket_path)
+        connection.sendall(('%s %.3f\n' % (position_str, remaining - FALLBACK_MARGIN - REPLY_ALLOWANCE)).encode())
+        reply = connection.makefile('r').readline().strip()
+    if(not reply or reply.startswith('error')):
+        raise OSError('engine daemon failed: ' + reply)
+    return reply
+
+
+if __name__ == "__main__":
+    # Same command line as Othello.py. Without a daemon the move is searched by
+    # Othello.py in this process instead, with the time that is left
+    arguments = sys.argv[1:]
+    if(len(sys.argv) == 3):
+        try:
+            print(request_move(sys.argv[1], float(sys.argv[2])))
+            sys.exit()
+        except (OSError, socket.timeout):
+            pass
+        remaining = float(sys.argv[2]) - (time.monotonic() - PROGRAM_START)
+        if(remaining <= FALLBACK_MARGIN):
+            from OthelloBitboardPosition import OthelloBitboardPosition
+            from OthelloMove import OthelloMove
+            moves = OthelloBitboardPosition(sys.argv[1]).get_moves()
+            (moves[0] if moves else OthelloMove(is_pass_move=True)).print_move()
+            sys.exit()
+        arguments = [sys.argv[1], '%.3f' % remaining]
+    othello = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Othello.py')
+    os.execv(sys.executable, [sys.executable, othello] + arguments)
@@ -0,0 +1,135 @@
+import argparse
+import os
+import socketserver
+import sys
+import time
+from OthelloClient import DEFAULT_SOCKET_PATH
+from OthelloEngine import OthelloEngine
+from OthelloEvaluators import EVALUATORS, DEFAULT_EVALUATOR
+from OthelloOpeningBook import DEFAULT_BOOK_PATH
+from OthelloSearchStats import OthelloSearchStats
+
+# Request that stops the daemon
+QUIT = 'quit'
+
+
+def handle_request(engine, line, start_time):
+    """
+    Answers one request line of the protocol: a position string and a time
+    limit in seconds separated by a space
+
+    Args:
+        engine (OthelloEngine): the engine that searches the position
+        line (str): the request
+        start_time (float): time.monotonic() of when the request arrived
+
+    Returns:
+        str: the move on the format (3,6) or pass, or 'error' and a description
+    """
+    fields = line.split()
+    if(len(fields) != 2 or len(fields[0]) != 65):
+        return 'error expected <position> <time_limit>'
+    try:
+        time_limit = float(fields[1])
+    except ValueError:
+        return 'error bad time limit ' + fields[1]
+    return str(engine.best_move(fields[0], time_limit, start_time))
+
+
+def serve_stdin(engine, infile=sys.stdin, outfile=sys.stdout, ponder=False):
+    """
+    Answers requests read line by line from a stream until end of file or quit
+
+    Args:
+        engine (OthelloEngine): the engine that searches the positions
+        infile (file, optional): where requests are read from
+        outfile (file, optional): where the moves are written to
+        ponder (bool, optional): search the predicted next position while waiting for it
+    """
+    for line in infile:
+        start_time = time.monotonic()
+        if(line.strip() == QUIT):
+            break
+        if(line.strip()):
+            print(handle_request(engine, line, start_time), file=outfile, flush=True)
+            if(ponder):
+                engine.start_pondering()
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+    """
+    Answers the requests of one client connection, one line each
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            start_time = time.monotonic()
+            line = line.decode().strip()
+            if(line == QUIT):
+                self.server.quit = True
+                break
+            if(line):
+                self.wfile.write((handle_request(self.server.engine, line, start_time) + '\n').encode())
+                self.wfile.flush()
+                if(self.server.ponder):
+                    self.server.engine.start_pondering()
+
+
+def serve_socket(engine, socket_path=DEFAULT_SOCKET_PATH, ponder=False):
+    """
+    Answers requests on a Unix socket until a client sends quit. Connections
+    are served one at a time, a search has the whole machine to itself
+
+    Args:
+        engine (OthelloEngine): the engine that searches the positions
+        socket_path (str, optional): path of the socket to listen on
+        ponder (bool, optional): search the predicted next position while waiting for it
+    """
+    if(os.path.exists(socket_path)):
+        os.unlink(socket_path)
+    server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+    server.engine = engine
+    server.quit = False
+    server.ponder = ponder
+    try:
+        while not server.quit:
+            server.handle_request()
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Long running Othello engine. Reads "<position> <time_limit>" '
+        'lines and answers each with a move, keeping the search tables and the opening book between moves')
+    parser.add_argument('--stdin', action='store_true', help='serve stdin and stdout instead of a Unix socket')
+    parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH, help='path of the Unix socket to listen on')
+    parser.add_argument('--workers', type=int, default=1, help='number of search processes (Lazy SMP)')
+    parser.add_argument('--book', default=DEFAULT_BOOK_PATH, help='opening book file')
+    parser.add_argument('--evaluator', default=DEFAULT_EVALUATOR, choices=sorted(EVALUATORS),
+        help='evaluation function')
+    parser.add_argument('--tt-mb', type=float, default=64, help='transposition table size in megabytes')
+    parser.add_argument('--ponder', action='store_true',
+        help='search the predicted position after the opponent\'s reply while waiting for the next request')
+    parser.add_argument('--stats', action='store_true', help='report every search iteration on stderr')
+    parser.add_argument('--stats-log', help='append every search iteration to this file as JSON lines')
+    args = parser.parse_args()
+    stats = None
+    stats_log = None
+    if(args.stats_log):
+        stats_log = open(args.stats_log, 'a')
+        stats = OthelloSearchStats(stats_log, as_json=True)
+    elif(args.stats):
+        stats = OthelloSearchStats()
+    engine = OthelloEngine(tt_memory_mb=args.tt_mb, workers=args.workers, book_path=args.book,
+        evaluator=args.evaluator, stats=stats)
+    try:
+        if(args.stdin):
+            serve_stdin(engine, ponder=args.ponder)
+        else:
+            serve_socket(engine, args.socket, args.ponder)
+    finally:
+        engine.close()
+        if(stats_log is not None):
+            stats_log.close()
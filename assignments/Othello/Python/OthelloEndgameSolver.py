@@ -0,0 +1,247 @@
+from OthelloBitboardPosition import FULL_BOARD, legal_moves, flipped_discs, pop_count
+from OthelloMove import PASS_MOVE
+from OthelloTimeManager import SearchTimeout
+
+# The four 4x4 quadrants of the board, used as regions for the parity ordering
+QUADRANTS = (0x000000000F0F0F0F, 0x00000000F0F0F0F0, 0x0F0F0F0F00000000, 0xF0F0F0F000000000)
+QUADRANT_OF_SQUARE = [(square // 32) * 2 + (square % 8) // 4 for square in range(64)]
+
+
+def final_score(own, opp):
+    """
+    The disc difference at the end of the game, seen from the 'own' player.
+    Empty squares are counted for the winner.
+
+    Args:
+        own (int): bitboard of the discs of the player to move
+        opp (int): bitboard of the discs of the opponent
+
+    Returns:
+        int: the final disc difference
+    """
+    own_count = pop_count(own)
+    opp_count = pop_count(opp)
+    empties = 64 - own_count - opp_count
+    if(own_count > opp_count):
+        return own_count - opp_count + empties
+    if(own_count < opp_count):
+        return own_count - opp_count - empties
+    return 0
+
+
+class OthelloEndgameSolver(object):
+
+    """
+    Exact solver for positions with few empty squares. Searches the game out
+    to the end with a negamax alpha beta search on the bitboards and scores the
+    final positions by disc difference, so the result is a perfect move and the
+    final score with best play by both players.
+
+    Moves are ordered fastest-first (the move leaving the opponent the fewest
+    replies first) while many squares are empty, and by region parity (moves
+    in quadrants with an odd number of empties first) near the end. The last
+    FEW_EMPTIES squares are solved by trying the empty squares directly instead
+    of generating and ordering moves, with a dedicated case for the last one.
+    """
+
+    # Below this number of empties moves are only ordered by parity
+    FASTEST_FIRST_EMPTIES = 7
+    # Below this number of empties the empty squares are tried directly
+    FEW_EMPTIES = 4
+
+    def __init__(self, max_empties=12):
+        """
+        Instantiates the solver
+
+        Args:
+            max_empties (int, optional): the search switches to the solver when at
+            most this many squares are empty
+        """
+        self.max_empties = max_empties
+        self._is_alive = None
+        self.nodes = 0
+
+    def solve(self, own, opp, is_alive=None):
+        """
+        Solves a position
+
+        Args:
+            own (int): bitboard of the discs of the player to move
+            opp (int): bitboard of the discs of the opponent
+            is_alive (callable, optional): returns False when the search has to
+            stop, polled every 1024 nodes
+
+        Raises:
+            SearchTimeout: is_alive returned False before the position was solved
+
+        Returns:
+            tuple(int, int): the best move as a square index (PASS_MOVE if the
+            player has to pass) and the final disc difference for the player to move
+        """
+        self.nodes = 0
+        self._is_alive = is_alive
+        moves = legal_moves(own, opp)
+        if(not moves):
+            return PASS_MOVE, -self._solve(opp, own, -64, 64, True)
+
+        best_square = PASS_MOVE
+        alpha = -65
+        for square, flips in self._ordered_moves(own, opp, moves):
+            value = -self._solve(opp ^ flips, own | flips | (1 << square), -64, -alpha, False)
+            if(value > alpha):
+                alpha = value
+                best_square = square
+        return best_square, alpha
+
+    def _solve(self, own, opp, alpha, beta, passed):
+        """
+        Negamax alpha beta search to the end of the game
+
+        Args:
+            own (int): bitboard of the discs of the player to move
+            opp (int): bitboard of the discs of the opponent
+            alpha (int): lower bound
+            beta (int): upper bound
+            passed (bool): True if the previous player passed
+
+        Returns:
+            int: the final disc difference for the player to move
+        """
+        self.nodes += 1
+        if(not self.nodes & 1023 and self._is_alive is not None and not self._is_alive()):
+            raise SearchTimeout()
+
+        empty = FULL_BOARD ^ (own | opp)
+        if(pop_count(empty) <= self.FEW_EMPTIES):
+            return self._solve_few(own, opp, alpha, beta, passed, empty)
+
+        moves = legal_moves(own, opp)
+        if(not moves):
+            if(passed):
+                return final_score(own, opp)
+            return -self._solve(opp, own, -beta, -alpha, True)
+
+        best_value = -65
+        for square, flips in self._ordered_moves(own, opp, moves):
+            value = -self._solve(opp ^ flips, own | flips | (1 << square), -beta, -alpha, False)
+            if(value > best_value):
+                best_value = value
+                if(value > alpha):
+                    alpha = value
+                    if(alpha >= beta):
+                        break
+        return best_value
+
+    def _solve_few(self, own, opp, alpha, beta, passed, empty):
+        """
+        Solves the last few empties by trying each empty square directly,
+        squares in odd quadrants first
+
+        Args:
+            own (int): bitboard of the discs of the player to move
+            opp (int): bitboard of the discs of the opponent
+            alpha (int): lower bound
+            beta (int): upper bound
+            passed (bool): True if the previous player passed
+            empty (int): bitboard of the empty squares
+
+        Returns:
+            int: the final disc difference for the player to move
+        """
+        squares = self._parity_ordered_squares(empty)
+        if(len(squares) == 1):
+            return self._solve_last(own, opp, squares[0])
+
+        best_value = -65
+        for square in squares:
+            flips = flipped_discs(own, opp, square)
+            if(not flips):
+                continue
+            self.nodes += 1
+            value = -self._solve_few(opp ^ flips, own | flips | (1 << square), -beta, -alpha, False,
+                empty ^ (1 << square))
+            if(value > best_value):
+                best_value = value
+                if(value > alpha):
+                    alpha = value
+                    if(alpha >= beta):
+                        break
+        if(best_value == -65):
+            if(passed):
+                return final_score(own, opp)
+            return -self._solve_few(opp, own, -beta, -alpha, True, empty)
+        return best_value
+
+    def _solve_last(self, own, opp, square):
+        """
+        Solves a position with one empty square
+
+        Args:
+            own (int): bitboard of the discs of the player to move
+            opp (int): bitboard of the discs of the opponent
+            square (int): the empty square
+
+        Returns:
+            int: the final disc difference for the player to move
+        """
+        self.nodes += 1
+        flips = flipped_discs(own, opp, square)
+        if(flips):
+            return final_score(own | flips | (1 << square), opp ^ flips)
+        flips = flipped_discs(opp, own, square)
+        if(flips):
+            return final_score(own ^ flips, opp | flips | (1 << square))
+        return final_score(own, opp)
+
+    def _ordered_moves(self, own, opp, moves):
+        """
+        Orders the moves fastest-first while many squares are empty and by
+        region parity near the end of the game
+
+        Args:
+            own (int): bitboard of the discs of the player to move
+            opp (int): bitboard of the discs of the opponent
+            moves (int): bitboard of the legal moves
+
+        Returns:
+            list: (square, flipped discs) pairs in search order
+        """
+        empty = FULL_BOARD ^ (own | opp)
+        odd_quadrants = [pop_count(empty & quadrant) & 1 for quadrant in QUADRANTS]
+        fastest_first = pop_count(empty) > self.FASTEST_FIRST_EMPTIES
+        keyed_moves = []
+        while moves:
+            low = moves & -moves
+            square = low.bit_length() - 1
+            moves ^= low
+            flips = flipped_discs(own, opp, square)
+            parity = 1 - odd_quadrants[QUADRANT_OF_SQUARE[square]]
+            if(fastest_first):
+                replies = pop_count(legal_moves(opp ^ flips, own | flips | low))
+                keyed_moves.append((replies, parity, square, flips))
+            else:
+                keyed_moves.append((parity, 0, square, flips))
+        keyed_moves.sort()
+        return [(square, flips) for first_key, second_key, square, flips in keyed_moves]
+
+    def _parity_ordered_squares(self, empty):
+        """
+        Lists the empty squares, the ones in quadrants with an odd number of
+        empties first
+
+        Args:
+            empty (int): bitboard of the empty squares
+
+        Returns:
+            list: the empty squares as square indexes
+        """
+        odd = []
+        even = []
+        for quadrant in QUADRANTS:
+            region = empty & quadrant
+            squares = odd if pop_count(region) & 1 else even
+            while region:
+                low = region & -region
+                squares.append(low.bit_length() - 1)
+                region ^= low
+        return odd + even
@@ -0,0 +1,257 @@
+import threading
+from OthelloABIDSearch import OthelloABIDSearch, PVS
+from OthelloBitboardPosition import OthelloBitboardPosition
+from OthelloEndgameSolver import OthelloEndgameSolver
+from OthelloEvaluators import DEFAULT_EVALUATOR, make_evaluator
+from OthelloLazySMP import OthelloLazySMP
+from OthelloMove import OthelloMove, PASS_MOVE
+from OthelloMoveOrdering import OthelloMoveOrdering
+from OthelloOpeningBook import OthelloOpeningBook, DEFAULT_BOOK_PATH
+from OthelloProbCut import OthelloProbCut
+from OthelloTimeManager import OthelloTimeManager
+from OthelloTranspositionTable import OthelloTranspositionTable
+
+
+class OthelloEngine(object):
+
+    """
+    The search with all of its state that is worth keeping between moves:
+    the transposition table, the history tables of the move ordering, the
+    opening book and the evaluators. Othello.py uses one engine for a single
+    move, OthelloDaemon keeps one alive for a whole session so that every move
+    after the first starts with a warm table and no start-up cost.
+
+    Old table entries are not cleared between moves, only aged (see
+    OthelloTranspositionTable.new_search), so positions searched on the
+    previous move are still found by the next search.
+
+    A long running engine can also ponder: after answering it searches the
+    position after the predicted reply (the second move of the principal
+    variation) in a background thread. If the next position asked for is the
+    predicted one, that search is given the time limit and goes on as the
+    search of the move; otherwise it is stopped and its table entries are
+    all that is left of it.
+    """
+
+    def __init__(self, position_class=OthelloBitboardPosition, tt_memory_mb=64, workers=1, endgame_empties=12,
+        book_path=DEFAULT_BOOK_PATH, evaluator=DEFAULT_EVALUATOR, safety_margin=0.1, min_depth=2, max_depth=30,
+        stats=None, batch_frontier=False, weights_path=None, probcut_path=None, lmr_rank=None):
+        """
+        Instantiates the engine state
+
+        Args:
+            position_class (type, optional): The board backend, OthelloBitboardPosition
+            or the array based OthelloPosition
+            tt_memory_mb (float, optional): Memory budget of the transposition table in megabytes
+            workers (int, optional): Number of searching processes. With more than one, Lazy SMP
+            helpers search alongside the main search on a shared transposition table
+            endgame_empties (int, optional): Solve the game exactly from this many empty squares
+            book_path (str, optional): The opening book file, None or a missing file to always search
+            evaluator (str, optional): Name of the evaluation function, see OthelloEvaluators
+            safety_margin (float, optional): Seconds before the time limit the search stops
+            min_depth (int, optional): the initial depth to start iterative deepening from
+            max_depth (int, optional): the maximum depth to search using iterative deepening
+            stats (OthelloSearchStats, optional): reports every iteration of every search
+            batch_frontier (bool, optional): evaluate the leaves below each node of the last ply
+            in one batch, which pays off when single evaluations are expensive (the array backend)
+            weights_path (str, optional): weight file of the evaluator, see OthelloWeightFitting
+            probcut_path (str, optional): Multi-ProbCut parameter file fitted for the evaluator (see
+            OthelloProbCut), None to search full width
+            lmr_rank (int, optional): reduce the moves from this index of the search order on
+            (late move reductions, see OthelloABIDSearch), None to search every move to full depth
+        """
+        self._position_class = position_class
+        self._workers = workers
+        self._evaluator_name = evaluator
+        self._weights_path = weights_path
+        self._safety_margin = safety_margin
+        self._min_depth = min_depth
+        self._max_depth = max_depth
+        self._stats = stats
+        self._batch_frontier = batch_frontier
+        self._probcut = None if probcut_path is None else OthelloProbCut.load(probcut_path)
+        self._lmr_rank = lmr_rank
+        if(workers > 1):
+            self._transposition_table = OthelloTranspositionTable.create_shared(tt_memory_mb)
+        else:
+            self._transposition_table = OthelloTranspositionTable(tt_memory_mb)
+        self._move_ordering = OthelloMoveOrdering()
+        self._endgame_solver = OthelloEndgameSolver(endgame_empties)
+        self._book = OthelloOpeningBook.open_if_exists(book_path)
+        self._evaluators = {}
+        # Creating the first evaluator here checks the evaluator name and the
+        # weight file before any search starts
+        self._evaluator(True)
+        # The search of the last move, for its statistics
+        self.search = None
+        # The last position answered with its move and principal variation,
+        # what pondering predicts from
+        self._last_answer = None
+        self._ponder_search = None
+        self._ponder_thread = None
+        self._ponder_position = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+
+    def best_move(self, position_str, time_limit, start_time=None):
+        """
+        Finds the move to play in a position, from the opening book or by a
+        search that stops in time to answer within the time limit
+
+        Args:
+            position_str (str): The serialized game string that represents
+            the starting player and the board
+            time_limit (float): The time limit in seconds
+            start_time (float, optional): time.monotonic() of the moment the time
+            limit counts from, now if not given
+
+        Returns:
+            OthelloMove: the move to play, a pass move if there is no legal move
+        """
+        time_manager = OthelloTimeManager(time_limit, self._safety_margin)
+        time_manager.start(start_time)
+        root_position = self._position_class(position_str)
+        self._last_answer = None
+        if(self._book is not None):
+            book_move = self._book.lookup(root_position)
+            if(book_move is not None):
+                self.stop_pondering()
+                return book_move
+
+        if(self._is_ponder_hit(root_position)):
+            self.ponder_hits += 1
+            self.search = self._ponder_search
+            self.search.ponderhit(time_manager)
+            self._ponder_thread.join()
+            self._ponder_search = self._ponder_thread = self._ponder_position = None
+            return_move = self.search._return_move
+        else:
+            if(self._ponder_search is not None):
+                self.ponder_misses += 1
+                self.stop_pondering()
+            return_move = self._search(root_position, time_manager)
+        if(not return_move.is_pass_move):
+            principal_variation = self.search._principal_variation
+            if(principal_variation[:1] != [(return_move.row - 1) * 8 + return_move.col - 1]):
+                principal_variation = []
+            self._last_answer = (root_position, return_move, principal_variation)
+        return return_move
+
+    def _search(self, root_position, time_manager):
+        """
+        Searches a position within the time of the time manager, with Lazy SMP
+        helpers when the engine has more than one worker
+
+        Args:
+            root_position (OthelloPosition): the position to search
+            time_manager (OthelloTimeManager): the started time manager of the move
+
+        Returns:
+            OthelloMove: the move to play
+        """
+        othello_evaluator = self._evaluator(root_position.maxPlayer)
+        self.search = OthelloABIDSearch(root_position, OthelloMove(is_pass_move=True), othello_evaluator,
+            self._min_depth, self._max_depth, True, self._transposition_table, self._move_ordering, PVS,
+            endgame_solver=self._endgame_solver, time_manager=time_manager, stats=self._stats,
+            batch_frontier=self._batch_frontier, probcut=self._probcut, lmr_rank=self._lmr_rank)
+        if(self._workers == 1):
+            self.search.ab_id_search()
+            return self.search._return_move
+
+        lazy_smp = OthelloLazySMP(self._workers, root_position, othello_evaluator, self._transposition_table,
+            self._min_depth, self._max_depth, PVS)
+        lazy_smp.start()
+        try:
+            self.search.ab_id_search()
+        finally:
+            lazy_smp.stop()
+        return_move = self.search._return_move
+        if(not return_move.is_pass_move):
+            helper_depth, helper_move = lazy_smp.best_result()
+            if(helper_depth > self.search.completed_depth):
+                return_move = helper_move
+        return return_move
+
+    def start_pondering(self):
+        """
+        Starts searching the position after the predicted reply to the last
+        answered move in a background thread, without a time limit. The reply
+        is the second move of the principal variation, or a pass when the
+        opponent has no move. Nothing is started when there is no prediction
+        (the move came from the book or the principal variation ends) or
+        when the game is over after the reply. Only the main search ponders,
+        the Lazy SMP helpers wait for the real move
+
+        Returns:
+            bool: True if pondering started
+        """
+        self.stop_pondering()
+        if(self._last_answer is None):
+            return False
+        root_position, move, principal_variation = self._last_answer
+        position = root_position.clone()
+        position.make_move(move)
+        if(not position.get_move_squares()):
+            position.make_move_square(PASS_MOVE)
+        elif(len(principal_variation) >= 2):
+            position.make_move_square(principal_variation[1])
+        else:
+            return False
+        if(not position.get_moves()):
+            return False
+
+        self._ponder_position = (position.white, position.black, position.maxPlayer)
+        self._ponder_search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True),
+            self._evaluator(position.maxPlayer), self._min_depth, self._max_depth, True, self._transposition_table,
+            self._move_ordering, PVS, endgame_solver=self._endgame_solver, stats=self._stats,
+            batch_frontier=self._batch_frontier, probcut=self._probcut, lmr_rank=self._lmr_rank)
+        self._ponder_thread = threading.Thread(target=self._ponder_search.ab_id_search, daemon=True)
+        self._ponder_thread.start()
+        return True
+
+    def stop_pondering(self):
+        """
+        Stops the pondering search, if there is one, and waits for it to return
+        """
+        if(self._ponder_search is not None):
+            self._ponder_search.stop()
+            self._ponder_thread.join()
+            self._ponder_search = self._ponder_thread = self._ponder_position = None
+
+    def _is_ponder_hit(self, position):
+        """
+        Determines if a position is the one being pondered on
+
+        Args:
+            position (OthelloPosition): the position asked for
+
+        Returns:
+            TYPE(Boolean)
+        """
+        return (self._ponder_search is not None
+            and self._ponder_position == (position.white, position.black, position.maxPlayer))
+
+    def _evaluator(self, white_to_move):
+        """
+        The evaluator for the player to move, created once per color
+
+        Args:
+            white_to_move (bool): True if white has the move
+
+        Returns:
+            OthelloHeuristics: the evaluator with the player to move as max player
+        """
+        player, opponent = ("W", "B") if white_to_move else ("B", "W")
+        if(player not in self._evaluators):
+            self._evaluators[player] = make_evaluator(self._evaluator_name, player, opponent, self._weights_path)
+        return self._evaluators[player]
+
+    def close(self):
+        """
+        Stops pondering and releases the opening book and the transposition table
+        """
+        self.stop_pondering()
+        if(self._book is not None):
+            self._book.close()
+            self._book = None
+        self._transposition_table.close(unlink=True)
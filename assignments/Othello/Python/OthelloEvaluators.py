@@ -0,0 +1,41 @@
+from OthelloHeuristics import OthelloHeuristics, load_weights
+from OthelloPatternHeuristics import OthelloPatternHeuristics
+
+# The evaluators that can be selected by name
+EVALUATORS = {
+    'classic': OthelloHeuristics,
+    'pattern': OthelloPatternHeuristics,
+}
+
+# The evaluators that read the weight files of load_weights. The pattern
+# evaluator has a table of WEIGHTS_SIZE weights instead of the per phase
+# feature weights of those files
+WEIGHT_FILE_EVALUATORS = ('classic',)
+
+# The classic features stay the default until a tournament (see
+# OthelloTournament) shows the pattern evaluator to be at least as strong
+DEFAULT_EVALUATOR = 'classic'
+
+
+def make_evaluator(name, max_player, min_player, weights_path=None):
+    """
+    Creates an evaluator by name
+
+    Args:
+        name (str): one of the names in EVALUATORS
+        max_player (str): The max player of the game (not the move) "W" or "B"
+        min_player (str): The min player of the game (not the move) "W" or "B"
+        weights_path (str, optional): weight file of the evaluator (see load_weights), the
+        evaluator's default weights if not given. Only the WEIGHT_FILE_EVALUATORS take one
+
+    Returns:
+        OthelloHeuristics: the evaluator, used through _utility_of_result
+    """
+    if(name not in EVALUATORS):
+        raise Exception('unknown evaluator ' + name + ', expected one of ' + ', '.join(sorted(EVALUATORS)))
+    if(weights_path is not None):
+        if(name not in WEIGHT_FILE_EVALUATORS):
+            raise Exception('evaluator ' + name + ' does not take a weight file, only ' +
+                ', '.join(WEIGHT_FILE_EVALUATORS) + ' do')
+        return EVALUATORS[name](max_player, min_player, load_weights(weights_path))
+    return EVALUATORS[name](max_player, min_player)
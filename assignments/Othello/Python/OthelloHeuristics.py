@@ -1,10 +1,167 @@
+import json
+import os
 import numpy as np
+from OthelloBitboardPosition import (FULL_BOARD, INNER_COLUMNS, CORNERS, EDGE_COLUMNS, EDGE_ROWS, BORDER, full_lines,
+    stable_discs, legal_moves, pop_count)
 from OthelloMove import OthelloMove
 from OthelloPosition import OthelloPosition
 
+
+# The features of the evaluation in the order of their weights
+FEATURES = ('corners', 'mobility', 'stability', 'coins')
+# The hand-set weights of the features, used when there is no weight file
+DEFAULT_MIX = (.3, .2, .25, .25)
+# Weight file loaded by the evaluators when it exists, see OthelloWeightFitting
+DEFAULT_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'othello_weights.json')
+
+_default_mix = None
+
+
+def game_phase(discs, phases):
+    """
+    The phase of a position by the number of discs on the board, the game
+    split into phases of equal length
+
+    Args:
+        discs (int or numpy): the number of discs, 4 to 64
+        phases (int): the number of phases
+
+    Returns:
+        int or numpy: the phase, 0 to phases - 1
+    """
+    return (discs - 4) * phases // 61
+
+
+def load_weights(path):
+    """
+    Reads a weight file: a JSON object with the feature names and one list
+    of feature weights per game phase
+
+    Args:
+        path (str): path of the weight file
+
+    Returns:
+        list: a tuple of weights in FEATURES order for every phase
+    """
+    with open(path) as weight_file:
+        contents = json.load(weight_file)
+    if(tuple(contents.get('features', ())) != FEATURES):
+        raise Exception('%s: expected the features %s' % (path, ', '.join(FEATURES)))
+    weights = [tuple(float(weight) for weight in phase) for phase in contents['weights']]
+    if(not weights or any(len(phase) != len(FEATURES) for phase in weights)):
+        raise Exception('%s: expected %d weights per phase' % (path, len(FEATURES)))
+    return weights
+
+
+def write_weights(path, weights, info=None):
+    """
+    Writes a weight file that load_weights reads
+
+    Args:
+        path (str): path of the weight file
+        weights (list): the weights in FEATURES order of every phase
+        info (dict, optional): more entries to store, such as how the weights were fitted
+    """
+    contents = dict(info or {}, features=list(FEATURES), weights=[[float(weight) for weight in phase]
+        for phase in weights])
+    with open(path, 'w') as weight_file:
+        json.dump(contents, weight_file, indent=2)
+
+
+def default_mix():
+    """
+    The weights of the evaluators that are not given any: the weight file at
+    DEFAULT_WEIGHTS_PATH if there is one, otherwise DEFAULT_MIX. The file is
+    read on first use and shared by all evaluators
+
+    Returns:
+        list: a tuple of weights in FEATURES order for every phase
+    """
+    global _default_mix
+    if(_default_mix is None):
+        _default_mix = load_weights(DEFAULT_WEIGHTS_PATH) if os.path.exists(DEFAULT_WEIGHTS_PATH) else [DEFAULT_MIX]
+    return _default_mix
+
+
+def stack_boards(positions):
+    """
+    Stacks positions into the board array taken by the batch evaluations
+
+    Args:
+        positions (list): OthelloPosition or OthelloBitboardPosition objects
+
+    Returns:
+        numpy: (number of positions, 2) uint64 array of the white and black bitboards
+    """
+    return np.array([(position.white, position.black) for position in positions], dtype=np.uint64).reshape(-1, 2)
+
+
+# Shifts of the four fill directions of legal_moves, as a column so that
+# the fills of all directions run as one array operation
+_SHIFTS = np.array([[1], [8], [7], [9]], dtype=np.uint64)
+
+
+def _batch_legal_moves(own, opp):
+    """
+    legal_moves of OthelloBitboardPosition for arrays of bitboards, with the
+    four directions filled side by side in the rows of one array
+
+    Args:
+        own (numpy): uint64 array of the discs of the players to move
+        opp (numpy): uint64 array of the discs of the opponents
+
+    Returns:
+        numpy: uint64 array of the legal move bitboards
+    """
+    empty = FULL_BOARD ^ (own | opp)
+    inner_opp = opp & INNER_COLUMNS
+    mask = np.stack((inner_opp, opp, inner_opp, inner_opp))
+    moves = np.zeros(len(own), dtype=np.uint64)
+    for shift in (np.left_shift, np.right_shift):
+        flood = shift(own, _SHIFTS) & mask
+        for step in range(5):
+            flood |= shift(flood, _SHIFTS) & mask
+        moves |= np.bitwise_or.reduce(shift(flood, _SHIFTS), axis=0) & empty
+    return moves
+
+
+def _batch_stable_discs(own, opp):
+    """
+    stable_discs of OthelloBitboardPosition for arrays of bitboards. The
+    discs are grown until none of the boards gains a stable disc
+
+    Args:
+        own (numpy): uint64 array of the discs of the players
+        opp (numpy): uint64 array of the discs of the opponents
+
+    Returns:
+        numpy: uint64 array of the stable disc bitboards of the players
+    """
+    rows, columns, diagonals, anti_diagonals = full_lines(own | opp)
+    rows |= EDGE_COLUMNS
+    columns |= EDGE_ROWS
+    diagonals |= BORDER
+    anti_diagonals |= BORDER
+    stable = own & rows & columns & diagonals & anti_diagonals
+    while True:
+        grown = (own & (rows | stable << 1 | stable >> 1) & (columns | stable << 8 | stable >> 8)
+            & (diagonals | stable << 7 | stable >> 7) & (anti_diagonals | stable << 9 | stable >> 9))
+        if((grown == stable).all()):
+            return stable
+        stable = grown
+
+
+def _percentage_difference(max_counts, min_counts):
+    """
+    100 * (max - min) / (max + min) of every pair of counts, 0 where both are 0
+    """
+    total = max_counts + min_counts
+    return np.divide(100 * (max_counts - min_counts), total, out=np.zeros(total.shape), where=total != 0)
+
+
 class OthelloHeuristics(object):
 
-    def __init__(self, max_player, min_player):
+    def __init__(self, max_player, min_player, mix=None):
         """
         Instantiates a heuristics object and stores which color
         player is max and which is min
@@ -12,9 +169,13 @@ class OthelloHeuristics(object):
         Args:
             max_player (str): The max player of the game (not the move) "W" or "B"
             min_player (str): The min player of the game (not the move) "W" or "B"
+            mix (list, optional): the weights of the features in FEATURES order, one tuple
+            per game phase (see game_phase and load_weights), default_mix() if not given
         """
         self.max_player = max_player
         self.min_player = min_player
+        self._mix = default_mix() if mix is None else mix
+        self._mix_array = np.array(self._mix, dtype=np.float64)
 
 
     def _utility_of_result(self, position ):
@@ -27,41 +188,123 @@ class OthelloHeuristics(object):
         Returns:
             OthelloMove: an OthelloMove object with the value estimated
         """
-        board_frameless = position.board[1:9,1:9]
-        #open_spaces = np.sum(board_frameless == "E")
+        return OthelloMove(value=self._utility_value(position))
+
+    def _utility_value(self, position):
+        """
+        The value of _utility_of_result as a plain float, which the search
+        uses so that a leaf does not allocate a move
+
+        Args:
+            position (OthelloPosition): The position to evaluate
+
+        Returns:
+            float: the value estimated for the max player
+        """
+        max_coins, min_coins, max_num_corners, min_num_corners, max_discs, min_discs = self._counts(position)
 
         # Coins
-        max_coins, min_coins = self._utility_coins(board_frameless)
         heuristic_coin = 100 * (max_coins-min_coins ) / (max_coins + min_coins)
 
         # Mobility
-        max_moves, min_moves = self._utility_moves(position)
-        max_moves_len = len(max_moves)
-        min_moves_len = len(min_moves)
+        max_moves_len, min_moves_len = self._utility_moves(max_discs, min_discs)
         if( (max_moves_len + min_moves_len) !=0):
             heuristic_mobility = 100 * (max_moves_len-min_moves_len)/(max_moves_len + min_moves_len)
         else:
             heuristic_mobility = 0
 
         # Corners
-        max_num_corners, min_num_corners = self._utility_corners(board_frameless)
         if((max_num_corners+min_num_corners) !=0):
             heuristic_corners = 100* (max_num_corners-min_num_corners)/(max_num_corners+min_num_corners)
         else:
             heuristic_corners = 0
 
         # Stability
-        max_stab, min_stab = self._utility_stability(board_frameless)
-        max_stab_len = len(max_stab)
-        min_stab_len = len(min_stab)
+        max_stab_len, min_stab_len = self._utility_stability(max_discs, min_discs)
         if((max_stab_len+min_stab_len) !=0):
             heuristic_stability = 100* (max_stab_len-min_stab_len)/(max_stab_len+ min_stab_len)
         else:
             heuristic_stability = 0
 
-        heuristic_total = heuristic_corners*.3 + heuristic_mobility*.2 + heuristic_stability*.25 + heuristic_coin*.25
+        corners_weight, mobility_weight, stability_weight, coin_weight = self._mix[
+            game_phase(max_coins + min_coins, len(self._mix))]
+        heuristic_total = (heuristic_corners*corners_weight + heuristic_mobility*mobility_weight
+            + heuristic_stability*stability_weight + heuristic_coin*coin_weight)
+
+        return heuristic_total
+
+    def _counts(self, position):
+        """
+        The coins, corners and discs of both players. They are read from the
+        feature counts when the position keeps them up to date (track_features)
+        and counted on the board otherwise
 
-        return OthelloMove(value=heuristic_total)
+        Args:
+            position (OthelloPosition): The position to evaluate
+
+        Returns:
+            tuple: max's and min's coins, max's and min's corners, and max's and
+            min's discs as bitboards
+        """
+        if(position.track_features):
+            max_coins, max_num_corners, max_discs = position.feature_counts(self.max_player)
+            min_coins, min_num_corners, min_discs = position.feature_counts(self.min_player)
+            return max_coins, min_coins, max_num_corners, min_num_corners, max_discs, min_discs
+        board_frameless = position.board[1:9,1:9]
+        max_coins, min_coins = self._utility_coins(board_frameless)
+        max_num_corners, min_num_corners = self._utility_corners(board_frameless)
+        white, black = position.white, position.black
+        max_discs, min_discs = (white, black) if self.max_player == "W" else (black, white)
+        return max_coins, min_coins, max_num_corners, min_num_corners, max_discs, min_discs
+
+    def _utility_of_batch(self, boards):
+        """
+        Calculates the value of many boards at once, the same values as
+        _utility_value gives for each of them
+
+        Args:
+            boards (numpy): (n, 2) uint64 array of white and black bitboards, see stack_boards
+
+        Returns:
+            numpy: the n values
+        """
+        features, discs = self._features_of_batch(boards)
+        weights = self._mix_array[game_phase(discs, len(self._mix_array))].T
+        return features[0]*weights[0] + features[1]*weights[1] + features[2]*weights[2] + features[3]*weights[3]
+
+    def _features_of_batch(self, boards):
+        """
+        Calculates the features of many boards at once, each one the
+        percentage difference between the max and the min player. Every
+        feature is computed for all boards and both players in one pass of
+        array operations on the bitboards, so the cost per board shrinks with
+        the size of the batch
+
+        Args:
+            boards (numpy): (n, 2) uint64 array of white and black bitboards, see stack_boards
+
+        Returns:
+            tuple(numpy, numpy): the (4, n) features in FEATURES order and the
+            number of discs of every board
+        """
+        # Row 0 holds the max player's discs and row 1 the min player's, so
+        # that every feature is computed for both players in one operation
+        discs = boards.T if self.max_player == "W" else boards[:, ::-1].T
+        num_coins = np.bitwise_count(discs).astype(np.int64)
+        num_moves = np.bitwise_count(_batch_legal_moves(discs.ravel(), discs[::-1].ravel())).astype(np.int64)
+        num_moves = num_moves.reshape(discs.shape)
+        num_corners = np.bitwise_count(discs & CORNERS).astype(np.int64)
+
+        num_stable = np.bitwise_count(_batch_stable_discs(discs.ravel(), discs[::-1].ravel())).astype(np.int64)
+        num_stable = num_stable.reshape(discs.shape)
+
+        heuristic_coin = _percentage_difference(num_coins[0], num_coins[1])
+        heuristic_mobility = _percentage_difference(num_moves[0], num_moves[1])
+        heuristic_corners = _percentage_difference(num_corners[0], num_corners[1])
+        heuristic_stability = _percentage_difference(num_stable[0], num_stable[1])
+
+        return (np.stack((heuristic_corners, heuristic_mobility, heuristic_stability, heuristic_coin)),
+            num_coins[0] + num_coins[1])
 
     def _utility_coins(self, board_frameless):
         """
@@ -75,30 +318,19 @@ class OthelloHeuristics(object):
         """
         return np.sum(board_frameless == self.max_player), np.sum(board_frameless == self.min_player)
     
-    def _utility_moves(self, position):
+    def _utility_moves(self, max_discs, min_discs):
         """
-        Calculates the number of moves available to max and min players
+        Calculates the number of moves available to max and min players,
+        counted on the bitboards so that no move objects are created
         
         Args:
-            position (OthelloPosition): The position to evaluate
+            max_discs (int): bitboard of the max player's discs
+            min_discs (int): bitboard of the min player's discs
         
         Returns:
             tuple(int, int): num max's moves, num min's moves
         """
-        if( (position.maxPlayer and self.max_player == "W") or 
-            (not position.maxPlayer and self.max_player == "B") ):
-            max_moves = position.get_moves()
-            position.maxPlayer = not position.maxPlayer
-            min_moves = position.get_moves()
-        elif( (position.maxPlayer and self.max_player == "B") or 
-            (not position.maxPlayer and self.max_player == "W")):
-            min_moves = position.get_moves()
-            position.maxPlayer = not position.maxPlayer
-            max_moves = position.get_moves()
-
-        position.maxPlayer = not position.maxPlayer
-
-        return max_moves, min_moves
+        return pop_count(legal_moves(max_discs, min_discs)), pop_count(legal_moves(min_discs, max_discs))
 
     def _utility_corners(self, board_frameless):
         """
@@ -117,70 +349,16 @@ class OthelloHeuristics(object):
         min_corners = np.sum(masked == self.min_player)
         return max_corners, min_corners
 
-    def _utility_stability(self, board_frameless):
+    def _utility_stability(self, max_discs, min_discs):
         """
-        Calculate the "stability" value of each player. In this case,
-        the stability is simply the number of coins along the edge, including
-        corners, that cannot be flipped by the other player
-
-        This implementation uses numpy matrix rotations to evaluate the edges.
-        It essentially only calculates from top left to top right, and then
-        uses the helper function rot_coords to further help with translating
-        the matrix rotations (I found this preferable to keeping track of index pointers)
+        Calculate the "stability" value of each player: the number of discs
+        that can never be flipped, see stable_discs
         
         Args:
-            board_frameless (numpy): An array representation of the board
+            max_discs (int): bitboard of the max player's discs
+            min_discs (int): bitboard of the min player's discs
         
         Returns:
             tuple(int, int): max's "stability" value, min's "stability" value
         """
-        max_stab = set()
-        min_stab = set()
-        for transpose in range(2):
-            for rotation in range(4):
-                token = board_frameless[0,0]
-                if(token != "E"):
-                    stab_set = max_stab if token == self.max_player else min_stab
-                    for col in range(len(board_frameless)):
-                        if(board_frameless[0,col] == token):
-                            coords = self.rot_coords(transpose, rotation,0,col)
-                            stab_set.add(coords)
-                        else:
-                            break
-                board_frameless = np.rot90(board_frameless)
-            board_frameless = board_frameless.T
-        return max_stab, min_stab
-
-    def rot_coords(self, transpose, rotation, row, col):
-        """
-        Helper function to _utility_stability which translates
-        indexes/element-positions from the rotated matrix to the original
-        matrix
-        
-        Args:
-            transpose (int): 0 or 1
-            rotation (int): 0, 1, 2, or 3
-            row (int): the row index of the rotated matrix
-            col (int): the col index of the rotated matrix
-        
-        Returns:
-            tuple(int): the corresponding (row,col) of the original matrix
-        """
-        if(not transpose):
-            if(rotation == 0):
-                return (row, col)
-            elif(rotation == 1):
-                return (col, 7)
-            elif(rotation == 2):
-                return (7, 7-col)
-            else:
-                return (7-col, 0)
-        else:
-            if(rotation == 0):
-                return (col, 0)
-            elif(rotation == 1):
-                return (7, col)
-            elif(rotation == 2):
-                return (7-col, 7)
-            else:
-                return (0, 7-col)
+        return pop_count(stable_discs(max_discs, min_discs)), pop_count(stable_discs(min_discs, max_discs))
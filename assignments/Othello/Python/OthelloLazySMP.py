@@ -0,0 +1,99 @@
+import multiprocessing
+from OthelloABIDSearch import OthelloABIDSearch
+from OthelloMove import OthelloMove
+from OthelloMoveOrdering import OthelloMoveOrdering
+from OthelloTranspositionTable import NO_MOVE
+
+
+def _run_helper(root_position, othello_evaluator, transposition_table, results, min_depth, max_depth, search_mode):
+    """
+    Entry point of a helper process. Runs an ordinary iterative deepening
+    search on the shared transposition table and publishes every completed
+    iteration that is deeper than what the other helpers have reached
+
+    Args:
+        root_position (OthelloPosition): the root of the search
+        othello_evaluator (OthelloHeuristics): the evaluation of the main search
+        transposition_table (OthelloTranspositionTable): the shared table
+        results (multiprocessing.Array): shared [depth, square] of the deepest helper result
+        min_depth (int): the depth the helper starts iterative deepening from
+        max_depth (int): the maximum depth to search using iterative deepening
+        search_mode (str): MINIMAX or PVS
+    """
+    def publish(depth, move):
+        with results.get_lock():
+            if(depth > results[0]):
+                results[0] = depth
+                results[1] = (move.row - 1) * 8 + move.col - 1
+
+    search = OthelloABIDSearch(root_position, OthelloMove(is_pass_move=True), othello_evaluator, min_depth,
+        max_depth, True, transposition_table, OthelloMoveOrdering(), search_mode, iteration_callback=publish)
+    search.ab_id_search()
+
+
+class OthelloLazySMP(object):
+
+    """
+    Lazy SMP parallel search. Helper processes run the same iterative deepening
+    search as the main search on the same root, sharing one transposition table
+    in shared memory. Every other helper starts one ply deeper than the main
+    search, so the helpers fill the table with results the main search can cut
+    off on, and a helper may finish a deeper iteration than the main search
+    before the time runs out.
+
+    The helpers never print anything; the owner asks best_result for the
+    deepest completed helper iteration and compares it to its own.
+    """
+
+    def __init__(self, workers, root_position, othello_evaluator, transposition_table, min_depth, max_depth,
+        search_mode):
+        """
+        Prepares the helpers, they are started by start
+
+        Args:
+            workers (int): total number of searching processes including the main search
+            root_position (OthelloPosition): the root of the search
+            othello_evaluator (OthelloHeuristics): the evaluation of the main search
+            transposition_table (OthelloTranspositionTable): a table created with create_shared
+            min_depth (int): the depth the main search starts iterative deepening from
+            max_depth (int): the maximum depth to search using iterative deepening
+            search_mode (str): MINIMAX or PVS
+        """
+        self._results = multiprocessing.Array('i', [0, NO_MOVE])
+        self._helpers = []
+        for helper in range(workers - 1):
+            process = multiprocessing.Process(target=_run_helper, args=(root_position.clone(), othello_evaluator,
+                transposition_table, self._results, min_depth + 1 + helper % 2, max_depth, search_mode))
+            process.daemon = True
+            self._helpers.append(process)
+
+    def start(self):
+        """
+        Starts the helper processes
+        """
+        for process in self._helpers:
+            process.start()
+
+    def best_result(self):
+        """
+        The deepest iteration completed by any helper
+
+        Returns:
+            tuple(int, OthelloMove): the depth and the best move of that iteration,
+            (0, None) if no helper has completed an iteration yet
+        """
+        with self._results.get_lock():
+            depth, square = self._results[0], self._results[1]
+        if(square == NO_MOVE):
+            return 0, None
+        return depth, OthelloMove(square // 8 + 1, square % 8 + 1)
+
+    def stop(self):
+        """
+        Terminates the helper processes
+        """
+        for process in self._helpers:
+            if(process.is_alive()):
+                process.terminate()
+        for process in self._helpers:
+            process.join()
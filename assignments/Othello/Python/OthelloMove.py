@@ -1,3 +1,7 @@
+# Packed move of the search: the square index (row-1)*8 + (col-1), or PASS_MOVE
+PASS_MOVE = 64
+
+
 class OthelloMove(object):
     """
       Original:
@@ -10,11 +14,15 @@ class OthelloMove(object):
       Modified:
       - added default optional values 
       - added __repr__ function to make it easier in debugging
+      - __slots__, the search works on square indexes and float values and
+        only creates OthelloMove's for the moves it hands out
 
       Original Author: Ola Ringdahl
       Modified by Derek Yadgaroff
     """
 
+    __slots__ = ('row', 'col', 'value', 'is_pass_move')
+
     def __init__(self, row=-1, col=-1, value=0, is_pass_move=False):
         """
         Creates a new OthelloMove for (row, col) with value 0.
@@ -28,15 +36,43 @@ class OthelloMove(object):
         self.value = value
         self.is_pass_move = is_pass_move
 
+    @classmethod
+    def from_square(cls, square, value=0):
+        """
+        Creates the move of a packed square index
+        :param square: The square index (row-1)*8 + (col-1), or PASS_MOVE
+        :param value: estimated value of move
+        :return: The OthelloMove
+        """
+        if square == PASS_MOVE:
+            return cls(value=value, is_pass_move=True)
+        return cls(square // 8 + 1, square % 8 + 1, value)
+
+    @property
+    def square(self):
+        """
+        The packed square index of the move, PASS_MOVE for a pass move
+        :return: The square index
+        """
+        if self.is_pass_move:
+            return PASS_MOVE
+        return (self.row - 1) * 8 + self.col - 1
+
     def print_move(self):
         """
         Prints the move on the format (3,6) or Pass
         :return: Nothing
         """
+        print(str(self))
+
+    def __str__(self):
+        """
+        The move on the format (3,6) or pass, as printed by print_move
+        :return: The move as a string
+        """
         if self.is_pass_move:
-            print("pass")
-        else:
-            print("(" + str(self.row) + "," + str(self.col) + ")")
+            return "pass"
+        return "(" + str(self.row) + "," + str(self.col) + ")"
 
     def __repr__(self):
       if self.is_pass_move:
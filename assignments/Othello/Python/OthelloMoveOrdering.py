@@ -0,0 +1,157 @@
+from OthelloTranspositionTable import NO_MOVE
+
+CORNERS = (0, 7, 56, 63)
+# The squares diagonally next to the corners, which usually give the corner away
+X_SQUARES = (9, 14, 49, 54)
+
+# Static priors used as first sort key for the moves that are not PV, hash or killer moves
+_CORNER_PRIOR = 0
+_DEFAULT_PRIOR = 1
+_X_SQUARE_PRIOR = 2
+_STATIC_PRIORS = [_CORNER_PRIOR if square in CORNERS else
+    _X_SQUARE_PRIOR if square in X_SQUARES else _DEFAULT_PRIOR for square in range(64)]
+
+
+class OthelloMoveOrdering(object):
+
+    """
+    Orders the moves of a position before they are searched, so that alpha
+    beta pruning gets close to its best case. The order is:
+
+    1. the principal variation move of the previous iteration
+    2. the best move stored in the transposition table
+    3. the killer moves of the ply (moves that caused cutoffs in sibling nodes)
+    4. the remaining moves, corners first and X-squares last, and in between
+       by their history score (how often and how deep they caused cutoffs)
+
+    The effectiveness of the ordering can be measured with cutoffs and
+    first_move_cutoffs: in a well ordered tree most cutoffs happen on the first move.
+    """
+
+    def __init__(self, max_ply=64):
+        """
+        Instantiates empty killer and history tables
+
+        Args:
+            max_ply (int, optional): the deepest ply that killer moves are stored for
+        """
+        self._max_ply = max_ply
+        self._killers = [[NO_MOVE, NO_MOVE] for ply in range(max_ply)]
+        # History scores per player to move (index 1 is white) and square
+        self._history = [[0] * 64, [0] * 64]
+        self._principal_variation = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def new_search(self):
+        """
+        Prepares the tables for a search from a new root position. Killer moves
+        are cleared and history scores are aged so recent cutoffs dominate
+        """
+        self._killers = [[NO_MOVE, NO_MOVE] for ply in range(self._max_ply)]
+        for history in self._history:
+            for square in range(64):
+                history[square] >>= 1
+        self._principal_variation = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    def set_principal_variation(self, root_position, squares):
+        """
+        Stores the principal variation of the last completed iteration. Every
+        PV move is remembered together with the hash of the position it is played
+        in, so it is only tried first when the search is back on the PV
+
+        Args:
+            root_position (OthelloPosition): the root of the search
+            squares (list): the PV as square indexes, starting at the root
+        """
+        position = root_position.clone()
+        self._principal_variation = {}
+        for ply, square in enumerate(squares):
+            self._principal_variation[ply] = (position.hash, square)
+            position.make_move_square(square)
+
+    def principal_variation_move(self, position, ply):
+        """
+        The move of the principal variation of the last completed iteration
+        in a position, if the search is on the principal variation
+
+        Args:
+            position (OthelloPosition): the position at the ply
+            ply (int): distance from the root of the search
+
+        Returns:
+            int: the square index of the PV move, NO_MOVE off the principal variation
+        """
+        pv_entry = self._principal_variation.get(ply)
+        if(pv_entry is not None and pv_entry[0] == position.hash):
+            return pv_entry[1]
+        return NO_MOVE
+
+    def order(self, moves, position, ply, hash_move=NO_MOVE):
+        """
+        Sorts the moves of a position in the order they should be searched
+
+        Args:
+            moves (list): the square indexes of the available moves
+            position (OthelloPosition): the position the moves are played in
+            ply (int): distance from the root of the search
+            hash_move (int, optional): square index of the transposition table move
+
+        Returns:
+            list: the square indexes in search order
+        """
+        if(len(moves) < 2):
+            return moves
+        pv_move = self.principal_variation_move(position, ply)
+        killers = self._killers[ply] if ply < self._max_ply else (NO_MOVE, NO_MOVE)
+        history = self._history[position.maxPlayer]
+
+        keyed_moves = []
+        for square in moves:
+            if(square == pv_move):
+                key = (-4, 0)
+            elif(square == hash_move):
+                key = (-3, 0)
+            elif(square == killers[0]):
+                key = (-2, 0)
+            elif(square == killers[1]):
+                key = (-1, 0)
+            else:
+                key = (_STATIC_PRIORS[square], -history[square])
+            keyed_moves.append((key, square))
+        keyed_moves.sort(key=lambda keyed_move: keyed_move[0])
+        return [square for key, square in keyed_moves]
+
+    def record_cutoff(self, square, position, ply, depth, move_index):
+        """
+        Updates the killer and history tables after a move caused a beta cutoff
+
+        Args:
+            square (int): the square index of the move that caused the cutoff
+            position (OthelloPosition): the position the move was played in
+            ply (int): distance from the root of the search
+            depth (int): the remaining depth of the search below the position
+            move_index (int): the index of the move in the search order
+        """
+        self.cutoffs += 1
+        if(move_index == 0):
+            self.first_move_cutoffs += 1
+        self._history[position.maxPlayer][square] += depth * depth
+        if(ply < self._max_ply):
+            killers = self._killers[ply]
+            if(killers[0] != square):
+                killers[1] = killers[0]
+                killers[0] = square
+
+    def first_move_cutoff_rate(self):
+        """
+        The share of cutoffs that happened on the first searched move
+
+        Returns:
+            float: between 0 and 1, 0 if there were no cutoffs
+        """
+        if(self.cutoffs == 0):
+            return 0
+        return self.first_move_cutoffs / self.cutoffs
@@ -0,0 +1,243 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from OthelloABIDSearch import OthelloABIDSearch, PVS
+from OthelloBitboardPosition import OthelloBitboardPosition, FULL_BOARD, legal_moves, transform, inverse_transform
+from OthelloHeuristics import OthelloHeuristics
+from OthelloMove import OthelloMove
+from OthelloMoveOrdering import OthelloMoveOrdering
+from OthelloTranspositionTable import OthelloTranspositionTable
+
+BOOK_MAGIC = b'OTHBOOK1'
+# Magic followed by the number of records
+HEADER = struct.Struct('<8sQ')
+# Canonical position key and best move square (in the canonical orientation)
+RECORD = struct.Struct('<QB')
+
+DEFAULT_BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'othello_book.bin')
+
+
+def _mix(value):
+    """
+    The splitmix64 finalizer, spreads the bits of a 64-bit value
+    """
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & FULL_BOARD
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & FULL_BOARD
+    return value ^ (value >> 31)
+
+
+def canonical_key(own, opp):
+    """
+    Calculates the book key of a position, the same for all 8 symmetric
+    versions of the position
+
+    Args:
+        own (int): bitboard of the discs of the player to move
+        opp (int): bitboard of the discs of the opponent
+
+    Returns:
+        tuple(int, int): the 64-bit key and the symmetry that maps the position
+        to its canonical orientation
+    """
+    best = None
+    for symmetry in range(8):
+        candidate = (transform(own, symmetry), transform(opp, symmetry), symmetry)
+        if(best is None or candidate < best):
+            best = candidate
+    canonical_own, canonical_opp, symmetry = best
+    return _mix(canonical_own ^ _mix(canonical_opp)), symmetry
+
+
+class OthelloOpeningBook(object):
+
+    """
+    Read-only opening book. The book file is a header followed by fixed-size
+    records (canonical position key, best move) sorted by key. Positions are
+    normalised under the 8 board symmetries, so one record covers every
+    rotated and mirrored version of a position.
+
+    The file is memory mapped and searched with a binary search, so a lookup
+    only touches a few pages of the file and the book is never read into
+    memory as a whole. Books are written by build (see the command line at
+    the bottom of this file).
+    """
+
+    def __init__(self, path=DEFAULT_BOOK_PATH):
+        """
+        Opens a book file
+
+        Args:
+            path (str, optional): path of the book file
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._count = HEADER.unpack_from(self._map, 0)
+        if(magic != BOOK_MAGIC):
+            raise Exception('not an opening book: ' + path)
+
+    def __len__(self):
+        return self._count
+
+    @classmethod
+    def open_if_exists(cls, path=DEFAULT_BOOK_PATH):
+        """
+        Opens a book file if there is one
+
+        Args:
+            path (str, optional): path of the book file
+
+        Returns:
+            OthelloOpeningBook: the book, or None if the file does not exist
+        """
+        if(path is None or not os.path.exists(path)):
+            return None
+        return cls(path)
+
+    def close(self):
+        """
+        Closes the book file
+        """
+        self._map.close()
+        self._file.close()
+
+    def lookup(self, position):
+        """
+        Looks up the best move of a position
+
+        Args:
+            position (OthelloPosition): the position, either backend
+
+        Returns:
+            OthelloMove: the book move, or None if the position is not in the book
+        """
+        if(position.maxPlayer):
+            own, opp = position.white, position.black
+        else:
+            own, opp = position.black, position.white
+        key, symmetry = canonical_key(own, opp)
+        low = 0
+        high = self._count - 1
+        while low <= high:
+            middle = (low + high) // 2
+            record_key, canonical_square = RECORD.unpack_from(self._map, HEADER.size + middle * RECORD.size)
+            if(record_key < key):
+                low = middle + 1
+            elif(record_key > key):
+                high = middle - 1
+            else:
+                square = inverse_transform(1 << canonical_square, symmetry).bit_length() - 1
+                if(not (legal_moves(own, opp) >> square) & 1):
+                    return None
+                return OthelloMove(square // 8 + 1, square % 8 + 1)
+        return None
+
+    @staticmethod
+    def write(path, entries):
+        """
+        Writes a book file
+
+        Args:
+            path (str): path of the book file
+            entries (dict): canonical key to best move square in the canonical orientation
+        """
+        with open(path, 'wb') as book_file:
+            book_file.write(HEADER.pack(BOOK_MAGIC, len(entries)))
+            for key in sorted(entries):
+                book_file.write(RECORD.pack(key, entries[key]))
+
+    @classmethod
+    def build(cls, path, plies=12, full_plies=4, games=200, depth=6, seed=0, log=sys.stderr):
+        """
+        Builds a book by deep search. Every position up to full_plies from the
+        start is included, and further positions up to plies come from self-play
+        games. Each distinct position (up to symmetry) is searched once to a
+        fixed depth and its best move is stored. The self-play games start from
+        a random position of the last full ply and play the book move or, every
+        other move on average, a random move so that the games spread out.
+
+        Args:
+            path (str): path of the book file to write
+            plies (int, optional): the deepest ply stored in the book
+            full_plies (int, optional): all positions up to this ply are stored
+            games (int, optional): number of self-play games after the full plies
+            depth (int, optional): search depth for the best move of a position
+            seed (int, optional): seed of the self-play move choices
+            log (file, optional): where progress is reported, None for no output
+        """
+        rng = random.Random(seed)
+        transposition_table = OthelloTranspositionTable(64)
+        entries = {}
+
+        def book_move(position):
+            key, symmetry = canonical_key(position.own, position.opp)
+            if(key not in entries):
+                move = cls._search_move(position, depth, transposition_table)
+                square = (move.row - 1) * 8 + move.col - 1
+                entries[key] = transform(1 << square, symmetry).bit_length() - 1
+                if(log is not None and len(entries) % 100 == 0):
+                    print('%d positions in book' % len(entries), file=log)
+            return entries[key]
+
+        start = OthelloBitboardPosition()
+        start.initialize()
+        frontier = [start]
+        for ply in range(full_plies):
+            next_frontier = {}
+            for position in frontier:
+                book_move(position)
+                for move in position.get_moves():
+                    child = position.clone()
+                    child.make_move(move)
+                    next_frontier.setdefault(canonical_key(child.own, child.opp)[0], child)
+            frontier = list(next_frontier.values())
+
+        for game in range(games):
+            position = rng.choice(frontier).clone()
+            for ply in range(full_plies, plies):
+                moves = position.get_moves()
+                if(not moves):
+                    break
+                square = inverse_transform(1 << book_move(position),
+                    canonical_key(position.own, position.opp)[1]).bit_length() - 1
+                if(rng.random() < 0.5):
+                    position.make_move(OthelloMove(square // 8 + 1, square % 8 + 1))
+                else:
+                    position.make_move(rng.choice(moves))
+
+        cls.write(path, entries)
+        if(log is not None):
+            print('wrote %d positions to %s' % (len(entries), path), file=log)
+
+    @staticmethod
+    def _search_move(position, depth, transposition_table):
+        """
+        Finds the best move of a position with a fixed depth search
+
+        Args:
+            position (OthelloBitboardPosition): the position to search
+            depth (int): the search depth
+            transposition_table (OthelloTranspositionTable): table shared by the searches
+
+        Returns:
+            OthelloMove: the best move
+        """
+        player, opponent = ("W", "B") if position.maxPlayer else ("B", "W")
+        search = OthelloABIDSearch(position.clone(), OthelloMove(is_pass_move=True), OthelloHeuristics(player, opponent),
+            1, depth + 1, True, transposition_table, OthelloMoveOrdering(), PVS)
+        search.ab_id_search()
+        return search._return_move
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Builds an Othello opening book by deep search')
+    parser.add_argument('--output', default=DEFAULT_BOOK_PATH, help='path of the book file to write')
+    parser.add_argument('--plies', type=int, default=12, help='deepest ply stored in the book')
+    parser.add_argument('--full-plies', type=int, default=4, help='all positions up to this ply are stored')
+    parser.add_argument('--games', type=int, default=200, help='number of self-play games after the full plies')
+    parser.add_argument('--depth', type=int, default=6, help='search depth for the book moves')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the self-play move choices')
+    args = parser.parse_args()
+    OthelloOpeningBook.build(args.output, args.plies, args.full_plies, args.games, args.depth, args.seed)
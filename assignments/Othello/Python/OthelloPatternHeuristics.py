@@ -0,0 +1,265 @@
+import numpy as np
+from OthelloBitboardPosition import FULL_BOARD, flip_vertical, mirror_horizontal, flip_diagonal, inverse_transform
+from OthelloHeuristics import OthelloHeuristics
+
+# Base 3 value of every 10-bit mask, with digit 1 for each set bit. The pattern
+# index of max's bits b and min's bits c is then TERNARY[b] + 2 * TERNARY[c]
+TERNARY = [sum(3 ** bit for bit in range(10) if (mask >> bit) & 1) for mask in range(1 << 10)]
+TERNARY_ARRAY = np.array(TERNARY, dtype=np.intp)
+
+# The squares of every pattern in digit order, in the orientation with its
+# corner on (1,1). The other instances of a pattern are read from the board
+# transformed by the other symmetries listed with it (see transform)
+EDGE_SQUARES = [0, 1, 2, 3, 4, 5, 6, 7]
+CORNER_3X3_SQUARES = [0, 1, 2, 8, 9, 10, 16, 17, 18]
+CORNER_2X5_SQUARES = [0, 1, 2, 3, 4, 8, 9, 10, 11, 12]
+DIAGONAL_SQUARES = [0, 9, 18, 27, 36, 45, 54, 63]
+
+# Offsets of the pattern tables in the flat weight array
+EDGE_OFFSET = 0
+CORNER_3X3_OFFSET = EDGE_OFFSET + 3 ** len(EDGE_SQUARES)
+CORNER_2X5_OFFSET = CORNER_3X3_OFFSET + 3 ** len(CORNER_3X3_SQUARES)
+DIAGONAL_OFFSET = CORNER_2X5_OFFSET + 3 ** len(CORNER_2X5_SQUARES)
+WEIGHTS_SIZE = DIAGONAL_OFFSET + 3 ** len(DIAGONAL_SQUARES)
+
+# Table offset, squares and symmetries of every pattern
+PATTERNS = (
+    (EDGE_OFFSET, EDGE_SQUARES, (0, 2, 4, 6)),
+    (CORNER_3X3_OFFSET, CORNER_3X3_SQUARES, (0, 1, 2, 3)),
+    (CORNER_2X5_OFFSET, CORNER_2X5_SQUARES, (0, 1, 2, 3, 4, 5, 6, 7)),
+    (DIAGONAL_OFFSET, DIAGONAL_SQUARES, (0, 1)))
+
+# Classic static square values, used for the default weights
+SQUARE_VALUES = [
+    100, -20, 10, 5, 5, 10, -20, 100,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    10, -2, -1, -1, -1, -1, -2, 10,
+    5, -2, -1, -1, -1, -1, -2, 5,
+    5, -2, -1, -1, -1, -1, -2, 5,
+    10, -2, -1, -1, -1, -1, -2, 10,
+    -20, -50, -2, -2, -2, -2, -50, -20,
+    100, -20, 10, 5, 5, 10, -20, 100]
+# Default value of an edge disc that can not be flipped along the edge
+EDGE_STABILITY_VALUE = 15
+
+_default_weights = None
+
+
+def pattern_coverage():
+    """
+    Counts how many pattern instances cover each square of the board
+
+    Returns:
+        list: 64 counts, one per square index
+    """
+    coverage = [0] * 64
+    for offset, squares, symmetries in PATTERNS:
+        for symmetry in symmetries:
+            for square in squares:
+                coverage[inverse_transform(1 << square, symmetry).bit_length() - 1] += 1
+    return coverage
+
+
+def _edge_stability(index):
+    """
+    The discs of an edge pattern that can not be flipped along the edge,
+    that is the runs of equal discs that start in an occupied corner
+
+    Args:
+        index (int): base 3 index of the edge pattern
+
+    Returns:
+        int: max's stable discs minus min's stable discs
+    """
+    digits = [(index // 3 ** digit) % 3 for digit in range(8)]
+    stable = set()
+    for corner, step in ((0, 1), (7, -1)):
+        square = corner
+        while digits[corner] and 0 <= square < 8 and digits[square] == digits[corner]:
+            stable.add(square)
+            square += step
+    return sum(1 if digits[square] == 1 else -1 for square in stable)
+
+
+def default_weights():
+    """
+    The default pattern weights. Every disc counts the classic static value
+    of its square, divided between the patterns that cover the square, and
+    edge discs that can not be flipped along the edge get a bonus. The table
+    is built on first use and shared by all evaluators
+
+    Returns:
+        list: the flat weight array of WEIGHTS_SIZE values
+    """
+    global _default_weights
+    if(_default_weights is None):
+        coverage = pattern_coverage()
+        weights = []
+        for offset, squares, symmetries in PATTERNS:
+            # The table over the first digits, extended by one digit at a time
+            table = [0.0]
+            for square in squares:
+                value = SQUARE_VALUES[square] / coverage[square]
+                table = [entry + digit_value for digit_value in (0.0, value, -value) for entry in table]
+            if(offset == EDGE_OFFSET):
+                table = [entry + EDGE_STABILITY_VALUE * _edge_stability(index) for index, entry in enumerate(table)]
+            weights.extend(table)
+        _default_weights = weights
+    return _default_weights
+
+
+class OthelloPatternHeuristics(OthelloHeuristics):
+
+    """
+    Pattern based evaluation. The board is cut into patterns (the 4 edges,
+    a 3x3 and two 2x5 blocks at every corner and the 2 long diagonals) and
+    the contents of each pattern are read as a base 3 number that indexes a
+    table of precomputed weights. The value of a position is the sum of the
+    weights of its 18 patterns, so an evaluation is a few mirrorings of the
+    bitboards and a few dozen table lookups instead of the array scans and
+    move generation of OthelloHeuristics.
+
+    The tables of all patterns are kept in one flat list (see the *_OFFSET
+    constants) so that they can be replaced by fitted weights.
+    """
+
+    def __init__(self, max_player, min_player, weights=None):
+        """
+        Instantiates a pattern heuristics object and stores which color
+        player is max and which is min
+
+        Args:
+            max_player (str): The max player of the game (not the move) "W" or "B"
+            min_player (str): The min player of the game (not the move) "W" or "B"
+            weights (list, optional): flat weight array of WEIGHTS_SIZE values,
+            default_weights() if not given
+        """
+        super().__init__(max_player, min_player)
+        if(weights is None):
+            weights = default_weights()
+        if(len(weights) != WEIGHTS_SIZE):
+            raise Exception('expected %d pattern weights, got %d' % (WEIGHTS_SIZE, len(weights)))
+        self._weights = weights
+        self._weight_array = np.array(weights, dtype=np.float64)
+
+    def _utility_value(self, position):
+        """
+        Calculates the value of the board, regardless of who's turn
+
+        Args:
+            position (OthelloPosition): The position to evaluate
+
+        Returns:
+            float: the value estimated for the max player
+        """
+        if(self.max_player == "W"):
+            return self._pattern_value(position.white, position.black)
+        return self._pattern_value(position.black, position.white)
+
+    def _pattern_value(self, max_discs, min_discs):
+        """
+        Sums the pattern weights of a position
+
+        Args:
+            max_discs (int): bitboard of the max player's discs
+            min_discs (int): bitboard of the min player's discs
+
+        Returns:
+            float: the value of the position for the max player
+        """
+        weights = self._weights
+        ternary = TERNARY
+        max_boards = self._symmetries(max_discs)
+        min_boards = self._symmetries(min_discs)
+
+        value = 0.0
+        for symmetry in range(8):
+            own = max_boards[symmetry]
+            opp = min_boards[symmetry]
+            value += weights[CORNER_2X5_OFFSET + ternary[(own & 0x1F) | ((own >> 3) & 0x3E0)]
+                + 2 * ternary[(opp & 0x1F) | ((opp >> 3) & 0x3E0)]]
+            if(symmetry < 4):
+                value += weights[CORNER_3X3_OFFSET + ternary[(own & 7) | ((own >> 5) & 0x38) | ((own >> 10) & 0x1C0)]
+                    + 2 * ternary[(opp & 7) | ((opp >> 5) & 0x38) | ((opp >> 10) & 0x1C0)]]
+            if(not symmetry & 1):
+                value += weights[EDGE_OFFSET + ternary[own & 0xFF] + 2 * ternary[opp & 0xFF]]
+            if(symmetry < 2):
+                value += weights[DIAGONAL_OFFSET + ternary[self._diagonal(own)] + 2 * ternary[self._diagonal(opp)]]
+        return value
+
+    def _utility_of_batch(self, boards):
+        """
+        Calculates the value of many boards at once, the same values as
+        _utility_value gives for each of them (up to rounding, the
+        weights are summed in another order). The symmetries and pattern
+        indices of all boards are computed with array operations on the
+        bitboards and the weights are gathered with one lookup per pattern
+
+        Args:
+            boards (numpy): (n, 2) uint64 array of white and black bitboards, see stack_boards
+
+        Returns:
+            numpy: the n values
+        """
+        # Row 0 holds the max player's discs and row 1 the min player's
+        discs = boards.T if self.max_player == "W" else boards[:, ::-1].T
+        mirrored = mirror_horizontal(discs)
+        # flip_diagonal updates its argument in place when it is an array
+        transposed = flip_diagonal(discs.copy())
+        transposed_mirrored = mirror_horizontal(transposed)
+        # The same order as _symmetries, flip_vertical is a byte swap
+        boards = np.stack((discs, mirrored, discs.byteswap(), mirrored.byteswap(),
+            transposed, transposed_mirrored, transposed.byteswap(), transposed_mirrored.byteswap()))
+
+        weights = self._weight_array
+        value = weights[CORNER_2X5_OFFSET + self._batch_index((boards & 0x1F) | ((boards >> 3) & 0x3E0))].sum(axis=0)
+        corners = boards[:4]
+        value += weights[CORNER_3X3_OFFSET
+            + self._batch_index((corners & 7) | ((corners >> 5) & 0x38) | ((corners >> 10) & 0x1C0))].sum(axis=0)
+        value += weights[EDGE_OFFSET + self._batch_index(boards[::2] & 0xFF)].sum(axis=0)
+        value += weights[DIAGONAL_OFFSET + self._batch_index(self._diagonal(boards[:2]))].sum(axis=0)
+        return value
+
+    @staticmethod
+    def _batch_index(bits):
+        """
+        Pattern indices of an array of pattern bits
+
+        Args:
+            bits (numpy): uint64 array with the max player's bits in row 0 and the
+            min player's bits in row 1 of its second axis
+
+        Returns:
+            numpy: the base 3 indices, with the second axis removed
+        """
+        return TERNARY_ARRAY[bits[:, 0].astype(np.intp)] + 2 * TERNARY_ARRAY[bits[:, 1].astype(np.intp)]
+
+    @staticmethod
+    def _symmetries(bitboard):
+        """
+        Transforms a bitboard by all 8 symmetries of the board
+
+        Args:
+            bitboard (int): the bitboard to transform
+
+        Returns:
+            list: transform(bitboard, symmetry) for symmetry 0-7
+        """
+        mirrored = mirror_horizontal(bitboard)
+        transposed = flip_diagonal(bitboard)
+        transposed_mirrored = mirror_horizontal(transposed)
+        return [bitboard, mirrored, flip_vertical(bitboard), flip_vertical(mirrored),
+            transposed, transposed_mirrored, flip_vertical(transposed), flip_vertical(transposed_mirrored)]
+
+    @staticmethod
+    def _diagonal(bitboard):
+        """
+        Gathers the diagonal from (1,1) to (8,8) into the low 8 bits
+
+        Args:
+            bitboard (int): the bitboard to read
+
+        Returns:
+            int: the diagonal squares, (1,1) in the lowest bit
+        """
+        return (((bitboard & 0x8040201008040201) * 0x0101010101010101) & FULL_BOARD) >> 56
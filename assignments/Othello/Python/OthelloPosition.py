@@ -1,5 +1,56 @@
 import numpy as np
-from OthelloMove import OthelloMove
+from OthelloMove import OthelloMove, PASS_MOVE
+from OthelloZobrist import ZOBRIST_WHITE, ZOBRIST_BLACK, ZOBRIST_FLIP, ZOBRIST_WHITE_TO_MOVE
+
+CORNER_SQUARES = ((1, 1), (1, 8), (8, 1), (8, 8))
+
+# Steps in the flattened board (row * 10 + col) of the eight directions: north,
+# north east, east, south east, south, south west, west and north west
+DIRECTIONS = (-10, -9, 1, 11, 10, 9, -1, -11)
+# Index in the flattened board of every square index (row-1)*8 + (col-1)
+BOARD_INDEX = [(square // 8 + 1) * 10 + square % 8 + 1 for square in range(64)]
+# Square index of every index of the flattened board, -1 on the frame
+SQUARE_INDEX = [-1] * 100
+for _square in range(64):
+    SQUARE_INDEX[BOARD_INDEX[_square]] = _square
+# RAYS[square] holds one tuple per direction with the flattened board indices of
+# the squares from the square to the edge of the board, nearest first. Rays of
+# fewer than two squares can not flip anything and are left out
+RAYS = []
+for _square in range(64):
+    _rays = []
+    for _step in DIRECTIONS:
+        _ray = []
+        _index = BOARD_INDEX[_square] + _step
+        while SQUARE_INDEX[_index] >= 0:
+            _ray.append(_index)
+            _index += _step
+        if len(_ray) >= 2:
+            _rays.append(tuple(_ray))
+    RAYS.append(tuple(_rays))
+# Bitmask (bit square index) of the squares next to every square
+NEIGHBOURS = [sum(1 << SQUARE_INDEX[BOARD_INDEX[_square] + _step] for _step in DIRECTIONS
+    if SQUARE_INDEX[BOARD_INDEX[_square] + _step] >= 0) for _square in range(64)]
+
+
+def ray_flips(cells, ray, own, opponent):
+    """
+    Scans a ray from an empty square for the discs a move on the square flips
+    :param cells: The flattened board
+    :param ray: The flattened board indices of the ray, see RAYS
+    :param own: The color of the player to move, 'W' or 'B'
+    :param opponent: The color of the opponent
+    :return: The number of discs flipped along the ray, the first ones of the ray. 0 if none
+    """
+    if cells[ray[0]] != opponent:
+        return 0
+    for i in range(1, len(ray)):
+        cell = cells[ray[i]]
+        if cell == own:
+            return i
+        if cell != opponent:
+            return 0
+    return 0
 
 
 class OthelloPosition(object):
@@ -12,19 +63,31 @@ class OthelloPosition(object):
     This means that for a standard 8x8 game board, board[1][1] represents the upper left corner,
     board[1][8] the upper right corner, board[8][1] the lower left corner, and board[8][8] the lower left corner.
 
+    The Zobrist hash of the position is kept up to date in 'hash' by make_move and unmake_move.
+
+    The position also keeps the empty squares next to a disc in 'frontier', a bitmask with bit
+    (row-1)*8 + (col-1) for square (row, col), updated by make_move and unmake_move, as only those
+    squares can be moves. 'empty' is the bitmask of all empty squares.
+
+    With track_features the position also keeps count of the discs and corners of each player and
+    the discs of each player as a bitboard, updated as discs are placed and flipped, so that the
+    evaluation can read them with feature_counts (and white and black) instead of scanning the board.
+
     Author: Ola Ringdahl
     """
 
-    def __init__(self, board_str=""):
+    def __init__(self, board_str="", track_features=False):
         """
         Creates a new position according to str. If str is not given all squares are set to E (empty)
         :param board_str: A string of length 65 representing the board. The first character is W or B, indicating which
         player is to move. The remaining characters should be E (for empty), O (for white markers), or X (for black
         markers).
+        :param track_features: Keep the evaluation features up to date in make_move and unmake_move
         """
         self.BOARD_SIZE = 8
         self.maxPlayer = True
         self.board = np.array([['E' for col in range(self.BOARD_SIZE + 2)] for row in range(self.BOARD_SIZE + 2)])
+        self.hash = 0
         if len(list(board_str)) >= 65:
             if board_str[0] == 'W':
                 self.maxPlayer = True
@@ -36,8 +99,16 @@ class OthelloPosition(object):
                 # For convenience we use W and B in the board instead of X and O:
                 if board_str[i] == 'X':
                     self.board[row][col] = 'B'
+                    self.hash ^= ZOBRIST_BLACK[i - 1]
                 elif board_str[i] == 'O':
                     self.board[row][col] = 'W'
+                    self.hash ^= ZOBRIST_WHITE[i - 1]
+        if self.maxPlayer:
+            self.hash ^= ZOBRIST_WHITE_TO_MOVE
+        self.__find_frontier()
+        self.track_features = track_features
+        if track_features:
+            self.__count_features()
 
     def initialize(self):
         """
@@ -49,453 +120,189 @@ class OthelloPosition(object):
         self.board[self.BOARD_SIZE // 2][self.BOARD_SIZE // 2 + 1] = 'B'
         self.board[self.BOARD_SIZE // 2 + 1][self.BOARD_SIZE // 2] = 'B'
         self.maxPlayer = True
+        self.hash = (ZOBRIST_WHITE[27] ^ ZOBRIST_WHITE[36] ^ ZOBRIST_BLACK[28] ^ ZOBRIST_BLACK[35]
+            ^ ZOBRIST_WHITE_TO_MOVE)
+        self.__find_frontier()
+        if self.track_features:
+            self.__count_features()
 
-    def make_move(self, move):
-        """
-        Perform the move suggested by the OhelloMove move on this position object.
-        Observe that this also changes the player to move next.
-        :param move: The move to make as an OthelloMove
-        """
-        
-        if(not move.is_pass_move):
-            row = move.row
-            col = move.col
-
-            flipfuncs = [self.__flip_north, self.__flip_north_east, self.__flip_east,
-                self.__flip_south_east, self.__flip_south, self.__flip_south_west,
-                self.__flip_west, self.__flip_north_west]
-
-            flips = [] 
-            for flipfunc in flipfuncs:
-                result = flipfunc(row,col)
-                if(result):
-                    for flip in result:
-                        flips.append( flip  )
-                    
-            for flip in flips:
-                self.board[flip[0]][flip[1]] = 'W' if self.maxPlayer else 'B'
-
-
-            self.board[move.row][move.col] = 'W' if self.maxPlayer else 'B'
-            self.move_made = (move.row,move.col)
-        self.maxPlayer = not self.maxPlayer
-
-    def __flip_north(self, row, col):
-        """
-        Check if it is possible to do a move to the north from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row - 1, col):
-            return False
-        i = row - 2
-        flips=[]
-        while i > 0:
-            if self.board[i][col] == 'E':
-                return False
-            if self.__is_own_square(i, col):
-                flips.append((i+1,col))
-                return flips
-            flips.append((i+1,col))
-            i -= 1
-        return False
-
-    def __flip_north_east(self, row, col):
-        """
-        Check if it is possible to do a move to the north east from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row - 1, col + 1):
-            return False
-        i = 2
-        flips = []
-        while row - i > 0 and col + i <= self.BOARD_SIZE:
-            if self.board[row - i][col + i] == 'E':
-                return False
-            if self.__is_own_square(row - i, col + i):
-                flips.append((row-i+1,col+i-1))
-                return flips
-            flips.append((row-i+1,col+i-1))
-            i += 1
-        return False
-
-
-    def __flip_north_west(self, row, col):
+    def __find_frontier(self):
         """
-        Check if it is possible to do a move to the north west from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row - 1, col - 1):
-            return False
-        i = 2
-        flips = []
-        while row - i > 0 and col - i > 0:
-            if self.board[row - i][col - i] == 'E':
-                return False
-            if self.__is_own_square(row - i, col - i):
-                flips.append((row-i+1,col-i+1))
-                return flips
-            flips.append((row-i+1,col-i+1))
-            i += 1
-        return False
-
-    def __flip_south(self, row, col):
+        Finds the frontier, the empty squares next to a disc, from scratch
+        :return: Nothing
         """
-        Check if it is possible to do a move to the south from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row + 1, col):
-            return False
-        i = row + 2
-        flips = []
-        while i <= self.BOARD_SIZE:
-            if self.board[i][col] == 'E':
-                return False
-            if self.__is_own_square(i, col):
-                flips.append((i-1,col))
-                return flips
-            flips.append((i-1,col))
-            i += 1
-        return False
+        cells = self.board.ravel().tolist()
+        self.empty = sum(1 << square for square in range(64) if cells[BOARD_INDEX[square]] == 'E')
+        self.frontier = 0
+        for square in range(64):
+            if not self.empty >> square & 1:
+                self.frontier |= NEIGHBOURS[square]
+        self.frontier &= self.empty
 
-    def __flip_south_east(self, row, col):
+    def __count_features(self):
         """
-        Check if it is possible to do a move to the south east from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row + 1, col + 1):
-            return False
-        i = 2
-        flips = []
-        while row + i <= self.BOARD_SIZE and col + i <= self.BOARD_SIZE:
-            if self.board[row + i][col + i] == 'E':
-                return False
-            if self.__is_own_square(row + i, col + i):
-                flips.append((row+i-1,col+i-1))
-                return flips
-            flips.append((row+i-1,col+i-1))
-            i += 1
-        return False
-
-    def __flip_south_west(self, row, col):
+        Counts the evaluation features from scratch
+        :return: Nothing
         """
-        Check if it is possible to do a move to the south west from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row + 1, col - 1):
-            return False
-        i = 2
-        flips = []
-        while row + i <= self.BOARD_SIZE and col - i > 0:
-            if self.board[row + i][col - i] == 'E':
-                return False
-            if self.__is_own_square(row + i, col - i):
-                flips.append((row+i-1,col-i+1))
-                return flips
-            flips.append((row+i-1,col-i+1))
-            i += 1
-        return False
+        self.disc_counts = {'W': 0, 'B': 0}
+        self.corner_counts = {'W': 0, 'B': 0}
+        self.disc_bitboards = {'W': 0, 'B': 0}
+        for row in range(1, self.BOARD_SIZE + 1):
+            for col in range(1, self.BOARD_SIZE + 1):
+                if self.board[row][col] != 'E':
+                    self.__add_disc(self.board[row][col], row, col, 1)
 
-    def __flip_west(self, row, col):
+    def __add_disc(self, color, row, col, sign):
         """
-        Check if it is possible to do a move to the west from this position
+        Updates the evaluation features for a disc that is placed (sign 1) or removed (sign -1)
+        :param color: 'W' or 'B'
         :param row: The row of the board position
         :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row, col - 1):
-            return False
-        i = col - 2
-        flips = []
-        while i > 0:
-            if self.board[row][i] == 'E':
-                return False
-            if self.__is_own_square(row, i):
-                flips.append((row,i+1))
-                return flips
-            flips.append((row,i+1))
-            i -= 1
-        return False
-
-    def __flip_east(self, row, col):
+        :param sign: 1 to add the disc, -1 to remove it
+        :return: Nothing
         """
-        Check if it is possible to do a move to the east from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row, col + 1):
-            return False
-        i = col + 2
-        flips = []
-        while i <= self.BOARD_SIZE:
-            if self.board[row][i] == 'E':
-                return False
-            if self.__is_own_square(row, i):
-                flips.append((row,i-1))
-                return flips
-            flips.append((row,i-1))
-            i += 1
-        return False
+        self.disc_counts[color] += sign
+        if (row, col) in CORNER_SQUARES:
+            self.corner_counts[color] += sign
+        self.disc_bitboards[color] ^= 1 << ((row - 1) * 8 + col - 1)
 
-    def get_moves(self):
+    def feature_counts(self, color):
         """
-        Get all possible moves for the current position
-        :return: A list of OthelloMove representing all possible moves in the position. If the
-        list is empty, there are no legal moves for the player who has the move.
+        The evaluation features of one player, only available with track_features
+        :param color: 'W' or 'B'
+        :return: (number of discs, number of corners, discs) where the discs are a bitboard as
+        white and black give them
         """
-        moves = []
-        append = moves.append
-        for i in range(self.BOARD_SIZE):
-            for j in range(self.BOARD_SIZE):
-                if self.__is_candidate(i + 1, j + 1) and self.__is_move(i + 1, j + 1):
-                    append(OthelloMove(i + 1, j + 1))
-        return moves
+        return self.disc_counts[color], self.corner_counts[color], self.disc_bitboards[color]
 
-    def __is_candidate(self, row, col):
-        """
-        Check if a position is a candidate for a move (empty and has a neighbour)
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is a candidate
+    def make_move(self, move):
         """
-        if self.board[row][col] != 'E':
-            return False
-        if self.__has_neighbour(row, col):
-            return True
-        return False
+        Perform the move suggested by the OhelloMove move on this position object.
+        Observe that this also changes the player to move next.
+        :param move: The move to make as an OthelloMove
+        :return: An undo record (flattened board index of the move, flattened board indices of the
+        flipped discs, maxPlayer, hash, empty and frontier before the move) to pass to unmake_move.
+        The index is None for a pass move
+        """
+        return self.make_move_square(move.square)
+
+    def make_move_square(self, square):
+        """
+        make_move for a move given as a square index, as the search plays them
+        :param square: The square index (row-1)*8 + (col-1) of the move, or PASS_MOVE
+        :return: The undo record to pass to unmake_move, see make_move
+        """
+        undo = (None, [], self.maxPlayer, self.hash, self.empty, self.frontier)
+        if(square != PASS_MOVE):
+            own, opponent = ('W', 'B') if self.maxPlayer else ('B', 'W')
+            flips = []
+            cells = self.board.ravel().tolist()
+            for ray in RAYS[square]:
+                count = ray_flips(cells, ray, own, opponent)
+                if(count):
+                    flips.extend(ray[:count])
+            index = BOARD_INDEX[square]
+            board = self.board.ravel()
+            for flip in flips:
+                board[flip] = own
+            board[index] = own
 
-    def __is_move(self, row, col):
-        """
-        Check if it is possible to do a move from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if row < 1 or row > self.BOARD_SIZE or col < 1 or col > self.BOARD_SIZE:
-            return False
-        if self.__check_north(row, col):
-            return True
-        if self.__check_north_east(row, col):
-            return True
-        if self.__check_east(row, col):
-            return True
-        if self.__check_south_east(row, col):
-            return True
-        if self.__check_south(row, col):
-            return True
-        if self.__check_south_west(row, col):
-            return True
-        if self.__check_west(row, col):
-            return True
-        if self.__check_north_west(row, col):
-            return True
+            self.move_made = (square // 8 + 1, square % 8 + 1)
+            undo = (index, flips, self.maxPlayer, self.hash, self.empty, self.frontier)
+            self.empty ^= 1 << square
+            self.frontier = (self.frontier | NEIGHBOURS[square]) & self.empty
+            if self.track_features:
+                self.__update_features(index, flips, self.maxPlayer, 1)
 
-    def __check_north(self, row, col):
-        """
-        Check if it is possible to do a move to the north from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row - 1, col):
-            return False
-        i = row - 2
-        while i > 0:
-            if self.board[i][col] == 'E':
-                return False
-            if self.__is_own_square(i, col):
-                return True
-            i -= 1
-        return False
+            self.hash ^= ZOBRIST_WHITE[square] if self.maxPlayer else ZOBRIST_BLACK[square]
+            for flip in flips:
+                self.hash ^= ZOBRIST_FLIP[SQUARE_INDEX[flip]]
+        self.maxPlayer = not self.maxPlayer
+        self.hash ^= ZOBRIST_WHITE_TO_MOVE
+        return undo
 
-    def __check_north_east(self, row, col):
+    def unmake_move(self, undo):
         """
-        Check if it is possible to do a move to the north east from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row - 1, col + 1):
-            return False
-        i = 2
-        while row - i > 0 and col + i <= self.BOARD_SIZE:
-            if self.board[row - i][col + i] == 'E':
-                return False
-            if self.__is_own_square(row - i, col + i):
-                return True
-            i += 1
-        return False
-
-    def __check_north_west(self, row, col):
+        Takes back a move made with make_move, restoring the board and the player to move
+        :param undo: The undo record returned by make_move
+        :return: Nothing
         """
-        Check if it is possible to do a move to the north west from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row - 1, col - 1):
-            return False
-        i = 2
-        while row - i > 0 and col - i > 0:
-            if self.board[row - i][col - i] == 'E':
-                return False
-            if self.__is_own_square(row - i, col - i):
-                return True
-            i += 1
-        return False
-
-    def __check_south(self, row, col):
+        index, flips, max_player, key, self.empty, self.frontier = undo
+        if index is not None:
+            board = self.board.ravel()
+            board[index] = 'E'
+            opponent = 'B' if max_player else 'W'
+            for flip in flips:
+                board[flip] = opponent
+            if self.track_features:
+                self.__update_features(index, flips, max_player, -1)
+        self.maxPlayer = max_player
+        self.hash = key
+
+    def __update_features(self, index, flips, max_player, sign):
+        """
+        Updates the evaluation features for a move (sign 1) or for taking it back (sign -1)
+        :param index: The flattened board index of the placed disc
+        :param flips: The flattened board indices of the flipped discs
+        :param max_player: True if white made the move
+        :param sign: 1 for make_move, -1 for unmake_move
+        :return: Nothing
         """
-        Check if it is possible to do a move to the south from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row + 1, col):
-            return False
-        i = row + 2
-        while i <= self.BOARD_SIZE:
-            if self.board[i][col] == 'E':
-                return False
-            if self.__is_own_square(i, col):
-                return True
-            i += 1
-        return False
+        player, opponent = ('W', 'B') if max_player else ('B', 'W')
+        self.__add_disc(player, index // 10, index % 10, sign)
+        for flip in flips:
+            self.__add_disc(player, flip // 10, flip % 10, sign)
+            self.__add_disc(opponent, flip // 10, flip % 10, -sign)
 
-    def __check_south_east(self, row, col):
+    def get_moves(self):
         """
-        Check if it is possible to do a move to the south east from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row + 1, col + 1):
-            return False
-        i = 2
-        while row + i <= self.BOARD_SIZE and col + i <= self.BOARD_SIZE:
-            if self.board[row + i][col + i] == 'E':
-                return False
-            if self.__is_own_square(row + i, col + i):
-                return True
-            i += 1
-        return False
-
-    def __check_south_west(self, row, col):
+        Get all possible moves for the current position
+        :return: A list of OthelloMove representing all possible moves in the position. If the
+        list is empty, there are no legal moves for the player who has the move.
         """
-        Check if it is possible to do a move to the south west from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row + 1, col - 1):
-            return False
-        i = 2
-        while row + i <= self.BOARD_SIZE and col - i > 0:
-            if self.board[row + i][col - i] == 'E':
-                return False
-            if self.__is_own_square(row + i, col - i):
-                return True
-            i += 1
-        return False
+        return [OthelloMove.from_square(square) for square in self.get_move_squares()]
 
-    def __check_west(self, row, col):
+    def get_move_squares(self):
         """
-        Check if it is possible to do a move to the west from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row, col - 1):
-            return False
-        i = col - 2
-        while i > 0:
-            if self.board[row][i] == 'E':
-                return False
-            if self.__is_own_square(row, i):
-                return True
-            i -= 1
-        return False
-
-    def __check_east(self, row, col):
+        get_moves with the moves as square indexes, as the search uses them. A frontier
+        square is a move if ray_flips finds discs to flip along one of its RAYS
+        :return: The square indexes (row-1)*8 + (col-1) of all possible moves in row-major order
         """
-        Check if it is possible to do a move to the east from this position
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it is possible to do a move
-        """
-        if not self.__is_opponent_square(row, col + 1):
-            return False
-        i = col + 2
-        while i <= self.BOARD_SIZE:
-            if self.board[row][i] == 'E':
-                return False
-            if self.__is_own_square(row, i):
-                return True
-            i += 1
-        return False
+        own, opponent = ('W', 'B') if self.maxPlayer else ('B', 'W')
+        cells = self.board.ravel().tolist()
+        squares = []
+        frontier = self.frontier
+        while frontier:
+            bit = frontier & -frontier
+            frontier ^= bit
+            square = bit.bit_length() - 1
+            for ray in RAYS[square]:
+                if cells[ray[0]] == opponent and ray_flips(cells, ray, own, opponent):
+                    squares.append(square)
+                    break
+        return squares
 
-    def __is_opponent_square(self, row, col):
+    @property
+    def white(self):
         """
-        Check if the position is occupied by the opponent
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if opponent square
+        The white discs as a bitboard, square (row, col) in bit (row-1)*8 + (col-1)
+        :return: The bitboard as an int
         """
-        if self.maxPlayer and self.board[row][col] == 'B':
-            return True
-        if not self.maxPlayer and self.board[row][col] == 'W':
-            return True
-        return False
+        if self.track_features:
+            return self.disc_bitboards['W']
+        bits = (self.board[1:9, 1:9] == 'W').ravel()
+        return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
 
-    def __is_own_square(self, row, col):
+    @property
+    def black(self):
         """
-        Check if the position is occupied by the player
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if it's your own square
-        """
-        if not self.maxPlayer and self.board[row][col] == 'B':
-            return True
-        if self.maxPlayer and self.board[row][col] == 'W':
-            return True
-        return False
-
-    def __has_neighbour(self, row, col):
+        The black discs as a bitboard, square (row, col) in bit (row-1)*8 + (col-1)
+        :return: The bitboard as an int
         """
-        Check if the position has any non-empty squares
-        :param row: The row of the board position
-        :param col: The column of the board position
-        :return: True if has neighbours
-        """
-        if self.board[row - 1][col] != 'E':
-            return True
-        if self.board[row - 1, col + 1] != 'E':
-            return True
-        if self.board[row - 1][col - 1] != 'E':
-            return True
-        if self.board[row][col - 1] != 'E':
-            return True
-        if self.board[row][col + 1] != 'E':
-            return True
-        if self.board[row + 1][col - 1] != 'E':
-            return True
-        if self.board[row + 1][col + 1] != 'E':
-            return True
-        if self.board[row + 1][col] != 'E':
-            return True
-        return False
+        if self.track_features:
+            return self.disc_bitboards['B']
+        bits = (self.board[1:9, 1:9] == 'B').ravel()
+        return int.from_bytes(np.packbits(bits, bitorder='little').tobytes(), 'little')
 
     def to_move(self):
         """
@@ -512,6 +319,14 @@ class OthelloPosition(object):
         ot = OthelloPosition("")
         ot.board = np.copy(self.board)
         ot.maxPlayer = self.maxPlayer
+        ot.hash = self.hash
+        ot.empty = self.empty
+        ot.frontier = self.frontier
+        ot.track_features = self.track_features
+        if self.track_features:
+            ot.disc_counts = dict(self.disc_counts)
+            ot.corner_counts = dict(self.corner_counts)
+            ot.disc_bitboards = dict(self.disc_bitboards)
         return ot
 
     def print_board(self):
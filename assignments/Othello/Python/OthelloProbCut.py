@@ -0,0 +1,199 @@
+import argparse
+import json
+import sys
+import numpy as np
+
+# How many standard deviations of the regression error a shallow search has
+# to clear before the deep search is cut
+DEFAULT_THRESHOLD = 1.5
+# Fewest samples of a depth pair to fit it
+MIN_SAMPLES = 20
+
+
+class OthelloProbCut(object):
+
+    """
+    Parameters of Multi-ProbCut: for a search of some depth, one or more
+    shallower depths whose values predict the value of the deep search as
+
+        deep value = slope * shallow value + intercept, with error sigma
+
+    The search runs a null-window search to the shallow depth and cuts the
+    node when the predicted deep value is outside the window by more than
+    threshold * sigma. With several shallow depths for a depth the cheapest
+    is tried first. Depths count the plies to the horizon of the node; an
+    iteration that OthelloSearchStats reports as depth d searches d + 1 plies.
+
+    The values are from the point of view of the player to move at the root
+    of the logged searches. The evaluators are antisymmetric, so for the other
+    player the same slope and sigma hold with the intercept negated.
+    """
+
+    def __init__(self, pairs, threshold=DEFAULT_THRESHOLD):
+        """
+        Instantiates the parameters
+
+        Args:
+            pairs (dict): deep depth to a list of (shallow depth, slope, intercept, sigma),
+            shallowest first
+            threshold (float, optional): the number of sigmas a cut must clear
+        """
+        self.threshold = threshold
+        self._pairs = {depth: sorted(depth_pairs) for depth, depth_pairs in pairs.items()}
+
+    def pairs(self, depth):
+        """
+        The shallow searches that can cut a search of a depth
+
+        Args:
+            depth (int): plies to the horizon
+
+        Returns:
+            list: (shallow depth, slope, intercept, sigma) tuples, shallowest first,
+            empty if the depth has no fitted pair
+        """
+        return self._pairs.get(depth, ())
+
+    @classmethod
+    def load(cls, path, threshold=None):
+        """
+        Reads a parameter file written by write
+
+        Args:
+            path (str): path of the parameter file
+            threshold (float, optional): overrides the threshold of the file
+
+        Returns:
+            OthelloProbCut: the parameters
+        """
+        with open(path) as parameter_file:
+            contents = json.load(parameter_file)
+        pairs = {}
+        for pair in contents['pairs']:
+            pairs.setdefault(pair['depth'], []).append((pair['shallow'], pair['slope'], pair['intercept'],
+                pair['sigma']))
+        return cls(pairs, contents.get('threshold', DEFAULT_THRESHOLD) if threshold is None else threshold)
+
+    def write(self, path, samples=None):
+        """
+        Writes the parameters as JSON
+
+        Args:
+            path (str): path of the parameter file
+            samples (dict, optional): (depth, shallow depth) to the number of samples
+            of the fit, stored for reference
+        """
+        pairs = [{'depth': depth, 'shallow': shallow, 'slope': slope, 'intercept': intercept, 'sigma': sigma,
+            'samples': (samples or {}).get((depth, shallow))}
+            for depth in sorted(self._pairs) for shallow, slope, intercept, sigma in self._pairs[depth]]
+        with open(path, 'w') as parameter_file:
+            json.dump({'threshold': self.threshold, 'pairs': pairs}, parameter_file, indent=2)
+
+
+def read_searches(paths):
+    """
+    Reads the root values of logged searches from OthelloSearchStats JSON
+    lines (--stats-log). A search is a run of iterations of growing depth;
+    the endgame solutions are left out
+
+    Args:
+        paths (list): paths of the log files
+
+    Yields:
+        dict: plies to the value of the iteration of one search
+    """
+    for path in paths:
+        values = {}
+        with open(path) as log:
+            for line in log:
+                if(not line.strip()):
+                    continue
+                record = json.loads(line)
+                if(record['exact']):
+                    continue
+                plies = record['depth'] + 1
+                if(values and plies <= max(values)):
+                    yield values
+                    values = {}
+                values[plies] = record['value']
+        if(values):
+            yield values
+
+
+def default_pairs(max_depth):
+    """
+    The depth pairs fitted when none are asked for: every depth from 3 plies
+    with the depths 2 and 4 plies shallower, which have the same parity so
+    that the odd-even swing of the evaluation does not blur the fit
+
+    Args:
+        max_depth (int): the deepest depth in plies
+
+    Returns:
+        list: (depth, shallow depth) pairs
+    """
+    return [(depth, depth - gap) for depth in range(3, max_depth + 1) for gap in (4, 2) if depth - gap >= 1]
+
+
+def fit(paths, pairs=None, threshold=DEFAULT_THRESHOLD, min_samples=MIN_SAMPLES):
+    """
+    Fits the linear regression of every depth pair to logged searches
+
+    Args:
+        paths (list): paths of OthelloSearchStats JSON lines logs
+        pairs (list, optional): (depth, shallow depth) pairs in plies, default_pairs
+        of the deepest logged depth if not given
+        threshold (float, optional): the threshold stored with the parameters
+        min_samples (int, optional): pairs with fewer samples are left out
+
+    Returns:
+        tuple(OthelloProbCut, dict): the parameters and the number of samples of every fitted pair
+    """
+    searches = list(read_searches(paths))
+    if(pairs is None):
+        pairs = default_pairs(max((max(values) for values in searches), default=0))
+    fitted = {}
+    counts = {}
+    for depth, shallow in pairs:
+        samples = np.array([(values[shallow], values[depth]) for values in searches
+            if shallow in values and depth in values], dtype=np.float64).reshape(-1, 2)
+        if(len(samples) < min_samples):
+            continue
+        slope, intercept = np.polyfit(samples[:, 0], samples[:, 1], 1)
+        # A shallow search that does not predict the deep one can not cut
+        if(slope <= 0):
+            continue
+        sigma = float(np.std(samples[:, 1] - (slope * samples[:, 0] + intercept), ddof=2))
+        fitted.setdefault(depth, []).append((shallow, float(slope), float(intercept), sigma))
+        counts[(depth, shallow)] = len(samples)
+    return OthelloProbCut(fitted, threshold), counts
+
+
+def _parse_pair(text):
+    """
+    Parses a depth pair from the command line format depth:shallow
+    """
+    depth, shallow = text.split(':')
+    if(int(shallow) >= int(depth)):
+        raise ValueError('the shallow depth must be below the depth')
+    return int(depth), int(shallow)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fits the Multi-ProbCut parameters to search logs '
+        '(JSON lines written with --stats-log) and writes a parameter file')
+    parser.add_argument('logs', nargs='+', help='search log files')
+    parser.add_argument('--output', default='othello_probcut.json', help='parameter file to write')
+    parser.add_argument('--pair', action='append', type=_parse_pair,
+        help='depth:shallow in plies, given once per pair (default every depth with the depths 2 and 4 below)')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+        help='standard deviations a shallow search must clear to cut')
+    parser.add_argument('--min-samples', type=int, default=MIN_SAMPLES, help='fewest samples to fit a pair')
+    args = parser.parse_args()
+    probcut, counts = fit(args.logs, args.pair, args.threshold, args.min_samples)
+    for (depth, shallow), count in sorted(counts.items()):
+        shallow, slope, intercept, sigma = next(pair for pair in probcut.pairs(depth) if pair[0] == shallow)
+        print('%d from %d plies: %d samples, slope %.3f, intercept %.3f, sigma %.3f' % (depth, shallow, count,
+            slope, intercept, sigma), file=sys.stderr)
+    probcut.write(args.output, counts)
+    print('wrote %s' % args.output, file=sys.stderr)
@@ -0,0 +1,132 @@
+import json
+import sys
+import time
+
+
+def _square_str(square):
+    """
+    Formats a square index as a move on the format (3,6)
+    """
+    return "(" + str(square // 8 + 1) + "," + str(square % 8 + 1) + ")"
+
+
+class OthelloSearchStats(object):
+
+    """
+    Reports what the search did in every completed iteration: nodes, leaf
+    evaluations, beta cutoffs and how many of them came on the first move,
+    transposition table hits, ProbCut cuts, late move reductions and their
+    re-searches, the effective branching factor,
+    the elapsed time and the principal variation.
+
+    The search keeps its counters whether or not it has a stats object, they
+    are plain integer increments, and only hands them over here once per
+    iteration, so the recursion does not pay for the reporting. Records go
+    to a stream (stderr by default, never stdout where the move is printed)
+    as text or as JSON lines, and are kept in 'iterations'.
+    """
+
+    def __init__(self, stream=sys.stderr, as_json=False):
+        """
+        Instantiates the reporter
+
+        Args:
+            stream (file, optional): where the records are written, None to only keep them
+            as_json (bool, optional): write one JSON object per line instead of text
+        """
+        self._stream = stream
+        self._as_json = as_json
+        self.iterations = []
+
+    def start_search(self, search):
+        """
+        Called by the search when it starts on a new root
+
+        Args:
+            search (OthelloABIDSearch): the search
+        """
+        self.iterations = []
+        self._started = time.perf_counter()
+        self._last_counters = self._counters(search)
+
+    def record_iteration(self, search):
+        """
+        Called by the search after every completed iteration
+
+        Args:
+            search (OthelloABIDSearch): the search
+        """
+        counters = self._counters(search)
+        record = {name: counters[name] - self._last_counters[name] for name in counters}
+        self._last_counters = counters
+        record['depth'] = search.completed_depth
+        record['exact'] = False
+        self._report(search, record)
+
+    def record_endgame(self, search, solver_nodes):
+        """
+        Called by the search when the endgame solver has solved the root
+
+        Args:
+            search (OthelloABIDSearch): the search
+            solver_nodes (int): the nodes searched by the solver
+        """
+        record = {name: 0 for name in self._last_counters}
+        record['nodes'] = solver_nodes
+        record['depth'] = search.completed_depth
+        record['exact'] = True
+        self._report(search, record)
+
+    def _report(self, search, record):
+        """
+        Completes a record with the values that are not counters, keeps it and writes it
+        """
+        record['seconds'] = time.perf_counter() - self._started
+        previous = self.iterations[-1]['nodes'] if self.iterations else 0
+        record['branching_factor'] = record['nodes'] / previous if previous and not record['exact'] else None
+        record['first_move_cutoff_rate'] = (record['first_move_cutoffs'] / record['cutoffs']
+            if record['cutoffs'] else None)
+        record['value'] = search._return_move.value
+        record['pv'] = [_square_str(square) for square in search._principal_variation]
+        self.iterations.append(record)
+        if(self._stream is None):
+            return
+        if(self._as_json):
+            print(json.dumps(record), file=self._stream, flush=True)
+        else:
+            print(self.format(record), file=self._stream, flush=True)
+
+    @staticmethod
+    def format(record):
+        """
+        Formats a record as one line of text
+
+        Args:
+            record (dict): the record of an iteration
+
+        Returns:
+            str: the record as text
+        """
+        parts = ['depth %d%s' % (record['depth'], ' exact' if record['exact'] else ''),
+            'nodes %d' % record['nodes'], 'leaves %d' % record['leaves'],
+            'cutoffs %d' % record['cutoffs'], 'tt hits %d' % record['tt_hits'],
+            'time %.3fs' % record['seconds']]
+        if(record['first_move_cutoff_rate'] is not None):
+            parts.append('first move cutoffs %.0f%%' % (100 * record['first_move_cutoff_rate']))
+        if(record['branching_factor'] is not None):
+            parts.append('ebf %.2f' % record['branching_factor'])
+        parts.append('value %.2f' % record['value'])
+        parts.append('pv ' + ' '.join(record['pv']))
+        return ', '.join(parts)
+
+    @staticmethod
+    def _counters(search):
+        """
+        Reads the counters of a search
+
+        Returns:
+            dict: counter name to value
+        """
+        return {'nodes': search.nodes, 'leaves': search.leaves, 'cutoffs': search.cutoffs,
+            'first_move_cutoffs': search.first_move_cutoffs, 'tt_hits': search.tt_hits, 'probcuts': search.probcuts,
+            'reductions': search.reductions, 'failed_reductions': search.failed_reductions}
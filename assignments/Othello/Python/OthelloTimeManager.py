@@ -0,0 +1,139 @@
+import time
+
+
+class SearchTimeout(Exception):
+
+    """
+    Raised inside the search when the deadline has passed. The search catches
+    it and keeps the best move of the last completed iteration
+    """
+
+
+class OthelloTimeManager(object):
+
+    """
+    Gives the search a deadline on the monotonic clock, a safety margin before
+    the time limit so that there is time left to print the move. The search
+    calls check every node and the clock is only read every check_interval
+    nodes, so the check costs next to nothing.
+
+    Before every iteration of the iterative deepening the search asks
+    can_start_iteration, which predicts the time of the next iteration from
+    the time of the last one and the observed effective branching factor, so
+    that iterations that can not finish are not started at all.
+    """
+
+    def __init__(self, time_limit, safety_margin=0.1, check_interval=256):
+        """
+        Instantiates the time manager, the clock starts with start
+
+        Args:
+            time_limit (float): the time limit in seconds
+            safety_margin (float, optional): seconds kept free before the time limit
+            check_interval (int, optional): the clock is read every this many nodes
+        """
+        self.time_limit = time_limit
+        self.safety_margin = safety_margin
+        self.check_interval = check_interval
+        self._start = None
+        self._deadline = None
+        self._iterations = []
+
+    def start(self, start_time=None):
+        """
+        Starts the clock
+
+        Args:
+            start_time (float, optional): time.monotonic() of the moment the time
+            limit counts from, now if not given
+        """
+        self._start = time.monotonic() if start_time is None else start_time
+        self._deadline = self._start + max(0.0, self.time_limit - self.safety_margin)
+        self._iterations = []
+        self._iteration_start = self._start
+
+    def elapsed(self):
+        """
+        Returns:
+            float: seconds since start
+        """
+        return time.monotonic() - self._start
+
+    def remaining(self):
+        """
+        Returns:
+            float: seconds left until the deadline, negative after it
+        """
+        return self._deadline - time.monotonic()
+
+    def expired(self):
+        """
+        Returns:
+            bool: True if the deadline has passed
+        """
+        return time.monotonic() >= self._deadline
+
+    def check(self, nodes):
+        """
+        Called by the search every node, reads the clock every check_interval nodes
+
+        Args:
+            nodes (int): the number of nodes searched so far
+
+        Raises:
+            SearchTimeout: the deadline has passed
+        """
+        if(not nodes % self.check_interval and time.monotonic() >= self._deadline):
+            raise SearchTimeout()
+
+    def start_iteration(self):
+        """
+        Marks the start of an iteration of the iterative deepening
+        """
+        self._iteration_start = time.monotonic()
+
+    def end_iteration(self, nodes):
+        """
+        Records a completed iteration
+
+        Args:
+            nodes (int): the number of nodes the iteration searched
+        """
+        self._iterations.append((time.monotonic() - self._iteration_start, max(1, nodes)))
+
+    def effective_branching_factor(self):
+        """
+        The growth of the node count per ply of the last iterations. Odd and
+        even depths grow differently in alpha beta, so with three or more
+        iterations the factor is taken over the last two plies
+
+        Returns:
+            float: the effective branching factor, None before two iterations
+        """
+        if(len(self._iterations) < 2):
+            return None
+        if(len(self._iterations) == 2):
+            return self._iterations[-1][1] / self._iterations[-2][1]
+        return (self._iterations[-1][1] / self._iterations[-3][1]) ** 0.5
+
+    def predicted_iteration_time(self):
+        """
+        Predicts the time of the next iteration as the time of the last one
+        times the effective branching factor
+
+        Returns:
+            float: the predicted seconds, 0 if there is nothing to predict from
+        """
+        branching_factor = self.effective_branching_factor()
+        if(branching_factor is None):
+            return 0.0
+        return self._iterations[-1][0] * max(1.0, branching_factor)
+
+    def can_start_iteration(self):
+        """
+        Determines if the next iteration is predicted to complete before the deadline
+
+        Returns:
+            bool: True if the search should start the next iteration
+        """
+        return self.predicted_iteration_time() < self.remaining()
@@ -0,0 +1,375 @@
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+from OthelloBitboardPosition import OthelloBitboardPosition, pop_count
+from OthelloEngine import OthelloEngine
+from OthelloEvaluators import EVALUATORS, DEFAULT_EVALUATOR
+from OthelloMove import OthelloMove
+from OthelloOpeningBook import OthelloOpeningBook, canonical_key
+from OthelloPosition import OthelloPosition
+from OthelloTranspositionTable import OthelloTranspositionTable
+
+POSITION_CLASSES = {'array': OthelloPosition, 'bitboard': OthelloBitboardPosition}
+
+# Settings of an engine configuration and their defaults. An engine plays to
+# a fixed depth, or with a time limit per move if 'time' is given. 'weights'
+# is a weight file of the evaluator, such as one written by OthelloWeightFitting,
+# 'probcut' a Multi-ProbCut parameter file written by OthelloProbCut and 'lmr'
+# the rank from which late moves are searched reduced
+ENGINE_DEFAULTS = {'evaluator': DEFAULT_EVALUATOR, 'depth': 4, 'time': None, 'backend': 'bitboard', 'endgame': 12,
+    'weights': None, 'probcut': None, 'lmr': None}
+
+# Time limit of a move of a fixed depth engine, high enough to never stop the search
+UNLIMITED_TIME = 3600.0
+
+# Two-sided 95% normal quantile of the Elo confidence intervals
+CONFIDENCE_Z = 1.96
+
+
+def parse_engine(spec):
+    """
+    Parses an engine configuration from the command line format
+    name:key=value,key=value, for example classic4:evaluator=classic,depth=4
+
+    Args:
+        spec (str): the configuration
+
+    Returns:
+        dict: the name and all settings of ENGINE_DEFAULTS
+    """
+    name, _, settings = spec.partition(':')
+    config = dict(ENGINE_DEFAULTS, name=name)
+    for setting in filter(None, settings.split(',')):
+        key, _, value = setting.partition('=')
+        if(key not in ENGINE_DEFAULTS):
+            raise ValueError('unknown engine setting ' + key)
+        if(key in ('depth', 'endgame', 'lmr')):
+            value = int(value)
+        elif(key == 'time'):
+            value = float(value)
+        config[key] = value
+    if(config['evaluator'] not in EVALUATORS):
+        raise ValueError('unknown evaluator ' + config['evaluator'])
+    if(config['backend'] not in POSITION_CLASSES):
+        raise ValueError('unknown backend ' + config['backend'])
+    return config
+
+
+def position_string(position):
+    """
+    Serializes a position to the format that the engines accept
+
+    Args:
+        position (OthelloBitboardPosition): the position
+
+    Returns:
+        str: the 65 character position string
+    """
+    white, black = position.white, position.black
+    cells = ['O' if (white >> square) & 1 else 'X' if (black >> square) & 1 else 'E' for square in range(64)]
+    return ('W' if position.maxPlayer else 'B') + ''.join(cells)
+
+
+def balanced_openings(count, plies=8, depth=4, margin=10.0, seed=0):
+    """
+    Finds opening positions where neither side is clearly better. Random
+    games are played from the start for a number of plies, and the position
+    is kept if no symmetric copy of it was kept before and a fixed depth
+    search with the classic evaluator values it within the margin of even
+
+    Args:
+        count (int): the number of openings
+        plies (int, optional): the number of random moves from the start
+        depth (int, optional): depth of the balance search
+        margin (float, optional): the largest absolute search value kept
+        seed (int, optional): seed of the random moves
+
+    Returns:
+        list: the position strings of the openings
+    """
+    rng = random.Random(seed)
+    transposition_table = OthelloTranspositionTable(16)
+    keys = set()
+    openings = []
+    while len(openings) < count:
+        position = OthelloBitboardPosition()
+        position.initialize()
+        for ply in range(plies):
+            moves = position.get_moves()
+            if(not moves):
+                break
+            position.make_move(rng.choice(moves))
+        key = canonical_key(position.own, position.opp)[0]
+        if(not position.get_moves() or key in keys):
+            continue
+        keys.add(key)
+        if(abs(OthelloOpeningBook._search_move(position, depth, transposition_table).value) <= margin):
+            openings.append(position_string(position))
+    return openings
+
+
+def create_engine(config, tt_memory_mb):
+    """
+    Creates the engine of a configuration, without an opening book so that
+    the game follows on from the opening it was given
+
+    Args:
+        config (dict): the engine configuration, see parse_engine
+        tt_memory_mb (float): transposition table size in megabytes
+
+    Returns:
+        OthelloEngine: the engine
+    """
+    if(config['time'] is None):
+        min_depth, max_depth = min(2, config['depth']), config['depth'] + 1
+    else:
+        min_depth, max_depth = 2, 30
+    return OthelloEngine(POSITION_CLASSES[config['backend']], tt_memory_mb, endgame_empties=config['endgame'],
+        book_path=None, evaluator=config['evaluator'], min_depth=min_depth, max_depth=max_depth,
+        weights_path=config['weights'], probcut_path=config['probcut'], lmr_rank=config['lmr'])
+
+
+def play_game(task):
+    """
+    Plays one game between two engine configurations. Runs in the worker
+    processes of the tournament, so it takes and returns plain data
+
+    Args:
+        task (tuple): (game number, opening position string, white config,
+        black config, transposition table size in megabytes)
+
+    Returns:
+        dict: the game record with the moves, the final disc counts, the result
+        and the search statistics of both sides
+    """
+    game, opening, white_config, black_config, tt_memory_mb = task
+    engines = {True: create_engine(white_config, tt_memory_mb), False: create_engine(black_config, tt_memory_mb)}
+    configs = {True: white_config, False: black_config}
+    searched = {True: {'moves': 0, 'depth': 0, 'nodes': 0, 'seconds': 0.0},
+        False: {'moves': 0, 'depth': 0, 'nodes': 0, 'seconds': 0.0}}
+    position = OthelloBitboardPosition(opening)
+    moves = []
+    passed = False
+    try:
+        while True:
+            if(not position.get_moves()):
+                if(passed):
+                    break
+                passed = True
+                moves.append('pass')
+                position.make_move(OthelloMove(is_pass_move=True))
+                continue
+            passed = False
+            side = position.maxPlayer
+            time_limit = configs[side]['time'] or UNLIMITED_TIME
+            started = time.perf_counter()
+            move = engines[side].best_move(position_string(position), time_limit)
+            seconds = time.perf_counter() - started
+            search = engines[side].search
+            # Solved endgame roots count as searched to the maximum depth and
+            # would inflate the average depth
+            if(not search._is_endgame()):
+                stats = searched[side]
+                stats['moves'] += 1
+                stats['depth'] += search.completed_depth
+                stats['nodes'] += search.nodes
+                stats['seconds'] += seconds
+            moves.append(str(move))
+            position.make_move(move)
+    finally:
+        for engine in engines.values():
+            engine.close()
+
+    white_discs, black_discs = pop_count(position.white), pop_count(position.black)
+    if(white_discs > black_discs):
+        result = 'white'
+    elif(black_discs > white_discs):
+        result = 'black'
+    else:
+        result = 'draw'
+    return {'game': game, 'opening': opening, 'white': white_config['name'], 'black': black_config['name'],
+        'moves': moves, 'white_discs': white_discs, 'black_discs': black_discs, 'result': result,
+        'white_search': searched[True], 'black_search': searched[False]}
+
+
+def schedule(configs, openings, rounds=1, tt_memory_mb=16):
+    """
+    The games of a round robin: every pair of configurations plays every
+    opening twice per round, once with each colour. Fixed depth engines
+    play the same games in every round, more rounds only add information
+    when an engine has a time limit
+
+    Args:
+        configs (list): the engine configurations, see parse_engine
+        openings (list): the opening position strings
+        rounds (int, optional): how many times the schedule is repeated
+        tt_memory_mb (float, optional): transposition table size of every engine
+
+    Returns:
+        list: the play_game tasks
+    """
+    tasks = []
+    for round_number in range(rounds):
+        for first in range(len(configs)):
+            for second in range(first + 1, len(configs)):
+                for opening in openings:
+                    for white, black in ((configs[first], configs[second]), (configs[second], configs[first])):
+                        tasks.append((len(tasks), opening, white, black, tt_memory_mb))
+    return tasks
+
+
+def elo_difference(wins, draws, losses):
+    """
+    The Elo difference that corresponds to a match score, with the 95%
+    confidence interval from the normal approximation of the mean score
+
+    Args:
+        wins (int): games won
+        draws (int): games drawn
+        losses (int): games lost
+
+    Returns:
+        tuple(float, float, float): the Elo difference and the lower and upper
+        bounds of its interval, infinite when the score is all or nothing
+    """
+    games = wins + draws + losses
+    if(games == 0):
+        return 0.0, -math.inf, math.inf
+    score = (wins + 0.5 * draws) / games
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games
+    margin = CONFIDENCE_Z * math.sqrt(variance / games)
+
+    def elo(score):
+        if(score <= 0):
+            return -math.inf
+        if(score >= 1):
+            return math.inf
+        return -400 * math.log10(1 / score - 1)
+
+    return elo(score), elo(score - margin), elo(score + margin)
+
+
+def summarize(records):
+    """
+    Sums up game records per pair of configurations and per configuration
+
+    Args:
+        records (iterable): game records as returned by play_game
+
+    Returns:
+        dict: 'pairs' with the wins, draws and losses of the first engine of every
+        pair, its score and the Elo difference with its interval, and 'engines'
+        with the average depth reached and the nodes per second of every engine
+    """
+    pairs = {}
+    engines = {}
+    for record in records:
+        white, black = record['white'], record['black']
+        for name, stats in ((white, record['white_search']), (black, record['black_search'])):
+            totals = engines.setdefault(name, {'games': 0, 'moves': 0, 'depth': 0, 'nodes': 0, 'seconds': 0.0})
+            totals['games'] += 1
+            for key in ('moves', 'depth', 'nodes', 'seconds'):
+                totals[key] += stats[key]
+        first, second = sorted((white, black))
+        pair = pairs.setdefault((first, second), {'first': first, 'second': second, 'wins': 0, 'draws': 0,
+            'losses': 0})
+        if(record['result'] == 'draw'):
+            pair['draws'] += 1
+        elif((record['result'] == 'white') == (white == first)):
+            pair['wins'] += 1
+        else:
+            pair['losses'] += 1
+
+    for pair in pairs.values():
+        games = pair['wins'] + pair['draws'] + pair['losses']
+        pair['games'] = games
+        pair['score'] = (pair['wins'] + 0.5 * pair['draws']) / games
+        pair['elo'], pair['elo_lower'], pair['elo_upper'] = elo_difference(pair['wins'], pair['draws'], pair['losses'])
+    summary = {'pairs': list(pairs.values()), 'engines': {}}
+    for name, totals in engines.items():
+        summary['engines'][name] = {'games': totals['games'],
+            'average_depth': totals['depth'] / totals['moves'] if totals['moves'] else 0.0,
+            'nodes_per_second': totals['nodes'] / totals['seconds'] if totals['seconds'] else 0.0}
+    return summary
+
+
+def format_summary(summary):
+    """
+    Formats a summary as text, one line per pair and per engine
+
+    Args:
+        summary (dict): as returned by summarize
+
+    Returns:
+        str: the summary
+    """
+    lines = []
+    for pair in summary['pairs']:
+        lines.append('%s vs %s: +%d =%d -%d, score %.1f%%, elo %+.0f [%+.0f, %+.0f]' % (pair['first'],
+            pair['second'], pair['wins'], pair['draws'], pair['losses'], 100 * pair['score'], pair['elo'],
+            pair['elo_lower'], pair['elo_upper']))
+    for name, engine in sorted(summary['engines'].items()):
+        lines.append('%s: %d games, average depth %.2f, %.0f nodes/s' % (name, engine['games'],
+            engine['average_depth'], engine['nodes_per_second']))
+    return '\n'.join(lines)
+
+
+def run(configs, openings, output, processes=None, rounds=1, tt_memory_mb=16, log=sys.stderr):
+    """
+    Plays a tournament on a process pool. Every game record is appended to
+    the output file as one JSON line as soon as the game finishes, so that an
+    interrupted tournament keeps its games. Engines with a time limit share
+    the processor with the other workers, so their depth depends on the
+    number of processes
+
+    Args:
+        configs (list): the engine configurations, see parse_engine
+        openings (list): the opening position strings
+        output (str): path of the JSON lines file of the game records
+        processes (int, optional): number of worker processes, one per processor if not given
+        rounds (int, optional): how many times every pairing and opening is played
+        tt_memory_mb (float, optional): transposition table size of every engine
+        log (file, optional): where progress is reported, None for no output
+
+    Returns:
+        dict: the summary of the games, see summarize
+    """
+    tasks = schedule(configs, openings, rounds, tt_memory_mb)
+    records = []
+    with open(output, 'a') as output_file, multiprocessing.Pool(processes) as pool:
+        for record in pool.imap_unordered(play_game, tasks):
+            print(json.dumps(record), file=output_file, flush=True)
+            records.append(record)
+            if(log is not None and len(records) % 10 == 0):
+                print('%d/%d games' % (len(records), len(tasks)), file=log, flush=True)
+    return summarize(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Self-play tournament between engine configurations from '
+        'balanced openings with colours swapped. Game records are written as JSON lines')
+    parser.add_argument('--engine', action='append', type=parse_engine, required=True,
+        help='engine configuration name:key=value,... with keys %s, given at least twice' % ', '.join(ENGINE_DEFAULTS))
+    parser.add_argument('--openings', type=int, default=50, help='number of balanced openings')
+    parser.add_argument('--opening-plies', type=int, default=8, help='random moves of an opening')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the openings')
+    parser.add_argument('--rounds', type=int, default=1, help='times every pairing and opening is played')
+    parser.add_argument('--processes', type=int, help='worker processes (default one per processor)')
+    parser.add_argument('--tt-mb', type=float, default=16, help='transposition table size of every engine')
+    parser.add_argument('--output', default='tournament.jsonl', help='file the game records are appended to')
+    parser.add_argument('--summary', help='also write the summary as JSON to this file')
+    args = parser.parse_args()
+    if(len(args.engine) < 2):
+        parser.error('at least two engines are needed')
+    if(len({config['name'] for config in args.engine}) != len(args.engine)):
+        parser.error('engine names must be unique')
+    openings = balanced_openings(args.openings, args.opening_plies, seed=args.seed)
+    summary = run(args.engine, openings, args.output, args.processes, args.rounds, args.tt_mb)
+    print(format_summary(summary))
+    if(args.summary):
+        with open(args.summary, 'w') as summary_file:
+            json.dump(summary, summary_file, indent=2)
@@ -0,0 +1,184 @@
+import numpy as np
+from multiprocessing import shared_memory
+
+# Bound types of a stored value
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+# Move encodings, other moves are stored as the square index (row-1)*8 + (col-1)
+NO_MOVE = -1
+
+
+class OthelloTranspositionTable(object):
+
+    """
+    Fixed-size transposition table for the alpha beta search, indexed by the
+    Zobrist hash of the position. Every entry stores the remaining search depth,
+    the bound type (EXACT, LOWER_BOUND or UPPER_BOUND), the value and the best
+    move found. The fields are kept in parallel numpy arrays so the table has
+    a fixed memory footprint regardless of how many positions are searched.
+
+    Replacement is depth-preferred: an entry is only overwritten by a search of
+    at least the same depth, unless it belongs to the same position or was
+    stored during an earlier search (see new_search).
+
+    A table created with create_shared lives in shared memory and can be used
+    by several search processes at once. The stored key is xor'ed with the
+    entry's data, so an entry that is torn by a concurrent write no longer
+    matches its position and reads as a miss.
+    """
+
+    # key + value + depth + flag + move + age
+    ENTRY_BYTES = 8 + 8 + 1 + 1 + 1 + 1
+
+    def __init__(self, memory_mb=64, shared=None):
+        """
+        Allocates the table
+
+        Args:
+            memory_mb (float, optional): memory budget of the table in megabytes
+            shared (SharedMemory, optional): shared memory block to keep the table in,
+            use create_shared instead of passing it directly
+        """
+        self._memory_mb = memory_mb
+        self._size = max(1, int(memory_mb * 1024 * 1024) // self.ENTRY_BYTES)
+        self._shared = shared
+        if(shared is None):
+            self._keys = np.zeros(self._size, dtype=np.int64)
+            self._values = np.zeros(self._size, dtype=np.float64)
+            self._depths = np.full(self._size, -1, dtype=np.int8)
+            self._flags = np.zeros(self._size, dtype=np.int8)
+            self._moves = np.full(self._size, NO_MOVE, dtype=np.int8)
+            self._ages = np.zeros(self._size, dtype=np.int8)
+        else:
+            size = self._size
+            self._keys = np.ndarray(size, dtype=np.int64, buffer=shared.buf, offset=0)
+            self._values = np.ndarray(size, dtype=np.float64, buffer=shared.buf, offset=8 * size)
+            self._depths = np.ndarray(size, dtype=np.int8, buffer=shared.buf, offset=16 * size)
+            self._flags = np.ndarray(size, dtype=np.int8, buffer=shared.buf, offset=17 * size)
+            self._moves = np.ndarray(size, dtype=np.int8, buffer=shared.buf, offset=18 * size)
+            self._ages = np.ndarray(size, dtype=np.int8, buffer=shared.buf, offset=19 * size)
+        # The raw bits of the values, used in the key check of an entry
+        self._value_bits = self._values.view(np.int64)
+        self._age = 0
+
+    @classmethod
+    def create_shared(cls, memory_mb=64):
+        """
+        Creates an empty table in shared memory. The creator has to call
+        close(unlink=True) when the table is no longer used by any process
+
+        Args:
+            memory_mb (float, optional): memory budget of the table in megabytes
+
+        Returns:
+            OthelloTranspositionTable: the shared table
+        """
+        size = max(1, int(memory_mb * 1024 * 1024) // cls.ENTRY_BYTES)
+        table = cls(memory_mb, shared_memory.SharedMemory(create=True, size=size * cls.ENTRY_BYTES))
+        table.clear()
+        return table
+
+    def __getstate__(self):
+        # Shared tables are sent to other processes by name, private tables by value
+        state = self.__dict__.copy()
+        if(self._shared is not None):
+            state = {'_memory_mb': self._memory_mb, '_shared_name': self._shared.name, '_age': self._age}
+        return state
+
+    def __setstate__(self, state):
+        if('_shared_name' in state):
+            self.__init__(state['_memory_mb'], shared_memory.SharedMemory(name=state['_shared_name']))
+            self._age = state['_age']
+        else:
+            self.__dict__.update(state)
+
+    def close(self, unlink=False):
+        """
+        Releases the shared memory of a shared table, does nothing for a private table
+
+        Args:
+            unlink (bool, optional): also destroy the shared memory block, only
+            done by the process that created it
+        """
+        if(self._shared is None):
+            return
+        self._keys = self._values = self._value_bits = None
+        self._depths = self._flags = self._moves = self._ages = None
+        self._shared.close()
+        if(unlink):
+            self._shared.unlink()
+        self._shared = None
+
+    def __len__(self):
+        return self._size
+
+    def new_search(self):
+        """
+        Marks the start of a new search (a new root position). Entries from
+        earlier searches can then be replaced regardless of their depth
+        """
+        self._age = (self._age + 1) % 128
+
+    def clear(self):
+        """
+        Removes all entries from the table
+        """
+        self._depths.fill(-1)
+        self._moves.fill(NO_MOVE)
+
+    def probe(self, key):
+        """
+        Looks up a position
+
+        Args:
+            key (int): the Zobrist hash of the position
+
+        Returns:
+            tuple: (depth, flag, value, move) or None if the position is not stored
+        """
+        index = key % self._size
+        depth = int(self._depths[index])
+        if depth < 0:
+            return None
+        flag = int(self._flags[index])
+        move = int(self._moves[index])
+        value_bits = int(self._value_bits[index])
+        if int(self._keys[index]) != key ^ value_bits ^ self._pack(depth, flag, move):
+            return None
+        return (depth, flag, float(self._values[index]), move)
+
+    def store(self, key, depth, flag, value, move):
+        """
+        Stores a search result, following the depth-preferred replacement policy
+
+        Args:
+            key (int): the Zobrist hash of the position
+            depth (int): the remaining depth the position was searched to
+            flag (int): EXACT, LOWER_BOUND or UPPER_BOUND
+            value (float): the value found by the search
+            move (int): the best move as a square index, PASS_MOVE or NO_MOVE
+        """
+        index = key % self._size
+        stored_depth = self._depths[index]
+        if (stored_depth >= 0 and depth < stored_depth and self._ages[index] == self._age
+                and int(self._keys[index]) ^ int(self._value_bits[index]) != key ^ self._pack(
+                    stored_depth, self._flags[index], self._moves[index])):
+            return
+        self._values[index] = value
+        self._depths[index] = depth
+        self._flags[index] = flag
+        self._moves[index] = move
+        self._ages[index] = self._age
+        self._keys[index] = key ^ int(self._value_bits[index]) ^ self._pack(depth, flag, move)
+
+    @staticmethod
+    def _pack(depth, flag, move):
+        """
+        Packs the small fields of an entry into one integer for the key check
+
+        Returns:
+            int: the packed fields
+        """
+        return (int(depth) & 0xFF) | (int(flag) << 8) | ((int(move) & 0xFF) << 16)
@@ -0,0 +1,234 @@
+import argparse
+import json
+import sys
+import numpy as np
+from OthelloBitboardPosition import OthelloBitboardPosition
+from OthelloHeuristics import OthelloHeuristics, FEATURES, DEFAULT_MIX, DEFAULT_WEIGHTS_PATH, game_phase, write_weights
+from OthelloMove import OthelloMove
+
+# Positions per batch of feature extraction
+BATCH_SIZE = 4096
+
+RIDGE = 'ridge'
+LOGISTIC = 'logistic'
+
+
+def parse_move(text):
+    """
+    Parses a move as printed by OthelloMove
+
+    Args:
+        text (str): the move on the format (3,6) or pass
+
+    Returns:
+        OthelloMove: the move
+    """
+    if(text == 'pass'):
+        return OthelloMove(is_pass_move=True)
+    row, col = text.strip('()').split(',')
+    return OthelloMove(int(row), int(col))
+
+
+def read_batches(paths, batch_size=BATCH_SIZE):
+    """
+    Streams the positions of recorded games, such as the game records of
+    OthelloTournament: JSON lines with the opening, the moves and the final
+    disc counts. The games are replayed one at a time and the positions
+    before every move that is not a pass are collected in arrays of at most
+    batch_size positions, so only one batch is held in memory whatever the
+    number of games
+
+    Args:
+        paths (list): paths of the game record files
+        batch_size (int, optional): positions per batch
+
+    Yields:
+        tuple(numpy, numpy, numpy): the (n, 2) uint64 array of white and black
+        bitboards (see stack_boards), the final disc difference in percent and
+        the result (1 won, 0.5 drawn, 0 lost), both from white's point of view
+    """
+    boards = []
+    differences = []
+    results = []
+    for path in paths:
+        with open(path) as records:
+            for line in records:
+                if(not line.strip()):
+                    continue
+                record = json.loads(line)
+                white_discs, black_discs = record['white_discs'], record['black_discs']
+                difference = 100 * (white_discs - black_discs) / (white_discs + black_discs)
+                result = 1.0 if white_discs > black_discs else 0.0 if white_discs < black_discs else 0.5
+                position = OthelloBitboardPosition(record['opening'])
+                for text in record['moves']:
+                    move = parse_move(text)
+                    if(not move.is_pass_move):
+                        boards.append((position.white, position.black))
+                        differences.append(difference)
+                        results.append(result)
+                    position.make_move(move)
+                if(len(boards) >= batch_size):
+                    yield np.array(boards, dtype=np.uint64), np.array(differences), np.array(results)
+                    boards, differences, results = [], [], []
+    if(boards):
+        yield np.array(boards, dtype=np.uint64), np.array(differences), np.array(results)
+
+
+def _phase_batches(paths, phases, batch_size):
+    """
+    Streams the features of recorded positions split by game phase
+
+    Yields:
+        tuple(int, numpy, numpy, numpy): the phase, the (n, 4) features in FEATURES
+        order and the disc differences and results, all from white's point of view
+    """
+    evaluator = OthelloHeuristics("W", "B", [DEFAULT_MIX])
+    for boards, differences, results in read_batches(paths, batch_size):
+        features, discs = evaluator._features_of_batch(boards)
+        features = features.T
+        phase_of_position = game_phase(discs, phases)
+        for phase in range(phases):
+            selected = phase_of_position == phase
+            if(selected.any()):
+                yield phase, features[selected], differences[selected], results[selected]
+
+
+def fit_ridge(paths, phases=1, l2=1.0, batch_size=BATCH_SIZE):
+    """
+    Fits the feature weights to the final disc difference by regularised
+    least squares. The normal equations are summed batch by batch in one pass
+    over the records and solved per phase at the end. The model has no
+    constant term, so that the value for black is the negated value for white
+
+    Args:
+        paths (list): paths of the game record files
+        phases (int, optional): the number of game phases with their own weights
+        l2 (float, optional): the ridge penalty per position
+        batch_size (int, optional): positions per batch
+
+    Returns:
+        tuple(list, list, list): the weights of every phase in FEATURES order,
+        the number of positions and the mean squared error of every phase
+    """
+    features_squared = np.zeros((phases, len(FEATURES), len(FEATURES)))
+    features_targets = np.zeros((phases, len(FEATURES)))
+    targets_squared = np.zeros(phases)
+    counts = np.zeros(phases, dtype=np.int64)
+    for phase, features, differences, results in _phase_batches(paths, phases, batch_size):
+        features_squared[phase] += features.T @ features
+        features_targets[phase] += features.T @ differences
+        targets_squared[phase] += differences @ differences
+        counts[phase] += len(differences)
+    if(not counts.sum()):
+        raise Exception('no positions in ' + ', '.join(paths))
+
+    weights = []
+    errors = []
+    for phase in range(phases):
+        # A phase without positions gets the weights fitted to all phases
+        selected = [phase] if counts[phase] else list(range(phases))
+        squared = features_squared[selected].sum(axis=0)
+        targets = features_targets[selected].sum(axis=0)
+        count = counts[selected].sum()
+        phase_weights = np.linalg.solve(squared + l2 * count * np.eye(len(FEATURES)), targets)
+        weights.append(tuple(phase_weights))
+        errors.append(float((targets_squared[selected].sum() - 2 * phase_weights @ targets
+            + phase_weights @ squared @ phase_weights) / count))
+    return weights, [int(count) for count in counts], errors
+
+
+def fit_logistic(paths, phases=1, l2=1.0, iterations=8, batch_size=BATCH_SIZE):
+    """
+    Fits the feature weights to the game results by regularised logistic
+    regression, so that the value of a position is the log-odds of winning
+    it. Each Newton step sums the gradient and the Hessian in one pass over
+    the records. The search only compares values, so their scale does not
+    matter to it
+
+    Args:
+        paths (list): paths of the game record files
+        phases (int, optional): the number of game phases with their own weights
+        l2 (float, optional): the penalty per position
+        iterations (int, optional): the number of Newton steps, one pass each
+        batch_size (int, optional): positions per batch
+
+    Returns:
+        tuple(list, list, list): the weights of every phase in FEATURES order,
+        the number of positions and the mean log loss of every phase before the
+        last step
+    """
+    weights = np.zeros((phases, len(FEATURES)))
+    for iteration in range(iterations):
+        gradients = np.zeros((phases, len(FEATURES)))
+        hessians = np.zeros((phases, len(FEATURES), len(FEATURES)))
+        losses = np.zeros(phases)
+        counts = np.zeros(phases, dtype=np.int64)
+        for phase, features, differences, results in _phase_batches(paths, phases, batch_size):
+            logits = features @ weights[phase]
+            probabilities = 1 / (1 + np.exp(-logits))
+            gradients[phase] += features.T @ (probabilities - results)
+            hessians[phase] += (features.T * (probabilities * (1 - probabilities))) @ features
+            # log(1 + e^x) - y x, written to not overflow for large logits
+            losses[phase] += (np.logaddexp(0, logits) - results * logits).sum()
+            counts[phase] += len(results)
+        if(not counts.sum()):
+            raise Exception('no positions in ' + ', '.join(paths))
+        for phase in range(phases):
+            if(counts[phase]):
+                penalty = l2 * counts[phase]
+                weights[phase] -= np.linalg.solve(hessians[phase] + penalty * np.eye(len(FEATURES)),
+                    gradients[phase] + penalty * weights[phase])
+    # A phase without positions gets the mean weights of the others
+    fitted = counts > 0
+    weights[~fitted] = weights[fitted].mean(axis=0)
+    return ([tuple(phase_weights) for phase_weights in weights], [int(count) for count in counts],
+        [float(losses[phase] / counts[phase]) if counts[phase] else None for phase in range(phases)])
+
+
+def fit(paths, output=DEFAULT_WEIGHTS_PATH, method=RIDGE, phases=1, l2=1.0, iterations=8, batch_size=BATCH_SIZE,
+    log=sys.stderr):
+    """
+    Fits the evaluation weights to recorded games and writes the weight file
+
+    Args:
+        paths (list): paths of the game record files
+        output (str, optional): path of the weight file to write, by default the one the
+        evaluators load at startup
+        method (str, optional): RIDGE or LOGISTIC
+        phases (int, optional): the number of game phases with their own weights
+        l2 (float, optional): the penalty per position
+        iterations (int, optional): Newton steps of the logistic regression
+        batch_size (int, optional): positions per batch
+        log (file, optional): where the fit is reported, None for no output
+
+    Returns:
+        list: the weights of every phase in FEATURES order
+    """
+    if(method == RIDGE):
+        weights, counts, losses = fit_ridge(paths, phases, l2, batch_size)
+    elif(method == LOGISTIC):
+        weights, counts, losses = fit_logistic(paths, phases, l2, iterations, batch_size)
+    else:
+        raise Exception('unknown fitting method ' + method)
+    write_weights(output, weights, {'method': method, 'l2': l2, 'positions': counts, 'loss': losses})
+    if(log is not None):
+        for phase, (phase_weights, count, loss) in enumerate(zip(weights, counts, losses)):
+            print('phase %d: %d positions, loss %s, %s' % (phase, count, 'n/a' if loss is None else '%.4f' % loss,
+                ', '.join('%s %.4f' % (name, weight) for name, weight in zip(FEATURES, phase_weights))), file=log)
+        print('wrote %s' % output, file=log)
+    return weights
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fits the weights of the classic evaluation to recorded games '
+        '(JSON lines as written by OthelloTournament) and writes a weight file')
+    parser.add_argument('records', nargs='+', help='game record files')
+    parser.add_argument('--output', default=DEFAULT_WEIGHTS_PATH, help='weight file to write')
+    parser.add_argument('--method', default=RIDGE, choices=(RIDGE, LOGISTIC),
+        help='least squares on the disc difference or logistic regression on the result')
+    parser.add_argument('--phases', type=int, default=1, help='game phases with their own weights')
+    parser.add_argument('--l2', type=float, default=1.0, help='regularisation per position')
+    parser.add_argument('--iterations', type=int, default=8, help='Newton steps of the logistic regression')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='positions per batch')
+    args = parser.parse_args()
+    fit(args.records, args.output, args.method, args.phases, args.l2, args.iterations, args.batch_size)
@@ -0,0 +1,34 @@
+import random
+
+# Fixed seed so that the same position hashes to the same key in every
+# process and every run (opening book files and shared tables rely on it).
+# Keys are 63 bits so they fit in a signed 64-bit numpy array.
+_rng = random.Random(0x0E110)
+
+ZOBRIST_WHITE = [_rng.getrandbits(63) for square in range(64)]
+ZOBRIST_BLACK = [_rng.getrandbits(63) for square in range(64)]
+# Key to xor in when a disc on the square changes colour
+ZOBRIST_FLIP = [white ^ black for white, black in zip(ZOBRIST_WHITE, ZOBRIST_BLACK)]
+ZOBRIST_WHITE_TO_MOVE = _rng.getrandbits(63)
+
+
+def zobrist_hash(white, black, white_to_move):
+    """
+    Calculates the Zobrist hash of a position from scratch. Positions
+    update their hash incrementally after that.
+
+    Args:
+        white (int): bitboard of the white discs, bit (row-1)*8 + (col-1)
+        black (int): bitboard of the black discs
+        white_to_move (bool): True if white has the move
+
+    Returns:
+        int: the 63-bit hash key
+    """
+    key = ZOBRIST_WHITE_TO_MOVE if white_to_move else 0
+    for square in range(64):
+        if (white >> square) & 1:
+            key ^= ZOBRIST_WHITE[square]
+        elif (black >> square) & 1:
+            key ^= ZOBRIST_BLACK[square]
+    return key
@@ -22,6 +22,7 @@ cd "$(dirname "$0")"
 
 # only run if <do_compile> is not set (we don't need to compile Python code, but the automated testing needs this)
 if [ $do_compile -ne 1 ]; then
-	# Call your Python program with a position and time limit
-	python3 Othello.py $position $time_limit
+	# Call your Python program with a position and time limit. The client asks a running
+	# engine daemon (python3 OthelloDaemon.py) for the move and runs Othello.py if there is none
+	python3 OthelloClient.py $position $time_limit
 fi
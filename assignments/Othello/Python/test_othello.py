@@ -0,0 +1,699 @@
+from OthelloPosition import OthelloPosition
+from OthelloBitboardPosition import OthelloBitboardPosition
+from OthelloMove import OthelloMove
+from OthelloEndgameSolver import OthelloEndgameSolver, final_score
+from OthelloBitboardPosition import legal_moves, flipped_discs, transform, stable_discs
+from OthelloOpeningBook import OthelloOpeningBook
+from OthelloPatternHeuristics import OthelloPatternHeuristics
+from OthelloHeuristics import OthelloHeuristics, stack_boards, load_weights, game_phase
+from OthelloWeightFitting import fit, read_batches
+from OthelloABIDSearch import OthelloABIDSearch, PVS, MINIMAX, LMR_ENDGAME_EMPTIES
+from OthelloMoveOrdering import OthelloMoveOrdering, CORNERS
+from OthelloTranspositionTable import OthelloTranspositionTable, EXACT, LOWER_BOUND
+from OthelloLazySMP import OthelloLazySMP
+from Othello import Othello
+from multiprocessing import shared_memory
+import multiprocessing
+from OthelloTimeManager import OthelloTimeManager
+from OthelloEngine import OthelloEngine
+from OthelloDaemon import serve_stdin, serve_socket, QUIT
+from OthelloClient import request_move, FALLBACK_MARGIN
+import io
+import os
+import threading
+import socket
+import time
+import json
+from OthelloSearchStats import OthelloSearchStats
+from OthelloTournament import parse_engine, play_game, summarize, elo_difference, position_string as engine_position_string
+from OthelloBenchmark import perft, START_PERFT, MIDGAME_PERFT
+from OthelloBatchAnalysis import run as run_analysis
+from OthelloProbCut import OthelloProbCut, fit as fit_probcut
+import numpy as np
+import random
+
+
+START_POSITION = "WEEEEEEEEEEEEEEEEEEEEEEEEEEEOXEEEEEEXOEEEEEEEEEEEEEEEEEEEEEEEEEEE"
+
+
+def random_game_positions(seed):
+    """
+    Plays a random game from the start position and yields the position
+    string before every move
+
+    :param seed: seed of the random move choices
+    :return: generator of 65 character position strings
+    """
+    rng = random.Random(seed)
+    position = OthelloPosition(START_POSITION)
+    passes = 0
+    while passes < 2:
+        yield position_string(position)
+        moves = position.get_moves()
+        if moves:
+            passes = 0
+            position.make_move(rng.choice(moves))
+        else:
+            passes += 1
+            position.make_move(OthelloMove(is_pass_move=True))
+
+
+def position_string(position):
+    """
+    Serializes a position to the format that Othello.py accepts
+
+    :param position: an OthelloPosition
+    :return: the 65 character position string
+    """
+    cells = position.board[1:9, 1:9].ravel()
+    markers = {'W': 'O', 'B': 'X', 'E': 'E'}
+    return ('W' if position.maxPlayer else 'B') + ''.join(markers[cell] for cell in cells)
+
+
+def test_bitboard_matches_array_position():
+    """
+    Checks that the bitboard backend generates the same moves and boards as
+    the array backend along a set of random games
+    """
+    for seed in range(20):
+        for position_str in random_game_positions(seed):
+            array_position = OthelloPosition(position_str)
+            bitboard_position = OthelloBitboardPosition(position_str)
+            assert np.array_equal(array_position.board, bitboard_position.board)
+            array_moves = array_position.get_moves()
+            bitboard_moves = bitboard_position.get_moves()
+            assert [(m.row, m.col) for m in array_moves] == [(m.row, m.col) for m in bitboard_moves]
+            for array_move, bitboard_move in zip(array_moves, bitboard_moves):
+                array_child = array_position.clone()
+                bitboard_child = bitboard_position.clone()
+                array_child.make_move(array_move)
+                bitboard_child.make_move(bitboard_move)
+                assert np.array_equal(array_child.board, bitboard_child.board)
+                assert array_child.to_move() == bitboard_child.to_move()
+                assert array_child.hash == bitboard_child.hash == OthelloPosition(position_string(array_child)).hash
+                assert array_child.frontier == OthelloPosition(position_string(array_child)).frontier
+
+
+def test_unmake_move_restores_position():
+    """
+    Checks that unmake_move takes back make_move on both backends
+    """
+    for seed in range(5):
+        for position_str in random_game_positions(seed):
+            for position_class in (OthelloPosition, OthelloBitboardPosition):
+                position = position_class(position_str)
+                board = np.copy(position.board)
+                for move in position.get_moves() or [OthelloMove(is_pass_move=True)]:
+                    undo = position.make_move(move)
+                    position.unmake_move(undo)
+                    assert np.array_equal(position.board, board)
+                    assert position_string(position) == position_str
+                    assert position.hash == position_class(position_str).hash
+                    if position_class is OthelloPosition:
+                        assert position.frontier == OthelloPosition(position_str).frontier
+
+
+def test_move_ordering():
+    """
+    Checks that the move ordering puts the principal variation move first,
+    then the hash move and the killer moves, then corners ahead of the other
+    moves and X-squares last, and that it saves nodes at a fixed depth
+    """
+    position = OthelloBitboardPosition("BEEEEEEEEEEEEEEOEEEEXXOEEEEEXOOEEEXEXOOEEOXXOEOOEEXEXEEEEXXOOOOEE")
+    moves = position.get_move_squares()
+    assert moves == [7, 22, 30, 38, 44, 54, 55, 62]
+    move_ordering = OthelloMoveOrdering()
+    move_ordering.set_principal_variation(position, [44])
+    move_ordering.record_cutoff(22, position, 0, 3, 1)
+    move_ordering.record_cutoff(38, position, 0, 3, 1)
+    ordered = move_ordering.order(list(moves), position, 0, hash_move=30)
+    assert ordered[:5] == [44, 30, 38, 22, CORNERS[1]]
+    assert ordered[-1] == 54
+    assert sorted(ordered) == moves
+
+    def nodes(move_ordering):
+        total = 0
+        for seed in range(4):
+            position = OthelloBitboardPosition(list(random_game_positions(seed))[20])
+            player, opponent = ("W", "B") if position.maxPlayer else ("B", "W")
+            search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics(player, opponent),
+                1, 5, True, OthelloTranspositionTable(1), move_ordering, PVS)
+            search.ab_id_search()
+            total += search.nodes
+        return total
+    assert nodes(OthelloMoveOrdering()) < nodes(None)
+
+
+def test_pvs_matches_minimax():
+    """
+    Checks that PVS with aspiration windows finds the same root value as the
+    max/min alpha beta search at a fixed depth
+    """
+    for seed in range(6):
+        position = OthelloBitboardPosition(list(random_game_positions(seed))[16 + seed])
+        player, opponent = ("W", "B") if position.maxPlayer else ("B", "W")
+        values = []
+        for search_mode in (MINIMAX, PVS):
+            search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics(player, opponent),
+                1, 4, True, OthelloTranspositionTable(1), OthelloMoveOrdering(), search_mode)
+            search.ab_id_search()
+            values.append(search._return_move.value)
+        assert abs(values[0] - values[1]) < 1e-6
+
+
+def store_in_shared_table(table, key):
+    """
+    Stores an entry in a shared transposition table from a child process
+
+    :param table: the shared table, sent to the process by name
+    :param key: the hash to store the entry under
+    :return: Nothing
+    """
+    table.store(key, 5, LOWER_BOUND, 12.5, 19)
+    table.close()
+
+
+def test_shared_table_across_processes():
+    """
+    Checks that an entry stored in a shared table by another process is found,
+    that an entry whose data does not match its key reads as a miss and that
+    close(unlink=True) destroys the shared memory
+    """
+    table = OthelloTranspositionTable.create_shared(1)
+    name = table._shared.name
+    key = 0x123456789ABCDEF
+    try:
+        child = multiprocessing.get_context('spawn').Process(target=store_in_shared_table, args=(table, key))
+        child.start()
+        child.join()
+        assert child.exitcode == 0
+        assert table.probe(key) == (5, LOWER_BOUND, 12.5, 19)
+        assert table.probe(key + len(table)) is None
+
+        table.store(key, 6, EXACT, 3.0, 20)
+        table._values[key % len(table)] = 4.0
+        assert table.probe(key) is None
+    finally:
+        table.close(unlink=True)
+    try:
+        shared_memory.SharedMemory(name=name).close()
+        assert False
+    except FileNotFoundError:
+        pass
+
+
+def test_lazy_smp(capsys):
+    """
+    Checks that the Lazy SMP helpers report a completed iteration with a legal
+    move and that a search with two workers prints a legal move
+    """
+    position = OthelloBitboardPosition(list(random_game_positions(2))[20])
+    legal_moves = [str(move) for move in position.get_moves()]
+    table = OthelloTranspositionTable.create_shared(1)
+    try:
+        lazy_smp = OthelloLazySMP(2, position, OthelloHeuristics("W" if position.maxPlayer else "B",
+            "B" if position.maxPlayer else "W"), table, 1, 4, PVS)
+        assert lazy_smp.best_result() == (0, None)
+        lazy_smp.start()
+        for process in lazy_smp._helpers:
+            process.join()
+        depth, move = lazy_smp.best_result()
+        lazy_smp.stop()
+    finally:
+        table.close(unlink=True)
+    assert depth == 3 and str(move) in legal_moves
+
+    Othello(position_string(position), 1, tt_memory_mb=1, workers=2, book_path=None).main()
+    printed_moves = ["(%d,%d)" % (move.row, move.col) for move in position.get_moves()]
+    assert capsys.readouterr().out.strip() in printed_moves
+
+
+def test_stable_discs_are_never_flipped():
+    """
+    Plays random games on from positions of random games and checks that the
+    discs found stable are never flipped
+    """
+    rng = random.Random(0)
+    for seed in range(10):
+        for position_str in random_game_positions(seed):
+            position = OthelloBitboardPosition(position_str)
+            white_stable = stable_discs(position.white, position.black)
+            black_stable = stable_discs(position.black, position.white)
+            assert not white_stable & black_stable
+            passes = 0
+            while passes < 2:
+                moves = position.get_moves()
+                passes = 0 if moves else passes + 1
+                position.make_move(rng.choice(moves) if moves else OthelloMove(is_pass_move=True))
+                assert white_stable & position.white == white_stable
+                assert black_stable & position.black == black_stable
+    corner_run = OthelloBitboardPosition("W" + "OOOX" + "E" * 60)
+    assert stable_discs(corner_run.white, corner_run.black) == 0b111
+
+
+def minimax_score(own, opp, passed=False):
+    """
+    Plain negamax to the end of the game without pruning or ordering
+
+    :param own: bitboard of the discs of the player to move
+    :param opp: bitboard of the discs of the opponent
+    :param passed: True if the previous player passed
+    :return: final disc difference for the player to move
+    """
+    moves = legal_moves(own, opp)
+    if not moves:
+        if passed:
+            return final_score(own, opp)
+        return -minimax_score(opp, own, True)
+    best = -65
+    for square in range(64):
+        if (moves >> square) & 1:
+            flips = flipped_discs(own, opp, square)
+            best = max(best, -minimax_score(opp ^ flips, own | flips | (1 << square)))
+    return best
+
+
+def test_endgame_solver_is_exact():
+    """
+    Checks the endgame solver against plain negamax near the end of random games
+    """
+    solver = OthelloEndgameSolver()
+    for seed in range(10):
+        position_str = [s for s in random_game_positions(seed) if s.count('E') >= 7][-1]
+        position = OthelloBitboardPosition(position_str)
+        square, score = solver.solve(position.own, position.opp)
+        assert score == minimax_score(position.own, position.opp)
+        if legal_moves(position.own, position.opp):
+            flips = flipped_discs(position.own, position.opp, square)
+            assert -minimax_score(position.opp ^ flips, position.own | flips | (1 << square)) == score
+
+
+def test_opening_book(tmp_path):
+    """
+    Builds a small book and checks that it answers with legal moves, that the
+    8 symmetric versions of a book position get the correspondingly transformed
+    move and that a missing book file opens as None
+    """
+    book_path = str(tmp_path / "book.bin")
+    OthelloOpeningBook.build(book_path, plies=3, full_plies=3, games=0, depth=2, log=None)
+    assert OthelloOpeningBook.open_if_exists(str(tmp_path / "missing.bin")) is None
+    book = OthelloOpeningBook.open_if_exists(book_path)
+    try:
+        assert len(book) == 5
+        start = OthelloBitboardPosition(START_POSITION)
+        assert str(book.lookup(start)) in [str(move) for move in start.get_moves()]
+        # A position two plies in without any symmetry of its own
+        position = next(position for position in (OthelloBitboardPosition(position_str)
+            for seed in range(20) for position_str in list(random_game_positions(seed))[2:3])
+            if len({(transform(position.white, symmetry), transform(position.black, symmetry))
+                for symmetry in range(8)}) == 8)
+        move = book.lookup(position)
+        assert str(move) in [str(legal) for legal in position.get_moves()]
+        for symmetry in range(8):
+            white, black = transform(position.white, symmetry), transform(position.black, symmetry)
+            cells = ['O' if (white >> square) & 1 else 'X' if (black >> square) & 1 else 'E' for square in range(64)]
+            transformed = OthelloBitboardPosition(('W' if position.maxPlayer else 'B') + ''.join(cells))
+            square = transform(1 << ((move.row - 1) * 8 + move.col - 1), symmetry).bit_length() - 1
+            assert str(book.lookup(transformed)) == str(OthelloMove(square // 8 + 1, square % 8 + 1))
+    finally:
+        book.close()
+
+
+def test_pattern_evaluation_is_symmetric():
+    """
+    Checks that the pattern evaluator gives the same value on both backends
+    and for all 8 symmetric versions of a position, and that it is zero sum
+    """
+    white_evaluator = OthelloPatternHeuristics("W", "B")
+    black_evaluator = OthelloPatternHeuristics("B", "W")
+    for seed in range(5):
+        for position_str in random_game_positions(seed):
+            position = OthelloBitboardPosition(position_str)
+            value = white_evaluator._utility_of_result(position).value
+            assert value == white_evaluator._utility_of_result(OthelloPosition(position_str)).value
+            assert abs(value + black_evaluator._utility_of_result(position).value) < 1e-9
+            for symmetry in range(8):
+                symmetric_value = white_evaluator._pattern_value(transform(position.white, symmetry),
+                    transform(position.black, symmetry))
+                assert abs(symmetric_value - value) < 1e-9
+
+
+def test_feature_counts_match_board():
+    """
+    Checks that the incrementally kept features of the array backend match
+    the bitboard backend through make_move and unmake_move, and that the
+    evaluation from the features equals the evaluation from the board
+    """
+    evaluator = OthelloHeuristics("W", "B")
+    for seed in range(5):
+        rng = random.Random(seed)
+        position = OthelloPosition(START_POSITION, track_features=True)
+        undos = []
+        while len(undos) < 60:
+            position_str = position_string(position)
+            bitboard_position = OthelloBitboardPosition(position_str)
+            for color in ("W", "B"):
+                assert position.feature_counts(color) == bitboard_position.feature_counts(color)
+            value = evaluator._utility_of_result(OthelloPosition(position_str)).value
+            assert evaluator._utility_of_result(position).value == value
+            assert evaluator._utility_of_result(bitboard_position).value == value
+            moves = position.get_moves()
+            undos.append(position.make_move(rng.choice(moves) if moves else OthelloMove(is_pass_move=True)))
+        for undo in reversed(undos):
+            position.unmake_move(undo)
+        start = OthelloPosition(START_POSITION, track_features=True)
+        for color in ("W", "B"):
+            assert position.feature_counts(color) == start.feature_counts(color)
+
+
+def test_search_stops_at_deadline():
+    """
+    Checks that a search under the time manager returns before the time limit
+    with a legal move and leaves the root position as it was
+    """
+    position_str = list(random_game_positions(1))[20]
+    position = OthelloBitboardPosition(position_str)
+    time_manager = OthelloTimeManager(0.5, safety_margin=0.1)
+    time_manager.start()
+    search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics("W", "B"), 2, 30, True,
+        OthelloTranspositionTable(1), OthelloMoveOrdering(), PVS, time_manager=time_manager)
+    search.ab_id_search()
+    assert time_manager.elapsed() < 0.5
+    assert search.completed_depth >= 2
+    assert (search._return_move.row, search._return_move.col) in [(m.row, m.col) for m in position.get_moves()]
+    assert position_string(position) == position_str
+
+
+def test_daemon_answers_requests():
+    """
+    Checks that the daemon protocol answers every request line with a legal
+    move from one engine, and rejects malformed requests
+    """
+    positions = [s for s in random_game_positions(2) if OthelloPosition(s).get_moves()][10:13]
+    requests = ''.join(position_str + ' 0.3\n' for position_str in positions) + 'bad request\nquit\n'
+    replies = io.StringIO()
+    engine = OthelloEngine(tt_memory_mb=1, book_path=None)
+    try:
+        serve_stdin(engine, io.StringIO(requests), replies)
+    finally:
+        engine.close()
+    lines = replies.getvalue().splitlines()
+    assert len(lines) == len(positions) + 1
+    for position_str, line in zip(positions, lines):
+        assert line in [str(move) for move in OthelloPosition(position_str).get_moves()]
+    assert lines[-1].startswith('error')
+
+
+
+def test_client_times_out_on_silent_daemon(tmp_path):
+    """
+    Checks that the client gives up on a daemon that accepts the connection
+    but never replies, FALLBACK_MARGIN seconds before the time limit
+    """
+    socket_path = str(tmp_path / "engine.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as daemon:
+        daemon.bind(socket_path)
+        daemon.listen(1)
+        start = time.monotonic()
+        try:
+            request_move(START_POSITION, FALLBACK_MARGIN + 0.3, socket_path, start)
+            assert False
+        except OSError:
+            pass
+        assert time.monotonic() - start < FALLBACK_MARGIN + 0.3
+
+
+def test_client_gets_move_of_full_time_search(tmp_path):
+    """
+    Checks that a daemon that searches for all of the time it is given
+    answers before the client stops waiting. The first iteration is too deep
+    to complete, so the search runs until its deadline
+    """
+    socket_path = str(tmp_path / "engine.sock")
+    engine = OthelloEngine(tt_memory_mb=1, book_path=None, min_depth=10)
+    daemon = threading.Thread(target=serve_socket, args=(engine, socket_path))
+    daemon.start()
+    try:
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+        position_str = list(random_game_positions(3))[20]
+        start = time.monotonic()
+        move = request_move(position_str, FALLBACK_MARGIN + 1.0, socket_path, start)
+        assert time.monotonic() - start > 0.7
+        assert move in [str(legal) for legal in OthelloPosition(position_str).get_moves()]
+    finally:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(socket_path)
+            connection.sendall((QUIT + '\n').encode())
+        daemon.join()
+        engine.close()
+
+def test_perft_counts():
+    """
+    Checks both backends against the known perft counts of the start position
+    and the cross-checked counts of the midgame positions of the benchmark suite
+    """
+    for position_class in (OthelloPosition, OthelloBitboardPosition):
+        for depth in range(5):
+            assert perft(position_class(START_POSITION), depth) == START_PERFT[depth]
+        for position_str, counts in MIDGAME_PERFT.items():
+            for depth in range(4):
+                assert perft(position_class(position_str), depth) == counts[depth]
+
+
+def test_search_stats_per_iteration():
+    """
+    Checks that the search reports one record per completed iteration, with
+    counters that add up to the search totals and a PV that starts with the move
+    """
+    position = OthelloBitboardPosition(list(random_game_positions(4))[16])
+    stats = OthelloSearchStats(stream=None)
+    search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics("W", "B"), 1, 5, True,
+        OthelloTranspositionTable(1), OthelloMoveOrdering(), PVS, stats=stats)
+    search.ab_id_search()
+    assert [record['depth'] for record in stats.iterations] == [1, 2, 3, 4]
+    assert sum(record['nodes'] for record in stats.iterations) == search.nodes
+    assert sum(record['leaves'] for record in stats.iterations) == search.leaves
+    for record in stats.iterations:
+        assert record['first_move_cutoffs'] <= record['cutoffs']
+    assert stats.iterations[-1]['pv'][0] == str(search._return_move)
+
+
+def test_batch_evaluation_matches_single():
+    """
+    Checks that the batch evaluations give the values of the single evaluations
+    and that a search evaluating its frontier in batches finds the same move
+    """
+    positions = [OthelloBitboardPosition(position_str) for position_str in random_game_positions(5)]
+    for max_player, min_player in (("W", "B"), ("B", "W")):
+        classic = OthelloHeuristics(max_player, min_player)
+        pattern = OthelloPatternHeuristics(max_player, min_player)
+        boards = stack_boards(positions)
+        assert list(classic._utility_of_batch(boards)) == [classic._utility_of_result(p).value for p in positions]
+        assert np.allclose(pattern._utility_of_batch(boards), [pattern._utility_of_result(p).value for p in positions])
+
+    position_str = list(random_game_positions(1))[20]
+    results = []
+    for batch_frontier in (False, True):
+        position = OthelloPosition(position_str)
+        player, opponent = ("W", "B") if position.maxPlayer else ("B", "W")
+        search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics(player, opponent), 1, 4,
+            True, OthelloTranspositionTable(1), OthelloMoveOrdering(), PVS, batch_frontier=batch_frontier)
+        search.ab_id_search()
+        results.append((str(search._return_move), search._return_move.value))
+    assert results[0] == results[1]
+
+
+def test_tournament_game_and_summary():
+    """
+    Plays a tournament game with each colour and checks the records and the
+    summary, and that the Elo difference is antisymmetric
+    """
+    first = parse_engine("first:evaluator=classic,depth=1")
+    second = parse_engine("second:evaluator=pattern,depth=1,endgame=0")
+    records = [play_game((0, START_POSITION, first, second, 1)), play_game((1, START_POSITION, second, first, 1))]
+    for record in records:
+        assert record['white_discs'] + record['black_discs'] <= 64
+        assert record['result'] == ('white' if record['white_discs'] > record['black_discs'] else
+            'black' if record['black_discs'] > record['white_discs'] else 'draw')
+        assert record['white_search']['depth'] == record['white_search']['moves']
+    summary = summarize(records)
+    pair = summary['pairs'][0]
+    assert (pair['first'], pair['second'], pair['games']) == ('first', 'second', 2)
+    assert summary['engines']['second']['average_depth'] == 1
+
+    elo, lower, upper = elo_difference(7, 2, 3)
+    assert lower < elo < upper and elo > 0
+    assert np.allclose(elo_difference(3, 2, 7), (-elo, -upper, -lower))
+
+
+def test_weight_fitting(tmp_path):
+    """
+    Fits weights to random games in small batches and checks them against a
+    ridge fit of all positions at once, and that an evaluator loads
+    the weight file and uses the weights of the phase of the position, and
+    that an engine with the pattern evaluator refuses the weight file
+    """
+    records_path = tmp_path / "games.jsonl"
+    with open(records_path, "w") as records:
+        for seed in range(6):
+            rng = random.Random(seed)
+            position = OthelloBitboardPosition(START_POSITION)
+            moves = []
+            while moves[-2:] != ['pass', 'pass']:
+                move = rng.choice(position.get_moves() or [OthelloMove(is_pass_move=True)])
+                moves.append(str(move))
+                position.make_move(move)
+            records.write(json.dumps({'opening': START_POSITION, 'moves': moves[:-2],
+                'white_discs': bin(position.white).count("1"), 'black_discs': bin(position.black).count("1")}) + "\n")
+
+    weights_path = tmp_path / "weights.json"
+    weights = fit([str(records_path)], str(weights_path), phases=2, l2=0.5, batch_size=7, log=None)
+    assert load_weights(str(weights_path)) == weights
+
+    evaluator = OthelloHeuristics("W", "B")
+    boards = np.concatenate([batch[0] for batch in read_batches([str(records_path)])])
+    differences = np.concatenate([batch[1] for batch in read_batches([str(records_path)])])
+    features, discs = evaluator._features_of_batch(boards)
+    for phase in range(2):
+        selected = game_phase(discs, 2) == phase
+        phase_features = features.T[selected]
+        expected = np.linalg.solve(phase_features.T @ phase_features + 0.5 * selected.sum() * np.eye(4),
+            phase_features.T @ differences[selected])
+        assert np.allclose(weights[phase], expected)
+
+    fitted = OthelloHeuristics("W", "B", load_weights(str(weights_path)))
+    position = OthelloBitboardPosition(list(random_game_positions(0))[40])
+    corners, mobility, stability, coins = weights[game_phase(bin(position.white | position.black).count("1"), 2)]
+    features = fitted._features_of_batch(stack_boards([position]))[0][:, 0]
+    assert np.isclose(fitted._utility_of_result(position).value,
+        features @ np.array([corners, mobility, stability, coins]))
+
+    try:
+        OthelloEngine(tt_memory_mb=1, book_path=None, evaluator='pattern', weights_path=str(weights_path))
+        assert False
+    except Exception as exception:
+        assert 'does not take a weight file' in str(exception)
+
+
+def test_pondering_hit_and_miss():
+    """
+    Checks that the engine ponders on the predicted position after answering,
+    continues that search when the predicted position is asked for next, and
+    stops it and searches normally when another position is asked for
+    """
+    positions = [s for s in random_game_positions(3) if OthelloPosition(s).get_moves()]
+    engine = OthelloEngine(tt_memory_mb=1, book_path=None)
+    try:
+        engine.best_move(positions[20], 0.3)
+        assert engine.start_pondering()
+        pondering = engine._ponder_search
+        predicted = engine_position_string(pondering._root_position)
+        time.sleep(0.3)
+        started = time.monotonic()
+        move = engine.best_move(predicted, 0.3, started)
+        assert time.monotonic() - started < 0.3
+        assert engine.ponder_hits == 1 and engine.search is pondering
+        assert str(move) in [str(legal) for legal in OthelloPosition(predicted).get_moves()]
+
+        assert engine.start_pondering()
+        other = next(s for s in positions[30:] if s != engine_position_string(engine._ponder_search._root_position))
+        move = engine.best_move(other, 0.3)
+        assert engine.ponder_misses == 1 and engine._ponder_search is None
+        assert str(move) in [str(legal) for legal in OthelloPosition(other).get_moves()]
+    finally:
+        engine.close()
+
+
+def test_batch_analysis_in_order_and_restartable(tmp_path):
+    """
+    Analyses positions on two worker processes and checks that the records
+    come in input order, and that a run stopped in the middle of a record
+    is continued from the last complete one
+    """
+    positions = list(random_game_positions(1))[:12:2]
+    config = parse_engine("analysis:evaluator=classic,depth=2")
+    output = tmp_path / "analysis.jsonl"
+    assert run_analysis(["# positions", ""] + positions, str(output), config, 2, 1, None) == len(positions)
+    with open(output) as records:
+        lines = records.readlines()
+    analyses = [json.loads(line) for line in lines]
+    assert [analysis['index'] for analysis in analyses] == list(range(len(positions)))
+    assert [analysis['position'] for analysis in analyses] == positions
+    assert all(analysis['depth'] == 2 and analysis['move'] != 'pass' for analysis in analyses)
+
+    with open(output, "w") as records:
+        records.write(''.join(lines[:2]) + lines[2][:20])
+    assert run_analysis(positions, str(output), config, 2, 1, None) == len(positions) - 2
+    with open(output) as records:
+        assert [json.loads(line)['move'] for line in records] == [analysis['move'] for analysis in analyses]
+
+
+def test_probcut_fit_and_search(tmp_path):
+    """
+    Fits ProbCut parameters to logged searches and checks the fit, that a
+    search with the parameters cuts nodes and still finds a move, and that
+    with an unreachable threshold it searches the same tree as without them
+    """
+    log_path = tmp_path / "search.jsonl"
+    positions = [OthelloBitboardPosition(position_str) for seed in range(3)
+        for position_str in list(random_game_positions(seed))[10:40:3]]
+    with open(log_path, "w") as log:
+        stats = OthelloSearchStats(log, as_json=True)
+        for position in positions:
+            player, opponent = ("W", "B") if position.maxPlayer else ("B", "W")
+            OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics(player, opponent), 1, 4,
+                True, OthelloTranspositionTable(1), OthelloMoveOrdering(), PVS, stats=stats).ab_id_search()
+    # Iterations from depth 1 search 2 plies and more, so 1 ply is never logged
+    probcut, counts = fit_probcut([str(log_path)], [(4, 2), (3, 1)], threshold=0.5, min_samples=10)
+    assert counts == {(4, 2): len(positions)}
+    shallow, slope, intercept, sigma = probcut.pairs(4)[0]
+    assert shallow == 2 and slope > 0 and sigma > 0
+    probcut.write(str(tmp_path / "probcut.json"), counts)
+    assert OthelloProbCut.load(str(tmp_path / "probcut.json")).pairs(4) == probcut.pairs(4)
+
+    def search(probcut):
+        search = OthelloABIDSearch(positions[4], OthelloMove(is_pass_move=True), OthelloHeuristics("W", "B"), 1, 5,
+            True, OthelloTranspositionTable(1), OthelloMoveOrdering(), PVS, probcut=probcut)
+        search.ab_id_search()
+        return search
+    full_width = search(None)
+    cut = search(probcut)
+    assert cut.probcuts > 0
+    assert str(cut._return_move) in [str(move) for move in positions[4].get_moves()]
+    uncut = search(OthelloProbCut({4: probcut.pairs(4)}, threshold=1e9))
+    assert uncut.probcuts == 0
+    assert str(uncut._return_move) == str(full_width._return_move)
+
+
+def test_late_move_reductions():
+    """
+    Checks that late move reductions search fewer nodes and still return a
+    legal move with both search modes, that corners and the hash move are
+    never reduced and that endgame positions are searched without reductions
+    """
+    positions = list(random_game_positions(5))
+    position = OthelloBitboardPosition(positions[20])
+
+    def search(search_mode, lmr_rank):
+        search = OthelloABIDSearch(position, OthelloMove(is_pass_move=True), OthelloHeuristics("W", "B"), 1, 5,
+            True, OthelloTranspositionTable(1), OthelloMoveOrdering(), search_mode, lmr_rank=lmr_rank)
+        search.ab_id_search()
+        return search
+    for search_mode in (MINIMAX, PVS):
+        full_depth = search(search_mode, None)
+        reduced = search(search_mode, 2)
+        assert full_depth.reductions == 0
+        assert 0 < reduced.reductions and reduced.failed_reductions <= reduced.reductions
+        assert reduced.nodes < full_depth.nodes
+        assert str(reduced._return_move) in [str(move) for move in position.get_moves()]
+
+    lmr_search = search(PVS, 2)
+    moves = position.get_move_squares()
+    exempt = lmr_search._late_move_exemptions(position, moves, 1, 4, moves[-1])
+    assert set(CORNERS) | {moves[-1]} <= set(exempt)
+    assert lmr_search._late_move_exemptions(position, moves, 1, 2, moves[-1]) is None
+    endgame = next(OthelloBitboardPosition(position_str) for position_str in positions
+        if position_str.count('E') <= LMR_ENDGAME_EMPTIES and OthelloBitboardPosition(position_str).get_moves())
+    endgame_moves = endgame.get_move_squares()
+    assert lmr_search._late_move_exemptions(endgame, endgame_moves, 1, 4, endgame_moves[0]) is None